@@ -1,13 +1,23 @@
 # Import necessary libraries
 import pandas as pd
+from google.colab import files
 
 # Step 1: Prompt user to upload the CSV file
-from google.colab import files
 uploaded = files.upload()
 
+# Only the columns this script uses are read; its filter below drops the rows
+COLUMNS = [
+    'Symbol',
+    'PE Ratio',
+    'Price to Book',
+    'Earnings Growth (YoY)',
+    'Debt to Equity',
+    'Current Ratio',
+]
+
 # Load the uploaded CSV file into a DataFrame
 file_name = list(uploaded.keys())[0]
-df = pd.read_csv(file_name)
+df = pd.read_csv(file_name, usecols=COLUMNS)
 
 # Step 2: Define a Graham-style filtering function
 def filter_stocks_graham(df):
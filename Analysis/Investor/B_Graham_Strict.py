@@ -4,9 +4,19 @@ from google.colab import files
 # Step 1: Prompt user to upload the CSV file
 uploaded = files.upload()
 
+# Only the columns this script uses are read; its filter below drops the rows
+COLUMNS = [
+    'Symbol',
+    'Name',
+    'PE Ratio',
+    'Price to Book',
+    'Earnings Growth (YoY)',
+    'Debt to Equity',
+]
+
 # Load the uploaded CSV file into a DataFrame
 for filename in uploaded.keys():
-    df = pd.read_csv(filename)
+    df = pd.read_csv(filename, usecols=COLUMNS)
 
 # Define a Graham-inspired filtering function with relaxed criteria
 def filter_stocks_graham_relaxed(df):
@@ -4,9 +4,23 @@ from google.colab import files
 # Step 1: Prompt user to upload the CSV file
 uploaded = files.upload()
 
+# Only the columns this script uses are read; its filter below drops the rows
+COLUMNS = [
+    'Symbol',
+    'Name',
+    'Sector',
+    'Country',
+    'Current Price',
+    'Market Cap',
+    'PE Ratio',
+    'Price to Book',
+    'Free Cash Flow',
+    'Debt to Equity',
+]
+
 # Load the uploaded CSV file into a DataFrame
 for filename in uploaded.keys():
-    df = pd.read_csv(filename)
+    df = pd.read_csv(filename, usecols=COLUMNS)
 
 # Calculate 'FCF Yield' from 'Free Cash Flow' and 'Market Cap'
 df['FCF Yield'] = df['Free Cash Flow'] / df['Market Cap']
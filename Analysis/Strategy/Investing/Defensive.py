@@ -4,9 +4,27 @@ from google.colab import files
 # Step 1: Prompt user to upload the CSV file
 uploaded = files.upload()
 
+# Only the columns this script uses are read; its filter below drops the rows
+COLUMNS = [
+    'Symbol',
+    'Name',
+    'Sector',
+    'Industry',
+    'Current Price',
+    'PE Ratio',
+    'EBITDA Margins',
+    'Gross Margins',
+    'Operating Margins',
+    'Profit Margins',
+    'Debt to Equity',
+    'Current Ratio',
+    'Quick Ratio',
+    'Beta',
+]
+
 # Load the uploaded CSV file into a DataFrame
 for filename in uploaded.keys():
-    df = pd.read_csv(filename)
+    df = pd.read_csv(filename, usecols=COLUMNS)
 
 def filter_stocks_defensive(df):
     # Drop rows with missing values in key defensive metrics columns
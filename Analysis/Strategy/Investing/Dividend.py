@@ -5,9 +5,18 @@ from IPython.display import display
 # Step 1: Prompt user to upload the CSV file
 uploaded = files.upload()
 
+# Only the columns this script uses are read; its filter below drops the rows
+COLUMNS = [
+    'Symbol',
+    'Dividend Yield',
+    'Payout Ratio',
+    'Five-Year Avg. Dividend Yield',
+    'Free Cash Flow',
+]
+
 # Load the uploaded CSV file into a DataFrame
 for filename in uploaded.keys():
-    df = pd.read_csv(filename)
+    df = pd.read_csv(filename, usecols=COLUMNS)
 
 # Define a Dividend Investing filtering function
 def filter_stocks_dividend(df):
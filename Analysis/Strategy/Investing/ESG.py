@@ -4,9 +4,24 @@ from google.colab import files
 # Step 1: Prompt user to upload the CSV file
 uploaded = files.upload()
 
+# Only the columns this script uses are read; its filter below drops the rows
+COLUMNS = [
+    'Symbol',
+    'Name',
+    'Sector',
+    'Industry',
+    'Country',
+    'Current Price',
+    'Market Cap',
+    'Revenue Growth (YoY)',
+    'Profit Margins',
+    'Debt to Equity',
+    'Current Ratio',
+]
+
 # Load the uploaded CSV file into a DataFrame
 for filename in uploaded.keys():
-    df = pd.read_csv(filename)
+    df = pd.read_csv(filename, usecols=COLUMNS)
 
 # Define the ESG investing filter function
 def filter_stocks_esg(df):
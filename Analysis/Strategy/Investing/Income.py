@@ -5,9 +5,25 @@ from datetime import datetime
 # Step 1: Prompt user to upload the CSV file
 uploaded = files.upload()
 
+# Only the columns this script uses are read; its filter below drops the rows
+COLUMNS = [
+    'Symbol',
+    'Name',
+    'Sector',
+    'Industry',
+    'Current Price',
+    'Market Cap',
+    'Dividend Rate',
+    'Dividend Yield',
+    'Payout Ratio',
+    'Five-Year Avg. Dividend Yield',
+    'Free Cash Flow',
+    'Operating Cash Flow',
+]
+
 # Load the uploaded CSV file into a DataFrame
 for filename in uploaded.keys():
-    df = pd.read_csv(filename)
+    df = pd.read_csv(filename, usecols=COLUMNS)
 
 def filter_stocks_income(df):
     # Drop rows with missing values in key dividend columns
@@ -4,9 +4,22 @@ from google.colab import files
 # Step 1: Prompt user to upload the CSV file
 uploaded = files.upload()
 
+# Only the columns this script uses are read; its filter below drops the rows
+COLUMNS = [
+    'Symbol',
+    'Name',
+    'Sector',
+    'Country',
+    'Current Price',
+    'Market Cap',
+    'Earnings Growth (YoY)',
+    'Operating Margins',
+    'Total Debt',
+]
+
 # Load the uploaded CSV file into a DataFrame
 for filename in uploaded.keys():
-    df = pd.read_csv(filename)
+    df = pd.read_csv(filename, usecols=COLUMNS)
 
 # Define the turnaround investing filter function
 def filter_stocks_turnaround(df):
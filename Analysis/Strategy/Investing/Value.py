@@ -4,9 +4,25 @@ from google.colab import files
 # Step 1: Prompt user to upload the CSV file
 uploaded = files.upload()
 
+# Only the columns this script uses are read; its filter below drops the rows
+COLUMNS = [
+    'Symbol',
+    'Name',
+    'Sector',
+    'Industry',
+    'Current Price',
+    'Market Cap',
+    'PE Ratio',
+    'PEG Ratio',
+    'Price to Book',
+    'Dividend Yield',
+    'Free Cash Flow',
+    'Debt to Equity',
+]
+
 # Load the uploaded CSV file into a DataFrame
 for filename in uploaded.keys():
-    df = pd.read_csv(filename)
+    df = pd.read_csv(filename, usecols=COLUMNS)
 
 def filter_stocks_value(df):
     # Drop rows with missing values in key value investing columns
@@ -0,0 +1,94 @@
+"""
+Convergence check for the AIMD concurrency controller.
+
+The stand-in serves at most `--capacity` requests at once and answers
+anything beyond that with HTTP 429, so the best sustainable throughput is
+capacity / latency. Fixed windows below, at and above capacity are compared
+with the adaptive controller.
+
+Run from the repository root:
+    python -m Benchmarks.bench_adaptive --tickers 600 --capacity 12 --latency 0.05
+"""
+
+import argparse
+import contextlib
+import io
+import time
+from async_fetch import run_async_fetch
+from concurrency import AIMDController
+from rate_limiter import RateLimiter
+from script_v8 import fetch_stock_data, get_tickers
+from stand_in_server import async_http_info_fetcher, http_info_fetcher, start_server
+
+
+def run(label, fetch, tickers, server):
+    served, throttled = server.served, server.throttled
+    start_time = time.monotonic()
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = fetch(tickers)
+    elapsed_time = time.monotonic() - start_time
+    print(
+        f"{label:<32} {len(df):>5}/{len(tickers)} rows  {elapsed_time:7.2f}s  "
+        f"{len(df) / elapsed_time:7.1f} tickers/s  {server.throttled - throttled:>5} x 429"
+    )
+
+
+def settled_window(controller):
+    """
+    Time-weighted mean window over the second half of the run.
+    """
+    history = controller.history + [(time.monotonic(), controller.window)]
+    start, end = history[0][0], history[-1][0]
+    midpoint = start + (end - start) / 2
+    total = weighted = 0.0
+    for (t0, window), (t1, _) in zip(history, history[1:]):
+        t0 = max(t0, midpoint)
+        if t1 > t0:
+            weighted += window * (t1 - t0)
+            total += t1 - t0
+    return weighted / total if total else float(controller.window)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=600)
+    parser.add_argument("--capacity", type=int, default=12, help="stand-in concurrency before it returns 429")
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    tickers = get_tickers("NYSE")[: args.tickers]
+    server, base_url = start_server(latency=args.latency, max_concurrent=args.capacity)
+    limiter = lambda: RateLimiter(rate=10000, burst=10000, window_limit=None)
+    print(f"Ceiling: {args.capacity / args.latency:.1f} tickers/s")
+    try:
+        for window in (5, args.capacity, args.capacity * 3):
+            run(
+                f"asyncio fixed window {window}",
+                lambda t: run_async_fetch(t, max_in_flight=window, fetch_info=async_http_info_fetcher(base_url), limiter=limiter()),
+                tickers,
+                server,
+            )
+
+        controller = AIMDController(initial=2)
+        run(
+            "asyncio AIMD",
+            lambda t: run_async_fetch(t, fetch_info=async_http_info_fetcher(base_url), limiter=limiter(), controller=controller),
+            tickers,
+            server,
+        )
+        print(f"  settled window {settled_window(controller):.1f}, {controller.stats()}")
+
+        controller = AIMDController(initial=2)
+        run(
+            "thread pool AIMD",
+            lambda t: fetch_stock_data(t, fetch_info=http_info_fetcher(base_url), limiter=limiter(), controller=controller),
+            tickers,
+            server,
+        )
+        print(f"  settled window {settled_window(controller):.1f}, {controller.stats()}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Network requests on a cold run vs. a rerun through the on-disk response cache.
+
+With the quote group expired, batch quote mode refreshes it in a few batch
+requests, and the quoteSummary fetcher asks only for the quote modules of
+each ticker, merging the cached profile and fundamentals back in.
+
+Run from the repository root:
+    python -m Benchmarks.bench_cache --tickers 300
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from script_v8 import fetch_stock_data, get_tickers
+from stand_in_server import http_info_fetcher, http_quote_fetcher, http_summary_fetcher, start_server
+from stock_fields import QUOTE
+from yahoo_api import field_fetcher
+
+
+def run(label, fetch, tickers, server):
+    served = server.served
+    start_time = time.monotonic()
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = fetch(tickers)
+    elapsed_time = time.monotonic() - start_time
+    print(f"{label:<44} {len(df):>5} rows  {server.served - served:>5} requests  {elapsed_time:7.2f}s")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    tickers = get_tickers("NYSE")[: args.tickers]
+    server, base_url = start_server(latency=args.latency)
+    limiter = lambda: RateLimiter(rate=1000, burst=1000, window_limit=None)
+    options = dict(fetch_info=http_info_fetcher(base_url), fetch_quote_json=http_quote_fetcher(base_url))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "responses.sqlite")
+        try:
+            cache = ResponseCache(path)
+            cold = run("cold run", lambda t: fetch_stock_data(t, limiter=limiter(), cache=cache, **options), tickers, server)
+            warm = run("rerun within TTL", lambda t: fetch_stock_data(t, limiter=limiter(), cache=cache, **options), tickers, server)
+            print(f"  {cache.stats()}")
+
+            # Quotes expired, profile and fundamentals still fresh: one batch pass refreshes the quote group
+            stale_quotes = ResponseCache(path, ttls={QUOTE: 1})
+            time.sleep(1.1)
+            run(
+                "rerun, quotes expired, batch quote mode",
+                lambda t: fetch_stock_data(t, limiter=limiter(), cache=stale_quotes, quote_batch=True, **options),
+                tickers,
+                server,
+            )
+            print(f"  {stale_quotes.stats()}")
+
+            # The same expiry through the quoteSummary fetcher, counting the payload received
+            received = [0]
+            fetch_summary = http_summary_fetcher(base_url)
+
+            def fetch_summary_json(ticker, modules):
+                payload = fetch_summary(ticker, modules)
+                received[0] += len(json.dumps(payload))
+                return payload
+
+            summary = dict(options, fetch_info=field_fetcher(fetch_summary_json=fetch_summary_json))
+            summary_cache = ResponseCache(os.path.join(directory, "summary.sqlite"), ttls={QUOTE: 1})
+            frames = []
+            for label in ("quoteSummary, cold run", "quoteSummary, quotes expired"):
+                received[0] = 0
+                frames.append(run(label, lambda t: fetch_stock_data(t, limiter=limiter(), cache=summary_cache, **summary), tickers, server))
+                print(f"  {received[0] / 1024:.0f} KiB received")
+                time.sleep(1.1)
+            # The stand-in's quotes do not move, so the merged rows must match the cold run's
+            print(f"  Merged frame identical: {frames[0].equals(frames[1])}")
+        finally:
+            server.shutdown()
+    print(f"Rerun frame identical: {cold.sort_values('Symbol').reset_index(drop=True).equals(warm.sort_values('Symbol').reset_index(drop=True))}")
+
+
+if __name__ == "__main__":
+    main()
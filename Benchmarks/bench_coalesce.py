@@ -0,0 +1,70 @@
+"""
+Upstream requests when several jobs fetch the same tickers at once, with and without coalescing.
+
+Each job is a separate process running `fetch_stock_data` over the same
+tickers against the stand-in, as overlapping nightly and ad-hoc runs would.
+With coalescing they share one `Coalescer` file, so each ticker should reach
+the stand-in about once however many jobs ask for it.
+
+Run from the repository root:
+    python -m Benchmarks.bench_coalesce --tickers 200 --jobs 3
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+from coalescing import Coalescer
+from rate_limiter import RateLimiter
+from script_v8 import fetch_stock_data, get_tickers
+from stand_in_server import http_info_fetcher, start_server
+
+
+def job(tickers, base_url, rate, coalesce_path):
+    fetch_info = http_info_fetcher(base_url)
+    coalescer = Coalescer(coalesce_path) if coalesce_path else None
+    limiter = RateLimiter(rate=rate, burst=rate, window_limit=None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        fetch_stock_data(tickers, fetch_info=fetch_info, limiter=limiter, coalescer=coalescer)
+    if coalescer:
+        coalescer.close()
+
+
+def run(label, tickers, jobs, server, base_url, rate, coalesce_path):
+    served = server.served
+    context = multiprocessing.get_context("spawn")
+    start_time = time.monotonic()
+    processes = [context.Process(target=job, args=(tickers, base_url, rate, coalesce_path)) for _ in range(jobs)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed_time = time.monotonic() - start_time
+    requests = server.served - served
+    print(f"{label:<16} {requests:>5} upstream requests for {jobs} x {len(tickers)} tickers  {elapsed_time:6.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--jobs", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rate", type=float, default=50.0, help="per-job limiter rate in requests/second")
+    args = parser.parse_args()
+
+    tickers = get_tickers("NYSE")[: args.tickers]
+    server, base_url = start_server(latency=args.latency)
+    try:
+        run("independent", tickers, args.jobs, server, base_url, args.rate, None)
+        with tempfile.TemporaryDirectory() as directory:
+            coalesce_path = os.path.join(directory, "inflight.sqlite")
+            run("coalesced", tickers, args.jobs, server, base_url, args.rate, coalesce_path)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
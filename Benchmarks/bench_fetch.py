@@ -0,0 +1,66 @@
+"""
+Throughput comparison: thread-pool fetch vs. asyncio fetch against the local stand-in.
+
+Run from the repository root:
+    python -m Benchmarks.bench_fetch --tickers 200 --latency 0.15 --max-in-flight 50
+
+Each path gets its own limiter at `--rate` requests/second so the stand-in
+run is not held to the production limits in `rate_limiter`.
+"""
+
+import argparse
+import contextlib
+import io
+import time
+from async_fetch import run_async_fetch
+from rate_limiter import RateLimiter
+from script_v8 import fetch_stock_data, get_tickers
+from stand_in_server import async_http_info_fetcher, http_info_fetcher, start_server
+
+
+def timed(label, fetch, tickers):
+    start_time = time.monotonic()
+    # Both paths print one line per ticker; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = fetch(tickers)
+    elapsed_time = time.monotonic() - start_time
+    print(f"{label:<28} {len(df):>5} rows  {elapsed_time:8.2f}s  {len(df) / elapsed_time:8.1f} tickers/s")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=100, help="number of NYSE symbols to fetch")
+    parser.add_argument("--latency", type=float, default=0.15, help="stand-in response latency in seconds")
+    parser.add_argument("--max-in-flight", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=1000.0, help="limiter rate in requests/second")
+    args = parser.parse_args()
+
+    tickers = get_tickers("NYSE")[: args.tickers]
+    server, base_url = start_server(latency=args.latency)
+    try:
+        thread_limiter = RateLimiter(rate=args.rate, burst=args.rate, window_limit=None)
+        thread_df = timed(
+            "thread pool (5 workers)",
+            lambda t: fetch_stock_data(t, fetch_info=http_info_fetcher(base_url), limiter=thread_limiter),
+            tickers,
+        )
+        async_limiter = RateLimiter(rate=args.rate, burst=args.rate, window_limit=None)
+        async_df = timed(
+            f"asyncio ({args.max_in_flight} in flight)",
+            lambda t: run_async_fetch(
+                t, max_in_flight=args.max_in_flight, fetch_info=async_http_info_fetcher(base_url), limiter=async_limiter
+            ),
+            tickers,
+        )
+    finally:
+        server.shutdown()
+
+    same = thread_df.sort_values("Symbol").reset_index(drop=True).equals(async_df.sort_values("Symbol").reset_index(drop=True))
+    print(f"Frames identical: {same}")
+    print(f"Thread pool limiter: {thread_limiter.stats()}")
+    print(f"Asyncio limiter:     {async_limiter.stats()}")
+
+
+if __name__ == "__main__":
+    main()
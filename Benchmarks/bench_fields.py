@@ -0,0 +1,103 @@
+"""
+Bytes transferred, JSON parse time and retained payload per ticker: full `.info` vs. schema-driven module selection.
+
+Every pass reads from the stand-in, whose quoteSummary modules are padded
+to roughly Yahoo's sizes:
+- `.info`: the five quoteSummary modules flattened, plus a one-symbol v7 quote call
+- schema: `field_fetcher()`, only the modules the column schema reads from
+- fundamentals only: `field_fetcher((FUNDAMENTALS,))`
+- quote only: batched v7 quotes (`quote_batch.fetch_quotes`)
+
+Run from the repository root:
+    python -m Benchmarks.bench_fields --tickers 300
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import time
+import urllib.parse
+import urllib.request
+from fetch_metrics import payload_bytes
+from quote_batch import fetch_quotes, quote_to_info
+from rate_limiter import RateLimiter
+from script_v8 import get_tickers
+from stand_in_server import start_server
+from stock_fields import FUNDAMENTALS
+from yahoo_api import DETAIL_MODULES, fetch_summary_info, field_fetcher
+
+
+class Transfer:
+    """
+    Counts response bytes and JSON parse time of stand-in requests.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.bytes = 0
+        self.parse_seconds = 0.0
+
+    def get(self, path, params):
+        with urllib.request.urlopen(f"{self.base_url}/{path}?{urllib.parse.urlencode(params)}") as response:
+            body = response.read()
+        self.bytes += len(body)
+        started = time.perf_counter()
+        payload = json.loads(body)
+        self.parse_seconds += time.perf_counter() - started
+        return payload
+
+    def summary_json(self, ticker, modules):
+        return self.get(f"quoteSummary/{ticker}", {"modules": ",".join(modules)})
+
+    def quote_json(self, symbols):
+        return self.get("quote", {"symbols": ",".join(symbols)})
+
+
+def full_info(transfer):
+    def fetch_info(ticker):
+        info = fetch_summary_info(ticker, DETAIL_MODULES, fetch_summary_json=transfer.summary_json)
+        for quote in transfer.quote_json([ticker])["quoteResponse"]["result"]:
+            info.update(quote_to_info(quote))
+        return info
+
+    return fetch_info
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=300)
+    args = parser.parse_args()
+
+    tickers = get_tickers("NYSE")[: args.tickers]
+    server, base_url = start_server()
+    passes = {
+        ".info": lambda transfer: full_info(transfer),
+        "schema": lambda transfer: field_fetcher(fetch_summary_json=transfer.summary_json),
+        "fundamentals only": lambda transfer: field_fetcher((FUNDAMENTALS,), fetch_summary_json=transfer.summary_json),
+        "quote only": None,
+    }
+    try:
+        for label, make_fetcher in passes.items():
+            transfer = Transfer(base_url)
+            served = server.served
+            start_time = time.monotonic()
+            if make_fetcher:
+                fetch_info = make_fetcher(transfer)
+                payloads = [fetch_info(ticker) for ticker in tickers]
+            else:
+                limiter = RateLimiter(rate=1e9, burst=1e9, window_limit=None)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    payloads = list(fetch_quotes(tickers, fetch_quote_json=transfer.quote_json, limiter=limiter).values())
+            elapsed_time = time.monotonic() - start_time
+            retained = sum(payload_bytes(payload) for payload in payloads) / len(payloads)
+            print(
+                f"{label:<18} {server.served - served:>5} requests  {transfer.bytes / len(tickers) / 1024:6.2f} KiB/ticker  "
+                f"parse {transfer.parse_seconds * 1000:7.1f} ms  kept {retained:6.0f} B/ticker  {elapsed_time:5.2f}s"
+            )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
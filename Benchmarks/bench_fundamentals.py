@@ -0,0 +1,92 @@
+"""
+Storage of a month of daily snapshots: one full Parquet file per day vs. the delta history.
+
+Simulates the nightly refresh on synthetic snapshots (no network): every
+day the quote columns move for every symbol, and a seventh of the symbols
+(those past the fundamentals TTL) get new fundamentals. Reports bytes on
+disk, the time to rebuild the last day, and a one-column time series query.
+Run from the repository root:
+    python -m Benchmarks.bench_fundamentals --symbols 4000 --days 21
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from fundamentals_history import FundamentalsHistory
+from rate_limiter import RateLimiter
+from script_v8 import fetch_stock_data
+from snapshot_store import SnapshotStore
+from stand_in_server import synthetic_info
+from stock_fields import FIELDS, FLOAT32, FLOAT64, FUNDAMENTALS, QUOTE, field_group
+
+REFRESH_SHARE = 1 / 7
+
+
+def next_day(df, rng):
+    """
+    Tomorrow's snapshot: quote columns move for everyone, fundamentals for a share of the symbols.
+    """
+    df = df.copy()
+    refreshed = rng.random(len(df)) < REFRESH_SHARE
+    for column, key, dtype in FIELDS:
+        if dtype not in (FLOAT32, FLOAT64):
+            continue
+        if field_group(key) == QUOTE:
+            df[column] = (df[column] * (1 + rng.normal(0, 0.01, len(df)))).astype(dtype)
+        elif field_group(key) == FUNDAMENTALS:
+            moved = df[column] * (1 + rng.normal(0, 0.05, len(df)))
+            df[column] = df[column].where(~refreshed, moved).astype(dtype)
+    return df
+
+
+def directory_bytes(directory):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=4000)
+    parser.add_argument("--days", type=int, default=21)
+    args = parser.parse_args()
+
+    tickers = [f"T{i:06d}" for i in range(args.symbols)]
+    limiter = RateLimiter(rate=1e9, burst=1e9, window_limit=None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = fetch_stock_data(tickers, fetch_info=synthetic_info, limiter=limiter)
+    rng = np.random.default_rng(0)
+    days = [day.date().isoformat() for day in pd.bdate_range("2024-11-01", periods=args.days)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SnapshotStore(os.path.join(directory, "snapshots"))
+        history = FundamentalsHistory("bench", os.path.join(directory, "fundamentals"))
+        append_seconds = 0.0
+        for day in days:
+            store.write(df, "bench", day)
+            started = time.perf_counter()
+            history.append(df, day)
+            append_seconds += time.perf_counter() - started
+            last = df
+            df = next_day(df, rng)
+
+        full = directory_bytes(store.directory) - os.path.getsize(store.catalog_path)
+        deltas = directory_bytes(history.directory)
+        print(f"{len(days)} days x {args.symbols} symbols")
+        print(f"full snapshots   {full / 2**20:8.2f} MiB")
+        print(f"delta history    {deltas / 2**20:8.2f} MiB  ({full / deltas:.1f}x smaller)")
+        print(f"append           {append_seconds / len(days) * 1000:8.1f} ms/day")
+
+        started = time.perf_counter()
+        rebuilt = history.snapshot(days[-1])
+        print(f"rebuild last day {(time.perf_counter() - started) * 1000:8.1f} ms  (matches: {rebuilt['Current Price'].equals(last['Current Price'].reset_index(drop=True))})")
+        started = time.perf_counter()
+        series = history.series("Trailing EPS", tickers[0])
+        print(f"series query     {(time.perf_counter() - started) * 1000:8.1f} ms  ({series.notna().sum()} values)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Per-ticker tail latency and wall time of the thread pool with and without hedged requests.
+
+The stand-in answers most requests around `--median` seconds but stalls a
+`--stall-rate` share of them for about `--stall` seconds. Both runs see the
+same seeded latency sequence. The last run adds an AIMD controller, whose
+window the duplicates share with the primary requests.
+
+Run from the repository root:
+    python -m Benchmarks.bench_hedge --tickers 300 --stall-rate 0.03 --stall 3
+"""
+
+import argparse
+import contextlib
+import io
+import time
+from concurrency import AIMDController
+from fetch_metrics import FetchMetrics
+from hedging import HedgePolicy
+from rate_limiter import RateLimiter
+from script_v8 import fetch_stock_data, get_tickers
+from stand_in_server import heavy_tail_latency, http_info_fetcher, start_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=300)
+    parser.add_argument("--median", type=float, default=0.05)
+    parser.add_argument("--stall-rate", type=float, default=0.03)
+    parser.add_argument("--stall", type=float, default=3.0, help="typical stall in seconds")
+    parser.add_argument("--percentile", type=int, default=95, help="hedge after this latency percentile")
+    parser.add_argument("--budget", type=float, default=0.1, help="max duplicates per request")
+    args = parser.parse_args()
+
+    tickers = get_tickers("NYSE")[: args.tickers]
+    for label in ("no hedging", "hedged", "hedged, AIMD"):
+        latency = heavy_tail_latency(args.median, stall_rate=args.stall_rate, stall=args.stall)
+        server, base_url = start_server(latency=latency)
+        try:
+            limiter = RateLimiter(rate=1e9, burst=1e9, window_limit=None)
+            fetch_info = http_info_fetcher(base_url)
+            controller = AIMDController() if label == "hedged, AIMD" else None
+            hedge = None
+            if label != "no hedging":
+                hedge = HedgePolicy(percentile=args.percentile, budget=args.budget, limiter=limiter, controller=controller)
+                fetch_info = hedge.wrap(fetch_info)
+            metrics = FetchMetrics()
+            start_time = time.monotonic()
+            with contextlib.redirect_stdout(io.StringIO()):
+                fetch_stock_data(tickers, fetch_info=fetch_info, limiter=limiter, controller=controller, metrics=metrics)
+            elapsed_time = time.monotonic() - start_time
+            latencies = metrics.summary()["latency_seconds"]
+            print(
+                f"{label:<11} {elapsed_time:6.2f}s  p50 {latencies['p50']:.3f}s  p99 {latencies['p99']:.3f}s  "
+                f"max {latencies['max']:.3f}s  {server.served} upstream requests"
+            )
+            if hedge:
+                print(f"  {hedge.stats()}")
+                hedge.close()
+            if controller:
+                # Abandoned duplicates finish in the background; their slots must all come back
+                print(f"  {controller.stats()}, in flight after close: {controller.in_flight}")
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Daily price-history update: full re-download vs. incremental append, and Parquet vs. CSV size.
+
+Bars come from the stand-in's synthetic generator; each download call
+sleeps `--call-latency` plus `--bar-latency` per bar, a rough model of
+`yf.download` cost. The incremental run starts from a backfilled store and
+adds the last `--days` sessions.
+
+Run from the repository root:
+    python -m Benchmarks.bench_history --tickers 500 --years 5 --days 1
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from price_history import bars_from_download, load_history, update_history
+from rate_limiter import RateLimiter
+from script_v8 import get_tickers
+from stand_in_server import synthetic_bars
+
+
+def simulated_download(call_latency, bar_latency, counter):
+    def download(tickers, start, end):
+        bars = bars_from_download(synthetic_bars(tickers, start, end))
+        time.sleep(call_latency + bar_latency * len(bars))
+        counter["bars"] += len(bars)
+        return bars
+
+    return download
+
+
+def run(label, tickers, directory, end, years, download, counter):
+    counter["bars"] = 0
+    limiter = RateLimiter(rate=1e9, burst=1e9, window_limit=None)
+    start_time = time.monotonic()
+    with contextlib.redirect_stdout(io.StringIO()):
+        update_history(tickers, directory, end=end, backfill_years=years, download=download, limiter=limiter)
+    print(f"{label:<22} {counter['bars']:>9} bars downloaded  {time.monotonic() - start_time:7.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--days", type=int, default=1, help="sessions added by the incremental run")
+    parser.add_argument("--call-latency", type=float, default=0.2)
+    parser.add_argument("--bar-latency", type=float, default=2e-6)
+    args = parser.parse_args()
+
+    tickers = get_tickers("NYSE")[: args.tickers]
+    counter = {"bars": 0}
+    download = simulated_download(args.call_latency, args.bar_latency, counter)
+    today = date(2024, 11, 22)
+    yesterday = today - timedelta(days=args.days)
+    with tempfile.TemporaryDirectory() as directory:
+        run("backfill", tickers, directory, yesterday, args.years, download, counter)
+        with tempfile.TemporaryDirectory() as full_directory:
+            run("full re-download", tickers, full_directory, today, args.years, download, counter)
+        run("incremental append", tickers, directory, today, args.years, download, counter)
+
+        parquet_bytes = sum(os.path.getsize(path) for path in glob.glob(os.path.join(directory, "ohlcv_*.parquet")))
+        bars = load_history(directory)
+        csv_path = os.path.join(directory, "history.csv")
+        bars.to_csv(csv_path, index=False)
+        print(f"{len(bars)} bars: Parquet {parquet_bytes / 2**20:6.2f} MiB, CSV {os.path.getsize(csv_path) / 2**20:6.2f} MiB")
+        start_time = time.monotonic()
+        one = load_history(directory, tickers=tickers[:1], columns=["Close"])
+        print(f"One symbol's closes ({len(one)} bars) loaded in {(time.monotonic() - start_time) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
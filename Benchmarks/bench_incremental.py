@@ -0,0 +1,82 @@
+"""
+Requests for a nightly run: full refetch vs. incremental refresh against the previous snapshot.
+
+The previous snapshot holds every symbol; the freshness record marks
+`--fresh` of them as fetched an hour ago and the rest as a week and a half
+old, so only those are refetched in detail and the fresh ones are carried
+with batched quotes. A last run adds a time budget that runs out at once,
+and checks that the symbols it cut off keep their freshness record.
+Run from the repository root:
+    python -m Benchmarks.bench_incremental --tickers 300 --fresh 250
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from incremental import MAX_AGE, refresh_snapshot
+from quote_batch import fetch_quotes
+from rate_limiter import RateLimiter
+from script_v8_auto import fetch_stock_data
+from stand_in_server import http_info_fetcher, http_quote_fetcher, start_server
+from symbol_registry import read_symbol_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=300)
+    parser.add_argument("--fresh", type=int, default=250)
+    args = parser.parse_args()
+
+    tickers = read_symbol_file("NYSE")[: args.tickers]
+    server, base_url = start_server()
+    limiter = lambda: RateLimiter(rate=1e9, burst=1e9, window_limit=None)
+    fetch_info = http_info_fetcher(base_url)
+    fetch_quote_json = http_quote_fetcher(base_url)
+    now = time.time()
+    with tempfile.TemporaryDirectory() as directory:
+        previous_path = os.path.join(directory, "snapshot_2024-11-21.csv")
+        freshness_path = os.path.join(directory, "freshness.json")
+
+        def write_freshness():
+            freshness = {
+                ticker: {"fetched_at": now - 3600 if i < args.fresh else now - 1.5 * MAX_AGE, "status": "ok"}
+                for i, ticker in enumerate(tickers)
+            }
+            with open(freshness_path, "w", encoding="utf-8") as file:
+                json.dump(freshness, file)
+            return freshness
+
+        def run(label, time_budget=None):
+            served = server.served
+            with contextlib.redirect_stdout(io.StringIO()):
+                df = refresh_snapshot(
+                    tickers,
+                    lambda pending: fetch_stock_data(pending, fetch_info=fetch_info, limiter=limiter(), time_budget=time_budget),
+                    previous_path,
+                    freshness_path,
+                    fetch_carried_quotes=lambda carried: fetch_quotes(carried, fetch_quote_json=fetch_quote_json, limiter=limiter()),
+                )
+            print(f"{label:<28} {len(df):>5} rows  {server.served - served:>5} requests")
+
+        try:
+            served = server.served
+            with contextlib.redirect_stdout(io.StringIO()):
+                fetch_stock_data(tickers, fetch_info=fetch_info, limiter=limiter()).to_csv(previous_path, index=False)
+            print(f"{'full refetch':<28} {args.tickers:>5} rows  {server.served - served:>5} requests")
+            before = write_freshness()
+            run("incremental")
+            write_freshness()
+            run("incremental, budget used up", time_budget=1e-9)
+            with open(freshness_path, encoding="utf-8") as file:
+                after = json.load(file)
+            print(f"Freshness of cut-off symbols unchanged: {after == before}")
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Load time and memory of a strategy's input: the whole file vs. its declared columns and filters.
+
+Uses the Momentum strategy's columns and filters over a synthetic snapshot
+(no network), stored both as CSV and in the Parquet snapshot store. Run
+from the repository root:
+    python -m Benchmarks.bench_loader --rows 16000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import pandas as pd
+from rate_limiter import RateLimiter
+from script_v8 import fetch_stock_data
+from snapshot_store import SnapshotStore
+from stand_in_server import synthetic_info
+from stock_fields import CATEGORY, SCHEMA, read_snapshot
+
+COLUMNS = ["Symbol", "Name", "Sector", "Industry", "Country", "Currency", "Exchange", "Current Price", "Market Cap", "Beta", "Average Volume", "1-Year Return"]
+# Momentum's thresholds, rescaled to synthetic values (uniform in [0, 100)) so about a tenth of the rows pass
+FILTERS = [("1-Year Return", ">", 80), ("Average Volume", ">", 100000), ("Beta", ">=", 50)]
+# Synthetic payloads give every ticker its own sector, industry, ...; real snapshots repeat a few values
+CATEGORY_VALUES = 50
+
+
+def measure(load, repeat=5):
+    """
+    (best seconds, rows, MiB in memory) over `repeat` loads.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        df = load()
+        best = min(best, time.perf_counter() - started)
+    return best, len(df), df.memory_usage(deep=True).sum() / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=16000)
+    args = parser.parse_args()
+
+    tickers = [f"T{i:06d}" for i in range(args.rows)]
+    limiter = RateLimiter(rate=1e9, burst=1e9, window_limit=None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = fetch_stock_data(tickers, fetch_info=synthetic_info, limiter=limiter)
+    for column, dtype in SCHEMA.items():
+        if dtype == CATEGORY:
+            df[column] = pd.Categorical([f"{column}-{i % CATEGORY_VALUES}" for i in range(len(df))])
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "snapshot.csv")
+        df.to_csv(csv_path, index=False)
+        parquet_path = SnapshotStore(directory).write(df, "snapshot", "2024-11-22")
+        loads = {
+            "CSV, whole file (pd.read_csv)": lambda: pd.read_csv(csv_path),
+            "CSV, columns + filters": lambda: read_snapshot(csv_path, COLUMNS, FILTERS),
+            "Parquet, whole file": lambda: read_snapshot(parquet_path),
+            "Parquet, columns + filters": lambda: read_snapshot(parquet_path, COLUMNS, FILTERS),
+        }
+        for name, load in loads.items():
+            seconds, rows, mib = measure(load)
+            print(f"{name:<32} {seconds * 1000:7.1f} ms  {rows:>6} rows  {mib:6.2f} MiB")
+
+
+if __name__ == "__main__":
+    main()
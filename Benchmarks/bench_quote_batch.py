@@ -0,0 +1,70 @@
+"""
+Request count and wall time: per-ticker detail calls vs. batched quotes.
+
+Run from the repository root:
+    python -m Benchmarks.bench_quote_batch --tickers 500 --latency 0.05
+"""
+
+import argparse
+import contextlib
+import io
+import time
+from pandas.testing import assert_frame_equal
+from quote_batch import QUOTE_COLUMNS
+from rate_limiter import RateLimiter
+from script_v8 import fetch_stock_data, get_tickers
+from stand_in_server import http_info_fetcher, http_quote_fetcher, start_server
+
+
+def run(label, fetch, tickers, server):
+    served = server.served
+    start_time = time.monotonic()
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = fetch(tickers)
+    elapsed_time = time.monotonic() - start_time
+    print(f"{label:<34} {len(df):>5} rows  {server.served - served:>5} requests  {elapsed_time:7.2f}s")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--rate", type=float, default=50.0, help="limiter rate in requests/second")
+    args = parser.parse_args()
+
+    tickers = get_tickers("NYSE")[: args.tickers]
+    server, base_url = start_server(latency=args.latency)
+    limiter = lambda: RateLimiter(rate=args.rate, burst=args.rate, window_limit=None)
+    options = dict(fetch_info=http_info_fetcher(base_url), fetch_quote_json=http_quote_fetcher(base_url))
+    try:
+        detail_df = run("per-ticker detail", lambda t: fetch_stock_data(t, limiter=limiter(), **options), tickers, server)
+        quote_df = run(
+            "batch quotes, quote-only",
+            lambda t: fetch_stock_data(t, limiter=limiter(), quote_batch=True, fundamentals=False, **options),
+            tickers,
+            server,
+        )
+        run(
+            "batch quotes + detail fundamentals",
+            lambda t: fetch_stock_data(t, limiter=limiter(), quote_batch=True, **options),
+            tickers,
+            server,
+        )
+    finally:
+        server.shutdown()
+
+    columns = ["Symbol"] + QUOTE_COLUMNS
+    detail_quotes = detail_df[columns].sort_values("Symbol").reset_index(drop=True)
+    batch_quotes = quote_df[columns].sort_values("Symbol").reset_index(drop=True)
+    try:
+        # 52-week change goes through a percent conversion, so compare with a float tolerance
+        assert_frame_equal(detail_quotes, batch_quotes, check_exact=False)
+        same = True
+    except AssertionError:
+        same = False
+    print(f"Quote columns match: {same} ({len(QUOTE_COLUMNS)} columns)")
+
+
+if __name__ == "__main__":
+    main()
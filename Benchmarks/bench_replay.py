@@ -0,0 +1,103 @@
+"""
+Throughput and tail latency of each ingest path against a replaying stand-in.
+
+Replays recorded fixtures (see `fixtures.py`) when `--fixtures` exists,
+otherwise synthetic payloads. Latency is drawn from the recorded samples,
+or from a lognormal with `--median`/`--sigma`; `--error-rate` fails a share
+of requests with 503 and `--burst-every`/`--burst-length` add 429 bursts.
+Every path sees the same seeded fault pattern, so runs are comparable.
+
+Run from the repository root:
+    python -m Benchmarks.bench_replay --tickers 200 --error-rate 0.02 --burst-every 5 --burst-length 0.3
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+import script_v8_auto
+from async_fetch import run_async_fetch
+from fetch_metrics import percentile
+from fixtures import FIXTURE_PATH, load_fixtures
+from rate_limiter import RateLimiter
+from script_v8 import fetch_stock_data, get_tickers
+from stand_in_server import async_http_info_fetcher, http_info_fetcher, lognormal_latency, replay_latency, start_server
+
+
+def timed_fetcher(fetch_info, latencies):
+    """
+    Wrap a fetcher so each call's client-side latency is appended to `latencies`.
+    """
+    if asyncio.iscoroutinefunction(fetch_info):
+        async def fetch(ticker):
+            start_time = time.monotonic()
+            try:
+                return await fetch_info(ticker)
+            finally:
+                latencies.append(time.monotonic() - start_time)
+    else:
+        def fetch(ticker):
+            start_time = time.monotonic()
+            try:
+                return fetch_info(ticker)
+            finally:
+                latencies.append(time.monotonic() - start_time)
+    return fetch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--fixtures", default=FIXTURE_PATH)
+    parser.add_argument("--median", type=float, default=0.05, help="median latency when not replaying recorded latencies")
+    parser.add_argument("--sigma", type=float, default=0.6)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--burst-every", type=float, default=0.0, help="seconds between 429 bursts (0 disables)")
+    parser.add_argument("--burst-length", type=float, default=0.3)
+    parser.add_argument("--rate", type=float, default=1000.0, help="limiter rate in requests/second")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if os.path.exists(args.fixtures):
+        payloads, recorded = load_fixtures(args.fixtures)
+        tickers = list(payloads)[: args.tickers]
+        make_latency = lambda: replay_latency(recorded, seed=args.seed)
+        print(f"Replaying {len(tickers)} recorded payloads from {args.fixtures}")
+    else:
+        payloads = None
+        tickers = get_tickers("NYSE")[: args.tickers]
+        make_latency = lambda: lognormal_latency(args.median, args.sigma, seed=args.seed)
+        print(f"No fixtures at {args.fixtures}; serving synthetic payloads")
+    burst = (args.burst_every, args.burst_length) if args.burst_every else None
+    limiter = lambda: RateLimiter(rate=args.rate, burst=args.rate, window_limit=None)
+
+    paths = [
+        ("sequential (script_v8_auto)", http_info_fetcher, lambda t, f: script_v8_auto.fetch_stock_data(t, fetch_info=f, limiter=limiter())),
+        ("thread pool (script_v8)", http_info_fetcher, lambda t, f: fetch_stock_data(t, fetch_info=f, limiter=limiter())),
+        ("asyncio (async_fetch)", async_http_info_fetcher, lambda t, f: run_async_fetch(t, fetch_info=f, limiter=limiter())),
+    ]
+    print(f"{'path':<28} {'rows':>9} {'time':>8} {'tickers/s':>10} {'p50':>7} {'p95':>7} {'p99':>7} {'503':>5} {'429':>5}")
+    for label, make_fetcher, fetch in paths:
+        # A fresh server per path restarts the latency, error and burst sequences
+        server, base_url = start_server(
+            latency=make_latency(), fixtures=payloads, error_rate=args.error_rate, burst=burst, seed=args.seed
+        )
+        latencies = []
+        try:
+            start_time = time.monotonic()
+            with contextlib.redirect_stdout(io.StringIO()):
+                df = fetch(tickers, timed_fetcher(make_fetcher(base_url), latencies))
+            elapsed_time = time.monotonic() - start_time
+        finally:
+            server.shutdown()
+        p50, p95, p99 = (percentile(latencies, q) * 1000 for q in (50, 95, 99))
+        print(
+            f"{label:<28} {len(df):>4}/{len(tickers):<4} {elapsed_time:7.2f}s {len(df) / elapsed_time:10.1f} "
+            f"{p50:6.0f}ms {p95:5.0f}ms {p99:5.0f}ms {server.errors:>5} {server.throttled:>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
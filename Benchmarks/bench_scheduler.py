@@ -0,0 +1,41 @@
+"""
+Share of total market cap covered by a time-boxed run: file order vs. priority order.
+
+Market caps come from a snapshot in Data/; payloads come from the stand-in.
+Run from the repository root:
+    python -m Benchmarks.bench_scheduler Data/nyse_daily_stock_data_2024-11-21.csv --budget 2
+"""
+
+import argparse
+import contextlib
+import io
+from rate_limiter import RateLimiter
+from scheduler import market_cap_snapshot, prioritize
+from script_v8 import fetch_stock_data
+from stand_in_server import http_info_fetcher, start_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("snapshot")
+    parser.add_argument("--budget", type=float, default=2.0, help="time budget in seconds")
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    snapshot = market_cap_snapshot(args.snapshot)
+    market_caps = snapshot["Market Cap"].fillna(0)
+    tickers = list(snapshot.index)
+    server, base_url = start_server(latency=args.latency)
+    try:
+        for label, order in (("file order", tickers), ("priority order", prioritize(tickers, snapshot=snapshot))):
+            limiter = RateLimiter(rate=1e9, burst=1e9, window_limit=None)
+            with contextlib.redirect_stdout(io.StringIO()):
+                df = fetch_stock_data(order, fetch_info=http_info_fetcher(base_url), limiter=limiter, time_budget=args.budget)
+            covered = market_caps[df["Symbol"]].sum() / market_caps.sum()
+            print(f"{label:<16} {len(df):>5}/{len(tickers)} tickers  {covered:6.1%} of total market cap")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Memory and filter speed of a snapshot: untyped `read_csv` vs. the typed schema.
+
+Run from the repository root:
+    python -m Benchmarks.bench_schema Data/nyse_daily_stock_data_2024-11-20.csv
+"""
+
+import argparse
+import time
+import pandas as pd
+from stock_fields import read_snapshot
+
+
+def filter_seconds(df, repeat=50):
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        # Same kind of screen the strategy scripts run
+        market_cap = pd.to_numeric(df["Market Cap"], errors="coerce")
+        pe = pd.to_numeric(df["PE Ratio"], errors="coerce")
+        df[(market_cap > 1e9) & (pe < 20) & (df["Sector"] == "Technology")]
+    return (time.perf_counter() - start_time) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    untyped = pd.read_csv(args.path, dtype=object)
+    typed = read_snapshot(args.path)
+    for label, df in (("untyped (object)", untyped), ("typed schema", typed)):
+        memory = df.memory_usage(deep=True).sum() / 2**20
+        print(f"{label:<18} {memory:7.2f} MiB  filter {filter_seconds(df) * 1000:7.2f} ms")
+    print(typed.dtypes.astype(str).value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
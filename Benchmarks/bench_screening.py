@@ -0,0 +1,93 @@
+"""
+Cross-date screening: reading every day's snapshot file vs. one query on the screening database.
+
+Builds a month and a half of synthetic daily snapshots (no network), kept
+as CSVs, in the Parquet snapshot store and in the screening database, and
+times the same screens over all of them:
+    sector + PE: one sector with a PE Ratio under 15, over the last 30 dates
+    one symbol:  one symbol's PE Ratio on every date
+Run from the repository root:
+    python -m Benchmarks.bench_screening --symbols 4000 --days 30
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from Benchmarks.bench_fundamentals import next_day
+from rate_limiter import RateLimiter
+from screening_db import ScreeningDB
+from script_v8 import fetch_stock_data
+from snapshot_store import SnapshotStore
+from stand_in_server import synthetic_info
+from stock_fields import CATEGORY, SCHEMA, filter_mask, read_snapshot
+
+# Synthetic payloads give every ticker its own sector, industry, ...; real snapshots repeat a few values
+CATEGORY_VALUES = 11
+COLUMNS = ["Symbol", "Sector", "PE Ratio", "Market Cap"]
+
+
+def best_of(run, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = len(run())
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=4000)
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+
+    tickers = [f"T{i:06d}" for i in range(args.symbols)]
+    limiter = RateLimiter(rate=1e9, burst=1e9, window_limit=None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = fetch_stock_data(tickers, fetch_info=synthetic_info, limiter=limiter)
+    for column, dtype in SCHEMA.items():
+        if dtype == CATEGORY:
+            df[column] = pd.Categorical([f"{column}-{i % CATEGORY_VALUES}" for i in range(len(df))])
+    days = [day.date().isoformat() for day in pd.bdate_range("2024-10-01", periods=args.days)]
+    screens = {
+        "sector + PE": [("Sector", "==", "Sector-3"), ("PE Ratio", "<", 15)],
+        "one symbol": [("Symbol", "==", tickers[len(tickers) // 2])],
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SnapshotStore(directory)
+        db = ScreeningDB(os.path.join(directory, "screening.sqlite"))
+        csv_paths = []
+        rng = np.random.default_rng(0)
+        load_seconds = 0.0
+        for day in days:
+            csv_paths.append(os.path.join(directory, f"snapshot_{day}.csv"))
+            df.to_csv(csv_paths[-1], index=False)
+            store.write(df, "snapshot", day)
+            started = time.perf_counter()
+            db.load(df, "snapshot", day)
+            load_seconds += time.perf_counter() - started
+            df = next_day(df, rng)
+
+        print(f"{args.days} days x {args.symbols} symbols; database load {load_seconds / args.days * 1000:.1f} ms/day")
+        for name, filters in screens.items():
+            runs = {
+                "CSV files, whole": lambda: pd.concat([df[filter_mask(df, filters)] for df in map(read_snapshot, csv_paths)]),
+                "Parquet store, columns + filters": lambda: pd.concat(
+                    [read_snapshot(store.path("snapshot", day), COLUMNS, filters) for day in days]
+                ),
+                "screening database": lambda: db.screen("snapshot", COLUMNS, filters, last=args.days),
+            }
+            for run_name, run in runs.items():
+                ms, rows = best_of(run)
+                print(f"{name:<12} {run_name:<34} {ms:8.1f} ms  {rows:>6} rows")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
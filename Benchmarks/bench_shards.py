@@ -0,0 +1,78 @@
+"""
+Sharded fetch with 1..N local worker processes against the stand-in.
+
+Each worker is a separate process with its own `--rate` limiter and thread
+pool, as it would be on its own egress IP, so throughput should scale with
+the worker count until the stand-in saturates.
+With `--crash`, one shard is leased to a worker that never reports back;
+its lease has to expire and the shard be picked up by a live worker before
+the merged snapshot is complete.
+
+Run from the repository root:
+    python -m Benchmarks.bench_shards --tickers 2000 --workers 1 2 4 --crash
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from script_v8 import get_tickers
+from sharding import ShardQueue, merge_shards, run_worker
+from stand_in_server import start_server
+
+
+def run(tickers, workers, base_url, directory, shard_size, rate, lease_seconds, crash):
+    queue_path = os.path.join(directory, f"queue_{workers}.sqlite")
+    queue = ShardQueue(queue_path, lease_seconds=lease_seconds)
+    queue.enqueue(tickers, shard_size)
+    if crash:
+        # A worker that takes a shard and dies without renewing or completing it
+        queue.lease("crashed-worker")
+    context = multiprocessing.get_context("spawn")
+    start_time = time.monotonic()
+    processes = [
+        context.Process(
+            target=run_worker,
+            args=(queue_path, directory),
+            kwargs=dict(worker=f"w{number}", info_url=base_url, rate=rate, lease_seconds=lease_seconds, quiet=True),
+        )
+        for number in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed_time = time.monotonic() - start_time
+    merged = merge_shards(queue, tickers)
+    in_order = list(merged["Symbol"]) == [ticker for ticker in tickers if ticker in set(merged["Symbol"])]
+    print(
+        f"{workers} workers  {len(merged):>5}/{len(tickers)} rows  {elapsed_time:7.2f}s  "
+        f"{len(merged) / elapsed_time:7.1f} tickers/s  shards {queue.progress()}  in order: {in_order}"
+    )
+    queue.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--shard-size", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=40.0, help="per-worker limiter rate in requests/second")
+    parser.add_argument("--lease-seconds", type=float, default=3.0)
+    parser.add_argument("--crash", action="store_true", help="leave one shard with a dead worker's lease")
+    args = parser.parse_args()
+
+    tickers = get_tickers("NYSE")[: args.tickers]
+    server, base_url = start_server(latency=args.latency)
+    try:
+        for workers in args.workers:
+            with tempfile.TemporaryDirectory() as directory:
+                run(tickers, workers, base_url, directory, args.shard_size, args.rate, args.lease_seconds, args.crash)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Peak Python heap of a fetch run: in-memory DataFrame vs. the chunked CSV sink.
+
+Uses in-process synthetic payloads (no network), so only the fetcher's own
+memory is measured. Run from the repository root:
+    python -m Benchmarks.bench_sink --sizes 2000 8000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import tracemalloc
+import pandas as pd
+from rate_limiter import RateLimiter
+from record_sink import ChunkedCSVSink
+from script_v8 import fetch_stock_data
+from stand_in_server import synthetic_info
+
+
+def peak_mib(fetch):
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fetch()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 8000])
+    args = parser.parse_args()
+
+    limiter = lambda: RateLimiter(rate=1e9, burst=1e9, window_limit=None)
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            tickers = [f"T{i:06d}" for i in range(size)]
+            df, in_memory = peak_mib(lambda: fetch_stock_data(tickers, fetch_info=synthetic_info, limiter=limiter()))
+            path = os.path.join(directory, f"sink_{size}.csv")
+            with ChunkedCSVSink(path) as sink:
+                _, streamed = peak_mib(lambda: fetch_stock_data(tickers, fetch_info=synthetic_info, limiter=limiter(), sink=sink))
+            rows = len(pd.read_csv(path))
+            print(f"{size:>7} tickers  DataFrame peak {in_memory:7.1f} MiB  sink peak {streamed:6.1f} MiB  ({rows} rows on disk)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Size on disk and load time of a day's snapshot: CSV vs. the Parquet snapshot store.
+
+Uses in-process synthetic payloads (no network). Run from the repository root:
+    python -m Benchmarks.bench_snapshot --sizes 4000 16000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from rate_limiter import RateLimiter
+from script_v8 import fetch_stock_data
+from snapshot_store import SnapshotStore
+from stand_in_server import synthetic_info
+from stock_fields import read_snapshot
+
+
+def best_of(load, repeat=5):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        load()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4000, 16000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SnapshotStore(directory)
+        for size in args.sizes:
+            tickers = [f"T{i:06d}" for i in range(size)]
+            limiter = RateLimiter(rate=1e9, burst=1e9, window_limit=None)
+            with contextlib.redirect_stdout(io.StringIO()):
+                df = fetch_stock_data(tickers, fetch_info=synthetic_info, limiter=limiter)
+            csv_path = os.path.join(directory, f"snapshot_{size}.csv")
+            df.to_csv(csv_path, index=False)
+            parquet_path = store.write(df, f"snapshot_{size}", "2024-11-22")
+            csv_seconds = best_of(lambda: read_snapshot(csv_path))
+            parquet_seconds = best_of(lambda: store.read(f"snapshot_{size}"))
+            csv_kib = os.path.getsize(csv_path) / 1024
+            parquet_kib = os.path.getsize(parquet_path) / 1024
+            print(
+                f"{size:>7} rows  CSV {csv_kib:8.0f} KiB {csv_seconds * 1000:7.1f} ms  "
+                f"Parquet {parquet_kib:7.0f} KiB {parquet_seconds * 1000:6.1f} ms  "
+                f"({csv_kib / parquet_kib:.1f}x smaller, {csv_seconds / parquet_seconds:.1f}x faster)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Ticks per second through the live-quote table, fed by a replaying websocket stand-in.
+
+Replays recorded ticks (see `fixtures.py --ticks`) when `--fixtures` exists,
+otherwise synthetic ticks. The table starts from a snapshot built with
+synthetic payloads for the same symbols. Reports the end-to-end rate
+(websocket, base64/protobuf decoding and table update) and the rate of the
+table update alone.
+
+Run from the repository root:
+    python -m Benchmarks.bench_stream --symbols 3000 --ticks 200000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+from fixtures import TICK_FIXTURE_PATH, load_ticks
+from live_quotes import LiveQuoteTable, stream_quotes
+from rate_limiter import RateLimiter
+from script_v8 import fetch_stock_data
+from stand_in_server import start_stream_server, synthetic_info, synthetic_ticks
+
+
+def snapshot_for(symbols):
+    limiter = RateLimiter(rate=1e9, burst=1e9, window_limit=None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fetch_stock_data(symbols, fetch_info=synthetic_info, limiter=limiter)
+
+
+async def stream_all(table, url, expected):
+    """
+    Stream until `expected` ticks have been applied; returns the seconds taken.
+    """
+    started = time.monotonic()
+    streaming = asyncio.create_task(stream_quotes(table, url))
+    while table.ticks < expected and not streaming.done():
+        await asyncio.sleep(0.01)
+    elapsed = time.monotonic() - started
+    streaming.cancel()
+    await asyncio.gather(streaming, return_exceptions=True)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=3000)
+    parser.add_argument("--ticks", type=int, default=200000)
+    parser.add_argument("--fixtures", default=TICK_FIXTURE_PATH)
+    args = parser.parse_args()
+
+    if os.path.exists(args.fixtures):
+        ticks = load_ticks(args.fixtures)
+        symbols = sorted({tick["id"] for tick in ticks})
+        print(f"Replaying {len(ticks)} recorded ticks for {len(symbols)} symbols")
+    else:
+        symbols = [f"T{i:06d}" for i in range(args.symbols)]
+        ticks = synthetic_ticks(symbols, args.ticks)
+        print(f"Replaying {len(ticks)} synthetic ticks for {len(symbols)} symbols")
+
+    table = LiveQuoteTable(snapshot_for(symbols))
+    server, url = start_stream_server(ticks)
+    elapsed = asyncio.run(stream_all(table, url, len(ticks)))
+    server.shutdown()
+    print(f"websocket -> table   {table.ticks / elapsed:>10,.0f} ticks/s  ({table.ticks} ticks in {elapsed:.2f}s)")
+
+    table = LiveQuoteTable(snapshot_for(symbols))
+    started = time.monotonic()
+    for tick in ticks:
+        table.apply(tick)
+    elapsed = time.monotonic() - started
+    print(f"table update only    {len(ticks) / elapsed:>10,.0f} ticks/s")
+
+    started = time.monotonic()
+    table.frame()
+    print(f"frame() of {len(symbols)} rows  {(time.monotonic() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from stock_fields import fetched_groups, get_info, narrowed
+from checkpoint import finish_ticker
+from concurrency import backoff_delay
+from fetch_errors import is_retryable
+from rate_limiter import get_shared_limiter
+from record_sink import collect_results
+
+MAX_IN_FLIGHT = 20
+RETRIES = 3
+INITIAL_DELAY = 1
+# Returned for tickers skipped because the time budget ran out
+SKIPPED = "skipped"
+
+
+class BudgetUsedUp(Exception):
+    """
+    Raised inside a ticker's request once the time budget has run out.
+    """
+
+
+async def fetch_ticker_data_async(
+    ticker,
+    index,
+    total_tickers,
+    fetch_info,
+    semaphore,
+    executor,
+    limiter,
+    controller=None,
+    cache=None,
+    journal=None,
+    metrics=None,
+    deadline=None,
+    dead_letters=None,
+    coalescer=None,
+):
+    """
+    Fetch one ticker without blocking the event loop.
+
+    `fetch_info` may be a plain function (run on `executor`) or a coroutine function.
+    With a `controller`, its adaptive window replaces the fixed `semaphore`.
+    Past the monotonic `deadline`, the ticker is skipped: SKIPPED is returned and nothing is journaled.
+    With a `coalescer`, the request and its retries are shared with other callers fetching the same ticker.
+    """
+    cached = {}
+    if cache:
+        cached, stale = cache.lookup(ticker, fetched_groups(fetch_info))
+        if not stale:
+            print(f"Using cached data for {ticker} ({index}/{total_tickers})")
+            if metrics:
+                metrics.record_ticker("cached")
+            return finish_ticker(ticker, cached, journal)
+        # Only the stale groups are fetched; the fresh ones are merged back in
+        fetch_info = narrowed(fetch_info, stale)
+
+    loop = asyncio.get_running_loop()
+    attempts = 0
+
+    async def request():
+        # One rate-limited request with retries; returns the payload or raises the last error
+        nonlocal attempts
+        delay = INITIAL_DELAY
+        while True:
+            if controller:
+                ticket = await controller.acquire_async()
+            else:
+                await semaphore.acquire()
+            if deadline and time.monotonic() > deadline:
+                if controller:
+                    controller.cancel(ticket)
+                else:
+                    semaphore.release()
+                raise BudgetUsedUp(ticker)
+            attempts += 1
+            started = time.monotonic()
+            try:
+                print(f"Fetching data for {ticker} ({index}/{total_tickers})")
+                await limiter.acquire_async()
+                if metrics:
+                    metrics.record_wait(time.monotonic() - started)
+                started = time.monotonic()
+                if asyncio.iscoroutinefunction(fetch_info):
+                    info = await fetch_info(ticker)
+                else:
+                    info = await loop.run_in_executor(executor, fetch_info, ticker)
+            except Exception as e:
+                if controller:
+                    controller.release(ticket, error=e)
+                else:
+                    semaphore.release()
+                if metrics:
+                    metrics.record_request(time.monotonic() - started, error=e)
+                if attempts == RETRIES or not is_retryable(e):
+                    raise
+                # Back off without holding a slot so it goes to another ticker
+                pause = backoff_delay(delay, controller)
+                if metrics:
+                    metrics.record_backoff(pause)
+                await asyncio.sleep(pause)
+                delay *= 2
+            else:
+                latency = time.monotonic() - started
+                if controller:
+                    controller.release(ticket, latency=latency)
+                else:
+                    semaphore.release()
+                if metrics:
+                    metrics.record_request(latency, payload=info)
+                return info
+
+    try:
+        # With a coalescer, a ticker another caller is already fetching is waited for
+        # without taking a slot or a rate limiter token
+        info = await (coalescer.fetch_async(coalescer.key(fetch_info, ticker), request) if coalescer else request())
+    except BudgetUsedUp:
+        return SKIPPED
+    except Exception as e:
+        print(f"Failed to fetch data for {ticker}: {e}")
+        if metrics:
+            metrics.record_ticker("failed", retries=max(attempts - 1, 0), error=e)
+        if journal:
+            journal.record_failure(ticker, e)
+        if dead_letters:
+            dead_letters.record(ticker, e)
+        return None
+    if metrics:
+        metrics.record_ticker("ok", retries=max(attempts - 1, 0))
+    if cache:
+        cache.put(ticker, info, fetched_groups(fetch_info))
+    if dead_letters:
+        dead_letters.resolve(ticker)
+    return finish_ticker(ticker, {**cached, **info}, journal)
+
+
+async def fetch_stock_data_async(
+    tickers,
+    max_in_flight=MAX_IN_FLIGHT,
+    fetch_info=get_info,
+    limiter=None,
+    controller=None,
+    cache=None,
+    journal=None,
+    sink=None,
+    metrics=None,
+    time_budget=None,
+    dead_letters=None,
+    coalescer=None,
+):
+    """
+    Fetch all tickers with at most `max_in_flight` requests outstanding,
+    or as many as `controller` currently allows.
+
+    Returns the same DataFrame as `script_v8.fetch_stock_data`, in input order.
+    With a `sink`, rows are written to it as they complete and the returned
+    frame is empty apart from the unfetched tickers.
+    With `time_budget` (seconds), tickers not started by then are skipped.
+    With a `coalescer`, tickers another job on this host is fetching are shared with it.
+    """
+    total_tickers = len(tickers)
+    start_time = time.monotonic()
+    deadline = start_time + time_budget if time_budget else None
+    semaphore = asyncio.Semaphore(max_in_flight)
+    limiter = limiter or get_shared_limiter()
+
+    # Blocking fetchers (yfinance) need one thread per in-flight request
+    max_workers = controller.max_window if controller else max_in_flight
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        tasks = [
+            fetch_ticker_data_async(
+                ticker,
+                index,
+                total_tickers,
+                fetch_info,
+                semaphore,
+                executor,
+                limiter,
+                controller,
+                cache,
+                journal,
+                metrics,
+                deadline,
+                dead_letters,
+                coalescer,
+            )
+            for index, ticker in enumerate(tickers, start=1)
+        ]
+        if sink:
+            results = []
+            cut_off = set()
+            # as_completed loses track of which ticker a result belongs to, so each task carries it
+            async def tagged(ticker, task):
+                return ticker, await task
+
+            for task in asyncio.as_completed([tagged(ticker, task) for ticker, task in zip(tickers, tasks)]):
+                ticker, result = await task
+                if result == SKIPPED:
+                    cut_off.add(ticker)
+                elif result:
+                    sink.write(result)
+            # Listed in input order, like the gather path
+            unfetched = [ticker for ticker in tickers if ticker in cut_off]
+        else:
+            results = await asyncio.gather(*tasks)
+            unfetched = [ticker for ticker, result in zip(tickers, results) if result == SKIPPED]
+            results = [result for result in results if result and result != SKIPPED]
+        skipped = len(unfetched)
+
+    elapsed_time = time.monotonic() - start_time
+    print(f"All info fetched in {elapsed_time:.2f} seconds")
+    if skipped:
+        print(f"Time budget of {time_budget}s used up; {skipped} tickers left unfetched")
+    if controller:
+        print(f"Concurrency controller: {controller.stats()}")
+    if cache:
+        print(f"Response cache: {cache.stats()}")
+    if metrics:
+        print(f"Fetch metrics: {metrics.report()}")
+
+    return collect_results(results, tickers, sink=sink, unfetched=unfetched)
+
+
+def run_async_fetch(
+    tickers,
+    max_in_flight=MAX_IN_FLIGHT,
+    fetch_info=get_info,
+    limiter=None,
+    controller=None,
+    cache=None,
+    journal=None,
+    sink=None,
+    metrics=None,
+    time_budget=None,
+    dead_letters=None,
+    coalescer=None,
+):
+    """
+    Synchronous entry point for scripts that are not already inside an event loop.
+    """
+    return asyncio.run(
+        fetch_stock_data_async(
+            tickers,
+            max_in_flight=max_in_flight,
+            fetch_info=fetch_info,
+            limiter=limiter,
+            controller=controller,
+            cache=cache,
+            journal=journal,
+            sink=sink,
+            metrics=metrics,
+            time_budget=time_budget,
+            dead_letters=dead_letters,
+            coalescer=coalescer,
+        )
+    )
@@ -0,0 +1,101 @@
+"""
+Durable journal for resumable fetch runs.
+
+Every finished ticker is appended to a JSON-lines file and fsynced, so a
+crashed or cancelled run can be restarted with the same journal and only
+fetch the symbols that are missing or failed last time.
+"""
+
+import json
+import os
+import threading
+from stock_fields import build_record
+
+CHECKPOINT_DIR = os.path.join(".cache", "checkpoints")
+
+
+def journal_path(run_name):
+    return os.path.join(CHECKPOINT_DIR, f"{run_name}.jsonl")
+
+
+def finish_ticker(ticker, info, journal=None):
+    """
+    Build a ticker's output row and, with a journal, checkpoint it.
+    """
+    record = build_record(ticker, info)
+    if journal:
+        journal.record_success(ticker, record)
+    return record
+
+
+class RunJournal:
+    def __init__(self, path):
+        self.path = path
+        # Only symbols are kept in memory; rows are read back from the file on demand
+        self.completed = set()
+        self.failed = {}
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            self._load()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _entries(self):
+        with open(self.path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-write leaves at most one torn line at the end
+                    continue
+
+    def _load(self):
+        for entry in self._entries():
+            ticker = entry["ticker"]
+            if entry["status"] == "ok":
+                self.completed.add(ticker)
+                self.failed.pop(ticker, None)
+            else:
+                self.failed[ticker] = entry["error"]
+
+    def _append(self, entry):
+        line = json.dumps(entry, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def pending(self, tickers):
+        """
+        Tickers that still need fetching: never attempted or failed last time.
+        """
+        return [ticker for ticker in tickers if ticker not in self.completed]
+
+    def record_success(self, ticker, record):
+        self._append({"ticker": ticker, "status": "ok", "record": record})
+        with self._lock:
+            self.completed.add(ticker)
+            self.failed.pop(ticker, None)
+
+    def record_failure(self, ticker, error):
+        self._append({"ticker": ticker, "status": "failed", "error": str(error)})
+        with self._lock:
+            self.failed[ticker] = str(error)
+
+    def records(self, tickers):
+        """
+        Journaled rows for `tickers`, in input order.
+        """
+        with self._lock:
+            self._file.flush()
+        wanted = set(tickers)
+        rows = {}
+        for entry in self._entries():
+            if entry["status"] == "ok" and entry["ticker"] in wanted:
+                rows[entry["ticker"]] = entry["record"]
+        return [rows[ticker] for ticker in tickers if ticker in rows]
+
+    def close(self):
+        with self._lock:
+            self._file.close()
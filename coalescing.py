@@ -0,0 +1,213 @@
+"""
+Request coalescing across threads and processes.
+
+Concurrent jobs on the same host (the nightly run, an ad-hoc script_v8 run,
+the pipeline) often want the same ticker at the same time. Passing one
+`Coalescer` to their fetch loops makes the first caller for a ticker the
+only one that hits the provider; everyone else waits for its response. The
+loops coalesce the whole rate-limited request with its retries, so waiters
+never hold a rate limiter token or a concurrency slot.
+`wrap` coalesces just a `fetch_info` function for other callers.
+
+Within a process, callers for the same key wait on the leader's event.
+Across processes, the leader holds a lease row in a shared SQLite file and
+writes the payload there when done; other processes poll the row and read
+the payload instead of fetching. Finished payloads are kept for
+`share_seconds`, so a job that asks shortly after still shares. If the
+leader fails or dies, its row is dropped (or its lease runs out) and the
+next waiter fetches. Coroutine fetchers wait with `asyncio.sleep`, so they
+never block the event loop.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from stock_fields import fetched_groups
+
+COALESCE_PATH = os.path.join(".cache", "inflight.sqlite")
+# Longer than a single request with yfinance's own timeouts, so a live leader keeps its lease
+LEASE_SECONDS = 60
+SHARE_SECONDS = 300
+POLL_SECONDS = 0.1
+
+LEASED = "leased"
+DONE = "done"
+
+
+class Coalescer:
+    def __init__(self, path=COALESCE_PATH, lease_seconds=LEASE_SECONDS, share_seconds=SHARE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.share_seconds = share_seconds
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{id(self)}"
+        self.fetched = 0
+        self.shared = 0
+        self.waited = 0.0
+        # key -> Event set when this process's leader for the key finishes
+        self._flights = {}
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Autocommit mode, so claims can take the write lock explicitly with BEGIN IMMEDIATE
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS flights (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT,
+                expires REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute("DELETE FROM flights WHERE expires < ?", (time.time(),))
+
+    def _claim(self, key):
+        """
+        Returns (DONE, payload) if the key was fetched recently, (LEASED, None) if
+        another process is fetching it, or (None, None) once this caller holds the lease.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            row = self._db.execute("SELECT status, payload, expires FROM flights WHERE key = ?", (key,)).fetchone()
+            if row and row[2] > now:
+                self._db.execute("COMMIT")
+                return row[0], json.loads(row[1]) if row[0] == DONE else None
+            self._db.execute(
+                "INSERT OR REPLACE INTO flights (key, owner, status, payload, expires) VALUES (?, ?, ?, NULL, ?)",
+                (key, self.owner, LEASED, now + self.lease_seconds),
+            )
+            self._db.execute("COMMIT")
+        return None, None
+
+    def _finish(self, key, payload):
+        """
+        Publish the leader's payload, or drop the lease after a failure so a waiter can take over.
+        """
+        with self._lock:
+            if payload is None:
+                self._db.execute("DELETE FROM flights WHERE key = ? AND owner = ?", (key, self.owner))
+            else:
+                self._db.execute(
+                    "UPDATE flights SET status = ?, payload = ?, expires = ? WHERE key = ? AND owner = ?",
+                    (DONE, json.dumps(payload), time.time() + self.share_seconds, key, self.owner),
+                )
+
+    @staticmethod
+    def key(fetch_info, ticker):
+        """
+        Coalescing key of `ticker` as fetched by `fetch_info`: the ticker and the field groups it returns.
+        """
+        return f"{'+'.join(fetched_groups(fetch_info))}:{ticker}"
+
+    def fetch(self, key, fetch):
+        """
+        `fetch()`'s result for `key`, calling it only if no other caller is fetching or has just fetched it.
+        """
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                event = self._flights.get(key)
+                leader = event is None
+                if leader:
+                    event = self._flights[key] = threading.Event()
+            if not leader:
+                # Another thread here is on it; then look at the row it left behind
+                event.wait()
+                continue
+            try:
+                status, payload = self._claim(key)
+                while status == LEASED:
+                    time.sleep(POLL_SECONDS)
+                    status, payload = self._claim(key)
+                if status == DONE:
+                    with self._lock:
+                        self.shared += 1
+                        self.waited += time.monotonic() - started
+                    return payload
+                try:
+                    payload = fetch()
+                except BaseException:
+                    self._finish(key, None)
+                    raise
+                self._finish(key, payload)
+                with self._lock:
+                    self.fetched += 1
+                return payload
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                event.set()
+
+    async def fetch_async(self, key, fetch):
+        """
+        `await fetch()`'s result for `key`, as `fetch` does for a plain function.
+        """
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                event = self._flights.get(key)
+                leader = event is None
+                if leader:
+                    event = self._flights[key] = threading.Event()
+            if not leader:
+                while not event.is_set():
+                    await asyncio.sleep(POLL_SECONDS)
+                continue
+            try:
+                # SQLite may wait up to its busy timeout for the write lock, so the
+                # lease calls run on the default executor instead of the event loop
+                status, payload = await loop.run_in_executor(None, self._claim, key)
+                while status == LEASED:
+                    await asyncio.sleep(POLL_SECONDS)
+                    status, payload = await loop.run_in_executor(None, self._claim, key)
+                if status == DONE:
+                    with self._lock:
+                        self.shared += 1
+                        self.waited += time.monotonic() - started
+                    return payload
+                try:
+                    payload = await fetch()
+                except BaseException:
+                    await loop.run_in_executor(None, self._finish, key, None)
+                    raise
+                await loop.run_in_executor(None, self._finish, key, payload)
+                with self._lock:
+                    self.fetched += 1
+                return payload
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                event.set()
+
+    def wrap(self, fetch_info):
+        """
+        Coalesced version of a `fetch_info(ticker)` function or coroutine function.
+        """
+        if asyncio.iscoroutinefunction(fetch_info):
+            @functools.wraps(fetch_info)
+            async def fetch(ticker):
+                return await self.fetch_async(self.key(fetch_info, ticker), lambda: fetch_info(ticker))
+        else:
+            @functools.wraps(fetch_info)
+            def fetch(ticker):
+                return self.fetch(self.key(fetch_info, ticker), lambda: fetch_info(ticker))
+
+        return fetch
+
+    def stats(self):
+        with self._lock:
+            return {"fetched": self.fetched, "shared": self.shared, "waited_seconds": round(self.waited, 3)}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
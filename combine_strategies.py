@@ -1,5 +1,7 @@
+import os
 import pandas as pd
 from datetime import datetime
+from stock_fields import read_snapshot
 
 # Strategy functions
 def contrarian_strategy(df):
@@ -154,7 +156,7 @@ def main():
         print(f"Input file {input_file} not found.")
         return
 
-    stock_data = pd.read_csv(input_file)
+    stock_data = read_snapshot(input_file)
     print("Loaded stock data.")
     combine_analysis(stock_data, output_file)
 
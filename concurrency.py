@@ -0,0 +1,236 @@
+"""
+Adaptive concurrency for the fetch pool.
+
+`AIMDController` keeps a congestion window: the number of requests allowed
+in flight. Until the first cut the window doubles every round (slow start);
+after that each success widens the window by about `increase` per window's
+worth of completions (additive increase); an HTTP 429, a timeout or a
+latency spike shrinks it by `decrease` (multiplicative decrease). Only
+requests issued after the last cut can trigger another one, so a burst of
+429s from the same round counts once. Within one slot of the window that
+was last cut, growth slows by `plateau` times, so the window dwells just
+under the limit it found instead of sawing straight back into it.
+
+One controller serves either threads (`acquire`) or a single event loop
+(`acquire_async`), not both at once.
+
+`backoff_delay` sizes the sleep before a retry from the controller's state.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from fetch_errors import is_throttled, is_timeout
+
+INITIAL_WINDOW = 5
+MIN_WINDOW = 1
+MAX_WINDOW = 64
+INCREASE = 1.0
+DECREASE = 0.7
+# Growth is this many times slower within one slot of the window that was last cut
+PLATEAU = 8
+# Cut the window when smoothed latency exceeds this multiple of the best observed
+LATENCY_FACTOR = 2.5
+LATENCY_SMOOTHING = 0.2
+
+
+class AIMDController:
+    def __init__(
+        self,
+        initial=INITIAL_WINDOW,
+        min_window=MIN_WINDOW,
+        max_window=MAX_WINDOW,
+        increase=INCREASE,
+        decrease=DECREASE,
+        latency_factor=LATENCY_FACTOR,
+        plateau=PLATEAU,
+    ):
+        self.min_window = min_window
+        self.max_window = max_window
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.plateau = plateau
+        self._window = float(initial)
+        # Window at the last cut
+        self._ceiling = None
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        # Futures of tasks waiting in `acquire_async`, woken in order one per free slot
+        self._waiters = deque()
+        self._next_ticket = 0
+        self._cut_ticket = 0
+        self.in_flight = 0
+        self.base_latency = None
+        self.smoothed_latency = None
+        self.successes = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.cuts = 0
+        self.history = [(time.monotonic(), int(self._window))]
+
+    def backoff_scale(self):
+        """
+        Share of the nominal retry backoff to wait: min_window / window.
+
+        The cut caused by the failure has already shed load, so while the
+        window is still wide a retry only waits a fraction of the backoff;
+        once the window has collapsed to `min_window` it waits the full backoff.
+        """
+        with self._lock:
+            return self.min_window / max(self._window, self.min_window)
+
+    @property
+    def window(self):
+        """
+        Current number of requests allowed in flight.
+        """
+        return int(self._window)
+
+    def try_acquire(self):
+        """
+        Take a slot if one is free; returns a ticket or None.
+        """
+        with self._lock:
+            if self.in_flight >= self.window:
+                return None
+            self.in_flight += 1
+            self._next_ticket += 1
+            return self._next_ticket
+
+    def acquire(self):
+        """
+        Block the calling thread until a slot is free; returns a ticket.
+        """
+        with self._condition:
+            while self.in_flight >= self.window:
+                self._condition.wait()
+            self.in_flight += 1
+            self._next_ticket += 1
+            return self._next_ticket
+
+    async def acquire_async(self):
+        """
+        Wait on the event loop until a slot is free; returns a ticket.
+        """
+        while True:
+            ticket = self.try_acquire()
+            if ticket is not None:
+                return ticket
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except BaseException:
+                # Cancelled after being woken: hand the wake-up on (cancelled waiters are skipped)
+                if not waiter.cancelled():
+                    self._wake(1)
+                raise
+
+    def release(self, ticket, latency=None, error=None):
+        """
+        Free a slot and feed the request's outcome back into the window.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if error is None:
+                self.successes += 1
+                if self._latency_spike(latency):
+                    self._cut(ticket)
+                else:
+                    self._grow()
+            elif is_throttled(error):
+                self.throttled += 1
+                self._cut(ticket)
+            elif is_timeout(error):
+                self.timeouts += 1
+                self._cut(ticket)
+            else:
+                # Plain failures (bad symbol, parse error) say nothing about capacity
+                self.errors += 1
+            self._condition.notify_all()
+            free = self.window - self.in_flight
+        self._wake(free)
+
+    def cancel(self, ticket):
+        """
+        Give back a slot that was never used for a request; the window is unchanged.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+            free = self.window - self.in_flight
+        self._wake(free)
+
+    def _wake(self, free):
+        """
+        Wake up to `free` tasks waiting in `acquire_async`.
+        """
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def _latency_spike(self, latency):
+        if latency is None:
+            return False
+        if self.base_latency is None or latency < self.base_latency:
+            self.base_latency = latency
+        if self.smoothed_latency is None:
+            self.smoothed_latency = latency
+        else:
+            self.smoothed_latency += LATENCY_SMOOTHING * (latency - self.smoothed_latency)
+        return self.smoothed_latency > self.latency_factor * self.base_latency
+
+    def _grow(self):
+        previous = self.window
+        if self.cuts == 0:
+            # Slow start: until the first cut, every success widens the window (doubling per round)
+            step = self.increase
+        else:
+            step = self.increase / max(self._window, 1.0)
+            if self._ceiling - 1 <= self._window < self._ceiling:
+                step /= self.plateau
+        self._window = min(self.max_window, self._window + step)
+        if self.window != previous:
+            self.history.append((time.monotonic(), self.window))
+
+    def _cut(self, ticket):
+        if ticket <= self._cut_ticket:
+            return
+        self._cut_ticket = self._next_ticket
+        self._ceiling = self._window
+        self._window = max(self.min_window, self._window * self.decrease)
+        # Forget the latency that triggered the cut so it is re-measured at the new window
+        self.smoothed_latency = None
+        self.cuts += 1
+        self.history.append((time.monotonic(), self.window))
+
+    def stats(self):
+        return {
+            "window": self.window,
+            "in_flight": self.in_flight,
+            "successes": self.successes,
+            "throttled": self.throttled,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "cuts": self.cuts,
+            "base_latency": round(self.base_latency, 4) if self.base_latency else None,
+        }
+
+
+def backoff_delay(delay, controller=None):
+    """
+    Seconds to sleep before a retry whose nominal backoff is `delay`.
+
+    Scaled by the controller's `backoff_scale` when there is one, and
+    jittered over the upper half, so retries of one burst of failures spread
+    out instead of arriving together or in step with a periodic limit.
+    """
+    if controller:
+        delay *= controller.backoff_scale()
+    return delay * random.uniform(0.5, 1.0)
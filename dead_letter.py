@@ -0,0 +1,145 @@
+"""
+Dead-letter store for tickers that could not be fetched.
+
+Every failure is recorded with its category (see
+`fetch_errors.classify_failure`). Retryable ones get another pass at the end
+of the run, with a longer backoff than the per-ticker retries. Symbols that
+come back "not found" run after run are flagged as likely delisted, so they
+can be dropped from the universe instead of costing a request every night.
+A flagged symbol is probed again once a week, so one that comes back
+(a relisting, or a symbol Yahoo briefly lost) is resolved rather than
+skipped forever.
+
+The store is a JSON file in Data/, committed alongside the snapshots like
+the freshness record, so CI runs see each other's history.
+
+List flagged symbols from the repository root:
+    python dead_letter.py
+"""
+
+import json
+import os
+import threading
+import time
+from fetch_errors import RETRYABLE, classify_failure
+
+DEAD_LETTER_PATH = os.path.join("Data", "dead_letters.json")
+# Runs a symbol has to be "not found" in, with no success in between, before it is flagged
+NOT_FOUND_RUNS = 3
+# How long a flagged symbol is skipped before it is probed again
+REPROBE_AFTER = 7 * 24 * 60 * 60
+RETRY_ROUNDS = 2
+RETRY_DELAY = 30
+
+
+class DeadLetterStore:
+    def __init__(self, path=DEAD_LETTER_PATH):
+        self.path = path
+        self.entries = {}
+        # Category of each ticker that failed during this run
+        self.run_failures = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                self.entries = json.load(file)
+
+    def record(self, ticker, error):
+        """
+        Store a ticker's final failure for this attempt; returns its category.
+        """
+        category = classify_failure(error)
+        now = time.time()
+        with self._lock:
+            entry = self.entries.setdefault(ticker, {"failures": 0, "not_found_runs": 0, "first_failed": now})
+            # Count each run once; only a successful fetch (resolve) ends the streak, since a
+            # throttled or timed-out attempt says nothing about whether the symbol exists
+            if category == "not_found" and self.run_failures.get(ticker) != "not_found":
+                entry["not_found_runs"] += 1
+            entry.update(category=category, error=str(error)[:500], last_failed=now, failures=entry["failures"] + 1)
+            self.run_failures[ticker] = category
+        return category
+
+    def resolve(self, ticker):
+        """
+        Forget a ticker once it has been fetched successfully.
+        """
+        with self._lock:
+            self.entries.pop(ticker, None)
+            self.run_failures.pop(ticker, None)
+
+    def retryable(self):
+        """
+        Tickers that failed this run with a category worth retrying.
+        """
+        with self._lock:
+            return [ticker for ticker, category in self.run_failures.items() if category in RETRYABLE]
+
+    def flagged(self, not_found_runs=NOT_FOUND_RUNS):
+        """
+        Symbols reported not found in at least `not_found_runs` runs with no successful fetch since.
+        """
+        with self._lock:
+            return sorted(ticker for ticker, entry in self.entries.items() if entry["not_found_runs"] >= not_found_runs)
+
+    def active(self, tickers, not_found_runs=NOT_FOUND_RUNS, reprobe_after=REPROBE_AFTER, now=None):
+        """
+        `tickers` without the flagged symbols, except those last tried more than
+        `reprobe_after` seconds ago; a failed re-probe skips them for another interval.
+        """
+        now = now or time.time()
+        flagged = set(self.flagged(not_found_runs))
+        with self._lock:
+            reprobe = {ticker for ticker in flagged if now - self.entries[ticker]["last_failed"] > reprobe_after}
+        skipped = flagged - reprobe
+        if flagged:
+            print(
+                f"Dead letters: skipping {len(skipped & set(tickers))} symbols flagged as not found, "
+                f"probing {len(reprobe & set(tickers))} again"
+            )
+        return [ticker for ticker in tickers if ticker not in skipped]
+
+    def summary(self):
+        with self._lock:
+            categories = {}
+            for category in self.run_failures.values():
+                categories[category] = categories.get(category, 0) + 1
+            return {"failed_this_run": categories, "stored": len(self.entries)}
+
+    def save(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(self.entries, file, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+
+def retry_dead_letters(dead_letters, fetch_many, rounds=RETRY_ROUNDS, delay=RETRY_DELAY, deadline=None):
+    """
+    End-of-run retry: refetch this run's retryable failures with `fetch_many(tickers)`.
+
+    Waits `delay` seconds before the first round and doubles it each round,
+    so throttling has time to clear. Fetchers resolve the tickers that succeed.
+    Rounds whose wait would run past the monotonic `deadline` are skipped.
+    """
+    for number in range(1, rounds + 1):
+        pending = dead_letters.retryable()
+        if not pending:
+            break
+        if deadline and time.monotonic() + delay > deadline:
+            print(f"Time budget used up; not retrying {len(pending)} failed tickers")
+            break
+        print(f"Retrying {len(pending)} failed tickers in {delay}s (round {number}/{rounds})")
+        time.sleep(delay)
+        fetch_many(pending)
+        delay *= 2
+    print(f"Dead letters: {dead_letters.summary()}")
+
+
+if __name__ == "__main__":
+    store = DeadLetterStore()
+    flagged = store.flagged()
+    print(f"{len(store.entries)} symbols in {store.path}, {len(flagged)} flagged as not found:")
+    for ticker in flagged:
+        print(f"  {ticker}: {store.entries[ticker]['error']}")
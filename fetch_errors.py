@@ -0,0 +1,75 @@
+"""
+Helpers for telling fetch failures apart.
+
+yfinance, requests and the stand-in clients all raise different exception
+types, so these checks look at the status code when there is one and fall
+back to the message text.
+"""
+
+import asyncio
+import socket
+
+
+class SymbolNotFound(LookupError):
+    """
+    The provider answered but has no data for a symbol; classified like an HTTP 404.
+    """
+
+    status = 404
+
+
+def status_code(exc):
+    """
+    HTTP status carried by an exception, or None.
+    """
+    status = getattr(exc, "status", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def is_throttled(exc):
+    if status_code(exc) == 429 or type(exc).__name__ == "YFRateLimitError":
+        return True
+    message = str(exc)
+    return "429" in message or "Too Many Requests" in message or "Rate limited" in message
+
+
+def is_timeout(exc):
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError, socket.timeout)):
+        return True
+    return "timed out" in str(exc).lower()
+
+
+def classify_failure(exc):
+    """
+    Coarse failure category for metrics and retry decisions.
+    """
+    if is_throttled(exc):
+        return "throttled"
+    if is_timeout(exc):
+        return "timeout"
+    status = status_code(exc)
+    if status == 404 or "404" in str(exc) or "Not Found" in str(exc):
+        return "not_found"
+    if status is not None and status >= 500:
+        return "server_error"
+    if status is not None and status >= 400:
+        return "client_error"
+    if isinstance(exc, (ConnectionError, OSError)):
+        return "connection"
+    if isinstance(exc, (ValueError, KeyError, TypeError)):
+        return "bad_payload"
+    return "other"
+
+
+# Failure categories worth another attempt later in the same run
+RETRYABLE = {"throttled", "timeout", "server_error", "connection", "other"}
+
+
+def is_retryable(exc):
+    """
+    False for failures a retry cannot fix, such as an unknown symbol or a malformed payload.
+    """
+    return classify_failure(exc) in RETRYABLE
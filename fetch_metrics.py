@@ -0,0 +1,173 @@
+"""
+Per-request metrics for fetch runs.
+
+The fetchers report every request attempt, limiter wait, backoff sleep and
+final failure to a `FetchMetrics` object. At the end of a run `write` saves
+a JSON summary and the same numbers in Prometheus text format, so a slow run
+can be split into time spent throttled, waiting on responses and sleeping.
+
+Bytes are the size of the decoded JSON payload; yfinance does not expose
+the bytes on the wire.
+"""
+
+import json
+import os
+import statistics
+import threading
+import time
+from collections import Counter
+from fetch_errors import classify_failure
+
+METRICS_DIR = os.path.join(".cache", "metrics")
+# Upper bounds, in seconds, of the Prometheus latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def metrics_path(run_name):
+    return os.path.join(METRICS_DIR, f"{run_name}.json")
+
+
+def percentile(values, q):
+    """
+    q-th percentile (1-99) of `values`, or None when there are none.
+    """
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def payload_bytes(payload):
+    return len(json.dumps(payload, default=str).encode())
+
+
+class FetchMetrics:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.latencies = []
+        self.bytes_received = 0
+        self.retries = 0
+        self.backoff_seconds = 0.0
+        self.limiter_wait_seconds = 0.0
+        # Every failed attempt, and every ticker that failed for good, by category
+        self.errors = Counter()
+        self.failures = Counter()
+        self.tickers = Counter()
+        # How many retries each finished ticker needed: {retries: tickers}
+        self.retries_per_ticker = Counter()
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.limiter_wait_seconds += seconds
+
+    def record_request(self, latency, payload=None, error=None):
+        """
+        One request attempt: its latency and either the payload or the error.
+        """
+        with self._lock:
+            self.latencies.append(latency)
+            if error is not None:
+                self.errors[classify_failure(error)] += 1
+            elif payload is not None:
+                self.bytes_received += payload_bytes(payload)
+
+    def record_backoff(self, seconds):
+        with self._lock:
+            self.retries += 1
+            self.backoff_seconds += seconds
+
+    def record_ticker(self, status, retries=0, error=None):
+        """
+        A ticker's outcome: "ok", "cached" or "failed".
+        """
+        with self._lock:
+            self.tickers[status] += 1
+            if status != "cached":
+                self.retries_per_ticker[retries] += 1
+            if error is not None:
+                self.failures[classify_failure(error)] += 1
+
+    def summary(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            return {
+                "elapsed_seconds": round(time.monotonic() - self.started, 3),
+                "requests": len(latencies),
+                "tickers": dict(self.tickers),
+                "latency_seconds": {
+                    "p50": percentile(latencies, 50),
+                    "p95": percentile(latencies, 95),
+                    "p99": percentile(latencies, 99),
+                    "max": latencies[-1] if latencies else None,
+                    "sum": sum(latencies),
+                },
+                "retries": self.retries,
+                "retries_per_ticker": {str(n): count for n, count in sorted(self.retries_per_ticker.items())},
+                "backoff_seconds": round(self.backoff_seconds, 3),
+                "limiter_wait_seconds": round(self.limiter_wait_seconds, 3),
+                "bytes_received": self.bytes_received,
+                "errors": dict(self.errors),
+                "failures": dict(self.failures),
+            }
+
+    def to_prometheus(self, prefix="stock_fetch"):
+        with self._lock:
+            latencies = list(self.latencies)
+            lines = [
+                f"# HELP {prefix}_request_seconds Latency of individual fetch requests.",
+                f"# TYPE {prefix}_request_seconds histogram",
+            ]
+            for bound in self.buckets:
+                count = sum(1 for latency in latencies if latency <= bound)
+                lines.append(f'{prefix}_request_seconds_bucket{{le="{bound}"}} {count}')
+            lines += [
+                f'{prefix}_request_seconds_bucket{{le="+Inf"}} {len(latencies)}',
+                f"{prefix}_request_seconds_sum {sum(latencies)}",
+                f"{prefix}_request_seconds_count {len(latencies)}",
+            ]
+            counters = [
+                ("retries_total", "Retried request attempts.", self.retries),
+                ("backoff_seconds_total", "Time spent sleeping between retries.", self.backoff_seconds),
+                ("limiter_wait_seconds_total", "Time spent waiting on the rate limiter.", self.limiter_wait_seconds),
+                ("response_bytes_total", "Decoded payload bytes received.", self.bytes_received),
+            ]
+            for name, help_text, value in counters:
+                lines += [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} counter", f"{prefix}_{name} {value}"]
+            labelled = [
+                ("errors_total", "Failed request attempts by category.", "reason", self.errors),
+                ("failures_total", "Tickers that failed for good, by category.", "reason", self.failures),
+                ("tickers_total", "Tickers by outcome.", "status", self.tickers),
+            ]
+            for name, help_text, label, counts in labelled:
+                lines += [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} counter"]
+                lines += [f'{prefix}_{name}{{{label}="{key}"}} {value}' for key, value in sorted(counts.items())]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Save the JSON summary to `path` and the Prometheus text next to it as `.prom`.
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.summary(), file, indent=2)
+        with open(os.path.splitext(path)[0] + ".prom", "w", encoding="utf-8") as file:
+            file.write(self.to_prometheus())
+
+    def report(self):
+        """
+        One-line summary for the end-of-run log.
+        """
+        summary = self.summary()
+        latency = summary["latency_seconds"]
+        if not summary["requests"]:
+            return f"{summary['tickers']}, no requests"
+        return (
+            f"{summary['tickers']}, {summary['requests']} requests, "
+            f"p50 {latency['p50']:.3f}s p95 {latency['p95']:.3f}s p99 {latency['p99']:.3f}s, "
+            f"{summary['retries']} retries ({summary['backoff_seconds']:.1f}s backoff), "
+            f"{summary['limiter_wait_seconds']:.1f}s limiter wait, errors {summary['errors']}"
+        )
@@ -0,0 +1,127 @@
+"""
+Record real `.info` payloads once and replay them offline.
+
+`record_fixtures` fetches each ticker through the normal rate limiter and
+writes one JSON line per ticker with the payload and how long the call
+took. `load_fixtures` reads them back for `stand_in_server.start_server`,
+and the recorded latencies can drive `stand_in_server.replay_latency`.
+`record_ticks` does the same for the pricing websocket, for
+`stand_in_server.start_stream_server` to replay.
+
+Record from the repository root:
+    python fixtures.py --exchange NYSE --count 200
+    python fixtures.py --exchange NYSE --count 200 --ticks 300
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import yfinance as yf
+from rate_limiter import get_shared_limiter
+from stock_fields import get_info
+
+FIXTURE_PATH = os.path.join("Benchmarks", "fixtures", "info.jsonl")
+TICK_FIXTURE_PATH = os.path.join("Benchmarks", "fixtures", "ticks.jsonl")
+
+
+def record_fixtures(tickers, path=FIXTURE_PATH, fetch_info=get_info, limiter=None):
+    """
+    Fetch each ticker once and append {"ticker", "latency", "info"} lines to `path`.
+
+    Failed tickers are skipped; returns the number of payloads written.
+    """
+    limiter = limiter or get_shared_limiter()
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    written = 0
+    with open(path, "a", encoding="utf-8") as file:
+        for index, ticker in enumerate(tickers, start=1):
+            print(f"Recording {ticker} ({index}/{len(tickers)})")
+            limiter.acquire()
+            start_time = time.monotonic()
+            try:
+                info = fetch_info(ticker)
+            except Exception as e:
+                print(f"Failed to record {ticker}: {e}")
+                continue
+            latency = time.monotonic() - start_time
+            file.write(json.dumps({"ticker": ticker, "latency": latency, "info": info}, default=str) + "\n")
+            written += 1
+    return written
+
+
+def load_fixtures(path=FIXTURE_PATH):
+    """
+    Read recorded fixtures; returns ({ticker: info}, [latency, ...]).
+    """
+    payloads = {}
+    latencies = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            entry = json.loads(line)
+            payloads[entry["ticker"]] = entry["info"]
+            latencies.append(entry["latency"])
+    return payloads, latencies
+
+
+def record_ticks(tickers, path=TICK_FIXTURE_PATH, seconds=300):
+    """
+    Subscribe to `tickers` on the pricing websocket and append each decoded message to `path` for `seconds`.
+
+    Returns the number of messages written.
+    """
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    written = 0
+
+    async def record(file):
+        nonlocal written
+
+        def write(message):
+            nonlocal written
+            file.write(json.dumps(message) + "\n")
+            written += 1
+
+        socket = yf.AsyncWebSocket(verbose=False)
+        await socket.subscribe(tickers)
+        try:
+            await asyncio.wait_for(socket.listen(write), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            await socket.close()
+
+    with open(path, "a", encoding="utf-8") as file:
+        asyncio.run(record(file))
+    return written
+
+
+def load_ticks(path=TICK_FIXTURE_PATH):
+    """
+    Read recorded pricing messages, in arrival order.
+    """
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file]
+
+
+if __name__ == "__main__":
+    from script_v8 import get_tickers
+
+    parser = argparse.ArgumentParser(description="Record live .info payloads for offline replay.")
+    parser.add_argument("--exchange", default="NYSE")
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--path", default=None)
+    parser.add_argument("--ticks", type=float, default=None, help="record this many seconds of pricing ticks instead")
+    args = parser.parse_args()
+
+    tickers = get_tickers(args.exchange)[: args.count]
+    if args.ticks:
+        path = args.path or TICK_FIXTURE_PATH
+        count = record_ticks(tickers, path=path, seconds=args.ticks)
+        print(f"Recorded {count} ticks to {path}")
+    else:
+        path = args.path or FIXTURE_PATH
+        count = record_fixtures(tickers, path=path)
+        print(f"Recorded {count} payloads to {path}")
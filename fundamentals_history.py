@@ -0,0 +1,267 @@
+"""
+Delta-encoded history of daily snapshots.
+
+Most of a snapshot's columns do not change from one day to the next, so the
+history keeps one full base snapshot per month and, for every other day,
+only the cells that changed since the day before:
+    Data/fundamentals/nyse_daily_stock_data/base_2024-11-01.parquet
+    Data/fundamentals/nyse_daily_stock_data/delta_2024-11-04.parquet
+A delta is a long table of (Symbol, Column, Number, Text) rows: numbers
+(dates as epoch seconds) go in Number, text in Text, and a cell that became
+empty has neither. Symbols that join or leave the universe get an `ADDED`
+or `REMOVED` row. Any day is rebuilt from its month's base plus at most a
+month of deltas, and one symbol's column over time only reads the matching
+delta rows.
+
+Rebuild a day's snapshot from the repository root:
+    python fundamentals_history.py --dataset nyse_daily_stock_data --date 2024-11-22 --output out.csv
+"""
+
+import argparse
+import glob
+import os
+import numpy as np
+import pandas as pd
+from stock_fields import CATEGORY, COLUMNS, DATE, INT64, NUMERIC_DTYPES, SCHEMA, conform_frame, read_snapshot
+
+FUNDAMENTALS_DIR = os.path.join("Data", "fundamentals")
+COMPRESSION = "zstd"
+ADDED = "+"
+REMOVED = "-"
+VALUE_COLUMNS = COLUMNS[1:]
+
+
+def plain_column(series, dtype):
+    """
+    Storage form of a schema column: float64 (NaN for missing) for numbers and dates, objects (None) for text.
+    """
+    if dtype == DATE:
+        values = np.full(len(series), np.nan)
+        present = series.notna().to_numpy()
+        values[present] = series[present].astype("datetime64[s]").astype(np.int64).to_numpy()
+        return values
+    if dtype in NUMERIC_DTYPES:
+        return series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return series.astype(object).where(series.notna(), None).to_numpy()
+
+
+def typed_from_plain(values, dtype):
+    """
+    Schema column back from its storage form.
+    """
+    if dtype == DATE:
+        return pd.to_datetime(values, unit="s").as_unit("s")
+    if dtype == INT64:
+        return pd.array(np.where(np.isnan(values), None, values), dtype=INT64)
+    if dtype in NUMERIC_DTYPES:
+        return values.astype(dtype)
+    if dtype == CATEGORY:
+        return pd.Categorical(values)
+    return list(values)
+
+
+def unchanged(old, new):
+    """
+    Element-wise: same value, or missing on both sides.
+    """
+    if old.dtype == object:
+        return (old == new) | (pd.isna(old) & pd.isna(new))
+    return (old == new) | (np.isnan(old) & np.isnan(new))
+
+
+def apply_delta(symbols, values, delta):
+    """
+    Storage-form state (symbols, {column: array}) with one day's delta rows applied.
+    """
+    columns = delta["Column"].astype(CATEGORY).array
+    changed = delta["Symbol"].astype(object).to_numpy()
+    kinds = np.asarray(columns.categories, dtype=object)[columns.codes]
+    keep = ~pd.Index(symbols).isin(changed[kinds == REMOVED])
+    # New rows start empty; their values follow in the same delta
+    added = changed[kinds == ADDED]
+    symbols = np.concatenate([symbols[keep], added])
+    values = {
+        column: np.concatenate([array[keep], np.full(len(added), None if array.dtype == object else np.nan, dtype=array.dtype)])
+        for column, array in values.items()
+    }
+    rows = pd.Index(symbols).get_indexer(changed)
+    numbers = delta["Number"].to_numpy(dtype=np.float64, na_value=np.nan)
+    texts = delta["Text"].astype(object).where(delta["Text"].notna(), None).to_numpy()
+    # One pass over the rows grouped by column, rather than a comparison per column
+    order = np.argsort(columns.codes, kind="stable")
+    bounds = np.searchsorted(columns.codes[order], np.arange(len(columns.categories) + 1))
+    for code, column in enumerate(columns.categories):
+        if column in (ADDED, REMOVED):
+            continue
+        cells = order[bounds[code]:bounds[code + 1]]
+        values[column][rows[cells]] = numbers[cells] if SCHEMA[column] in NUMERIC_DTYPES else texts[cells]
+    return symbols, values
+
+
+class FundamentalsHistory:
+    def __init__(self, dataset="nyse_daily_stock_data", directory=FUNDAMENTALS_DIR):
+        self.dataset = dataset
+        self.directory = os.path.join(directory, dataset)
+
+    def _files(self, kind):
+        """
+        {ISO date: path} of the base or delta files.
+        """
+        paths = glob.glob(os.path.join(self.directory, f"{kind}_????-??-??.parquet"))
+        return {os.path.basename(path)[len(kind) + 1:-len(".parquet")]: path for path in paths}
+
+    def dates(self):
+        """
+        Every stored date, oldest first.
+        """
+        return sorted({*self._files("base"), *self._files("delta")})
+
+    def _chain(self, day):
+        """
+        (base date, [delta dates]) needed to rebuild the snapshot as of `day`.
+        """
+        bases = [base for base in sorted(self._files("base")) if base <= day]
+        if not bases:
+            raise KeyError(f"No snapshot stored on or before {day}")
+        deltas = [delta for delta in sorted(self._files("delta")) if bases[-1] < delta <= day]
+        return bases[-1], deltas
+
+    def _state(self, day):
+        """
+        (symbols, {column: storage-form array}) as of `day`.
+        """
+        base, deltas = self._chain(day)
+        snapshot = read_snapshot(os.path.join(self.directory, f"base_{base}.parquet"))
+        symbols = snapshot["Symbol"].astype(object).to_numpy()
+        values = {column: plain_column(snapshot[column], SCHEMA[column]) for column in VALUE_COLUMNS}
+        for delta in deltas:
+            symbols, values = apply_delta(symbols, values, pd.read_parquet(os.path.join(self.directory, f"delta_{delta}.parquet")))
+        return symbols, values
+
+    def snapshot(self, day=None):
+        """
+        The snapshot as of `day` (default the latest stored date), in schema dtypes.
+        """
+        day = day or self.dates()[-1]
+        symbols, values = self._state(day)
+        columns = {"Symbol": list(symbols)}
+        for column in VALUE_COLUMNS:
+            columns[column] = typed_from_plain(values[column], SCHEMA[column])
+        return pd.DataFrame(columns)
+
+    def append(self, df, day):
+        """
+        Record `df` as the snapshot for ISO date `day`; returns the path written.
+
+        The first day stored in a month becomes a full base; other days store
+        the cells that changed since the previous stored day. Rewriting the
+        latest day is allowed (a rerun), earlier days are not.
+        """
+        dates = [stored for stored in self.dates() if stored != day]
+        if dates and dates[-1] > day:
+            raise ValueError(f"Cannot append {day} before the latest stored date {dates[-1]}")
+        os.makedirs(self.directory, exist_ok=True)
+        df = conform_frame(df.drop_duplicates("Symbol").reset_index(drop=True))
+        if not dates or dates[-1][:7] != day[:7]:
+            kind, stale = "base", "delta"
+            table = df
+        else:
+            kind, stale = "delta", "base"
+            table = self.encode(self._state(dates[-1]), df)
+        path = os.path.join(self.directory, f"{kind}_{day}.parquet")
+        table.to_parquet(f"{path}.tmp", index=False, compression=COMPRESSION)
+        os.replace(f"{path}.tmp", path)
+        # A rerun may store the day in the other form than before
+        stale_path = os.path.join(self.directory, f"{stale}_{day}.parquet")
+        if os.path.exists(stale_path):
+            os.remove(stale_path)
+        return path
+
+    @staticmethod
+    def encode(previous, df):
+        """
+        Delta rows turning the storage-form state `previous` into the schema frame `df`.
+        """
+        previous_symbols, previous_values = previous
+        symbols = df["Symbol"].astype(object).to_numpy()
+        rows = pd.Index(previous_symbols).get_indexer(symbols)
+        is_new = rows < 0
+        parts = [
+            pd.DataFrame({"Symbol": previous_symbols[~pd.Index(previous_symbols).isin(symbols)], "Column": REMOVED}),
+            pd.DataFrame({"Symbol": symbols[is_new], "Column": ADDED}),
+        ]
+        for column in VALUE_COLUMNS:
+            new = plain_column(df[column], SCHEMA[column])
+            old = previous_values[column][rows]
+            old[is_new] = None if old.dtype == object else np.nan
+            changed = ~unchanged(old, new)
+            if not changed.any():
+                continue
+            part = pd.DataFrame({"Symbol": symbols[changed], "Column": column})
+            if SCHEMA[column] in NUMERIC_DTYPES:
+                part["Number"] = new[changed]
+            else:
+                part["Text"] = pd.array(new[changed], dtype=pd.StringDtype())
+            parts.append(part)
+        delta = pd.concat(parts, ignore_index=True).reindex(columns=["Symbol", "Column", "Number", "Text"])
+        delta["Symbol"] = delta["Symbol"].astype(CATEGORY)
+        delta["Column"] = delta["Column"].astype(CATEGORY)
+        delta["Number"] = delta["Number"].astype(np.float64)
+        delta["Text"] = delta["Text"].astype(pd.StringDtype())
+        return delta
+
+    def series(self, column, symbol):
+        """
+        `symbol`'s `column` on every stored date, as a Series indexed by date (missing while it was not listed).
+        """
+        dtype = SCHEMA[column]
+        bases = self._files("base")
+        deltas = self._files("delta")
+        value, listed = np.nan, False
+        dates, values = [], []
+        for day in self.dates():
+            if day in bases:
+                row = read_snapshot(bases[day], columns=["Symbol", column], filters=[("Symbol", "==", symbol)])
+                listed = len(row) > 0
+                value = plain_column(row[column], dtype)[0] if listed else np.nan
+            else:
+                changes = pd.read_parquet(deltas[day], filters=[("Symbol", "==", symbol), ("Column", "in", [column, ADDED, REMOVED])])
+                for kind, number, text in zip(changes["Column"].astype(object), changes["Number"], changes["Text"].astype(object)):
+                    if kind == REMOVED:
+                        value, listed = np.nan, False
+                    elif kind == ADDED:
+                        listed = True
+                    else:
+                        value = number if dtype in NUMERIC_DTYPES else (None if pd.isna(text) else text)
+            dates.append(pd.Timestamp(day))
+            values.append(value if listed else (np.nan if dtype in NUMERIC_DTYPES else None))
+        plain = np.array(values, dtype=np.float64 if dtype in NUMERIC_DTYPES else object)
+        return pd.Series(typed_from_plain(plain, dtype), index=pd.DatetimeIndex(dates, name="Date"), name=column)
+
+
+def restore_latest(history, store):
+    """
+    Path of the newest snapshot of `history`'s dataset in `store`, rebuilding it
+    from the history first if the store is behind (as on a fresh CI checkout,
+    which only carries the history). None if neither has one.
+    """
+    dates = history.dates()
+    latest = store.latest(history.dataset)
+    if dates and (latest is None or latest < dates[-1]):
+        return store.write(history.snapshot(dates[-1]), history.dataset, dates[-1])
+    return store.latest_path(history.dataset)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild a stored day's snapshot from the delta history.")
+    parser.add_argument("--dataset", default="nyse_daily_stock_data")
+    parser.add_argument("--date", default=None, help="ISO date (default: the latest)")
+    parser.add_argument("--output", required=True, help="file name ending in .csv or .parquet")
+    args = parser.parse_args()
+
+    snapshot = FundamentalsHistory(args.dataset).snapshot(args.date)
+    if args.output.endswith(".parquet"):
+        snapshot.to_parquet(args.output, index=False)
+    else:
+        snapshot.to_csv(args.output, index=False)
+    print(f"Wrote {len(snapshot)} rows to {args.output}")
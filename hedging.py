@@ -0,0 +1,209 @@
+"""
+Hedged requests for slow `.info` calls.
+
+A few `.info` calls hang for tens of seconds and hold a pool worker the
+whole time. A `HedgePolicy` wraps `fetch_info`: if a request is still
+outstanding after the `percentile`-th percentile of recently observed
+latencies, one duplicate is sent and whichever succeeds first is used.
+
+Duplicates are capped at `budget` times the number of requests, and a
+duplicate is only sent if the rate limiter (the shared one by default) has a
+slot free right away, so hedging never queues behind (or adds to) throttled
+traffic. With an AIMD `controller`, the duplicate also needs a free slot in
+its window and reports its latency or error back like any other request. Coroutine fetchers are hedged with tasks on the running loop and
+the losing task is cancelled; a losing thread is left to finish in the
+background and its result is dropped.
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from fetch_metrics import percentile
+from rate_limiter import get_shared_limiter
+
+HEDGE_PERCENTILE = 95
+# At most this many duplicates per request, overall
+HEDGE_BUDGET = 0.1
+# No hedging until this many latencies have been observed
+MIN_SAMPLES = 20
+LATENCY_WINDOW = 500
+# Primaries, hedges and abandoned slow requests all run here
+MAX_HEDGE_WORKERS = 64
+
+
+class HedgePolicy:
+    def __init__(
+        self,
+        percentile=HEDGE_PERCENTILE,
+        budget=HEDGE_BUDGET,
+        min_samples=MIN_SAMPLES,
+        limiter=None,
+        max_workers=MAX_HEDGE_WORKERS,
+        controller=None,
+    ):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.limiter = limiter or get_shared_limiter()
+        self.controller = controller
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+
+    def threshold(self):
+        """
+        Seconds to wait before hedging, or None while there are too few samples.
+        """
+        with self._lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            latencies = sorted(self.latencies)
+        return percentile(latencies, self.percentile)
+
+    def _may_hedge(self):
+        """
+        (allowed, controller ticket): whether a duplicate may be sent right now, and its slot in the controller's window.
+        """
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.requests:
+                return False, None
+            ticket = self.controller.try_acquire() if self.controller else None
+            if self.controller and ticket is None:
+                return False, None
+            if not self.limiter.try_acquire():
+                if ticket is not None:
+                    self.controller.cancel(ticket)
+                return False, None
+            self.hedges += 1
+            return True, ticket
+
+    def _timed(self, fetch_info, ticker, ticket=None):
+        started = time.monotonic()
+        try:
+            info = fetch_info(ticker)
+        except Exception as e:
+            if ticket is not None:
+                self.controller.release(ticket, error=e)
+            raise
+        latency = time.monotonic() - started
+        if ticket is not None:
+            self.controller.release(ticket, latency=latency)
+        with self._lock:
+            self.latencies.append(latency)
+        return info
+
+    async def _timed_async(self, fetch_info, ticker, ticket=None):
+        started = time.monotonic()
+        try:
+            info = await fetch_info(ticker)
+        except asyncio.CancelledError:
+            # The loser of a race; its slot goes back without a verdict on capacity
+            if ticket is not None:
+                self.controller.cancel(ticket)
+            raise
+        except Exception as e:
+            if ticket is not None:
+                self.controller.release(ticket, error=e)
+            raise
+        latency = time.monotonic() - started
+        if ticket is not None:
+            self.controller.release(ticket, latency=latency)
+        with self._lock:
+            self.latencies.append(latency)
+        return info
+
+    def fetch(self, fetch_info, ticker):
+        """
+        `fetch_info(ticker)`, hedged with one duplicate if it runs past the threshold.
+        """
+        with self._lock:
+            self.requests += 1
+        primary = self._executor.submit(self._timed, fetch_info, ticker)
+        threshold = self.threshold()
+        if threshold is None or wait([primary], timeout=threshold).done:
+            return primary.result()
+        allowed, ticket = self._may_hedge()
+        if not allowed:
+            return primary.result()
+        hedge = self._executor.submit(self._timed, fetch_info, ticker, ticket)
+        pending = {primary, hedge}
+        # First success wins; an error only counts once the other request has failed too
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+        return primary.result()
+
+    async def fetch_async(self, fetch_info, ticker):
+        """
+        `await fetch_info(ticker)`, hedged with one duplicate task if it runs past the threshold.
+        """
+        with self._lock:
+            self.requests += 1
+        primary = asyncio.ensure_future(self._timed_async(fetch_info, ticker))
+        threshold = self.threshold()
+        if threshold is None:
+            return await primary
+        done, _ = await asyncio.wait([primary], timeout=threshold)
+        if done:
+            return await primary
+        allowed, ticket = self._may_hedge()
+        if not allowed:
+            return await primary
+        hedge = asyncio.ensure_future(self._timed_async(fetch_info, ticker, ticket))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            with self._lock:
+                                self.hedge_wins += 1
+                        return task.result()
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def wrap(self, fetch_info):
+        """
+        Hedged version of a `fetch_info(ticker)` function or coroutine function.
+        """
+        if asyncio.iscoroutinefunction(fetch_info):
+            @functools.wraps(fetch_info)
+            async def fetch(ticker):
+                return await self.fetch_async(fetch_info, ticker)
+        else:
+            @functools.wraps(fetch_info)
+            def fetch(ticker):
+                return self.fetch(fetch_info, ticker)
+
+        if hasattr(fetch_info, "narrow"):
+            # A narrowed fetch stays hedged
+            fetch.narrow = lambda groups: self.wrap(fetch_info.narrow(groups))
+        return fetch
+
+    def stats(self):
+        threshold = self.threshold()
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "threshold_seconds": round(threshold, 3) if threshold is not None else None,
+            }
+
+    def close(self):
+        # Abandoned requests finish on their own; nothing waits for them
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,194 @@
+"""
+Incremental refresh against the previous snapshot.
+
+A per-symbol freshness record for each dataset (`Data/freshness/<dataset>.json`,
+committed next to the snapshots so CI runs see it) remembers when each symbol was last fetched and
+whether that fetch worked. A symbol is refetched when its row is older than
+`max_age`, its last fetch failed, it is new, or an ex-dividend or earnings
+date has passed since it was fetched. Every other row is carried forward
+from the previous snapshot, with only its quote columns refreshed through
+the batched quote endpoint.
+"""
+
+import glob
+import json
+import os
+import re
+import time
+from collections import Counter
+import pandas as pd
+import pyarrow.parquet as pq
+from quote_batch import QUOTE_COLUMNS, fetch_quotes, quote_records
+from record_sink import in_order, unfetched_tickers
+from response_cache import TTLS
+from stock_fields import FUNDAMENTALS, NUMERIC_DTYPES, SCHEMA, conform_frame, frame_from_records, read_snapshot
+
+FRESHNESS_DIR = os.path.join("Data", "freshness")
+# A carried row is trusted as long as its cached fundamentals would be
+MAX_AGE = TTLS[FUNDAMENTALS]
+# Refetch on the day of an event, not only after it
+EVENT_LEAD = 24 * 60 * 60
+EVENT_COLUMNS = ("Ex-Dividend Date", "Earnings Date")
+# Quote columns worth overlaying on carried rows; names and currencies do not move daily
+CARRIED_QUOTE_COLUMNS = [column for column in QUOTE_COLUMNS if SCHEMA[column] in NUMERIC_DTYPES]
+# Columns a file needs to count as a snapshot; the older OHLCV dumps in Data/ share the name pattern
+SNAPSHOT_COLUMNS = ("Symbol", "Market Cap")
+
+
+def freshness_path(dataset):
+    """
+    Path of the freshness record for `dataset`; each entry point keeps its own.
+    """
+    return os.path.join(FRESHNESS_DIR, f"{dataset}.json")
+
+
+def load_freshness(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_freshness(freshness, path):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temp file and swap, so a crash never leaves a half-written record
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(freshness, file)
+    os.replace(temp_path, path)
+
+
+def is_snapshot(path):
+    """
+    Whether the CSV or Parquet file at `path` has the `SNAPSHOT_COLUMNS`, judged from its header alone.
+    """
+    if path.endswith(".parquet"):
+        names = pq.read_schema(path).names
+    else:
+        names = pd.read_csv(path, nrows=0).columns
+    return all(column in names for column in SNAPSHOT_COLUMNS)
+
+
+def latest_snapshot(pattern=os.path.join("Data", "nyse_daily_stock_data_*.csv")):
+    """
+    Newest snapshot matching `pattern` (by the date in its name), or None.
+    Files without the snapshot columns are skipped.
+    """
+    for path in reversed(sorted(glob.glob(pattern))):
+        if is_snapshot(path):
+            return path
+    return None
+
+
+def snapshot_time(path):
+    """
+    Epoch seconds of the date in a snapshot's file name, or its modification time.
+    """
+    match = re.search(r"\d{4}-\d{2}-\d{2}", os.path.basename(path))
+    if match:
+        return pd.Timestamp(match.group()).timestamp()
+    return os.path.getmtime(path)
+
+
+def plan_refresh(tickers, previous, freshness, now=None, max_age=MAX_AGE, fallback_time=None):
+    """
+    Split tickers into (refetch, carry, reasons).
+
+    `previous` is the last snapshot indexed by Symbol; `fallback_time` is used
+    as the fetch time of rows the freshness record has never seen.
+    """
+    now = now or time.time()
+    refetch = []
+    carry = []
+    reasons = Counter()
+    for ticker in tickers:
+        record = freshness.get(ticker, {})
+        fetched_at = record.get("fetched_at", fallback_time)
+        if record.get("status") == "failed":
+            reason = "failed"
+        elif ticker not in previous.index or fetched_at is None:
+            reason = "new"
+        elif now - fetched_at > max_age:
+            reason = "stale"
+        else:
+            reason = None
+            row = previous.loc[ticker]
+            for column in EVENT_COLUMNS:
+                if column in previous.columns and pd.notna(row[column]):
+                    event = row[column].timestamp()
+                    if fetched_at < event <= now + EVENT_LEAD:
+                        reason = column
+                        break
+        if reason:
+            refetch.append(ticker)
+            reasons[reason] += 1
+        else:
+            carry.append(ticker)
+    return refetch, carry, reasons
+
+
+def refresh_quotes(carried, fetch_carried_quotes):
+    """
+    Overlay fresh batch quotes on carried rows (indexed by Symbol).
+    """
+    quotes = fetch_carried_quotes(list(carried.index))
+    fresh = frame_from_records(quote_records(list(carried.index), quotes)).set_index("Symbol")
+    for column in CARRIED_QUOTE_COLUMNS:
+        carried.loc[fresh.index, column] = fresh[column]
+    return carried
+
+
+def refresh_snapshot(
+    tickers,
+    fetch,
+    previous_path,
+    freshness_file,
+    max_age=MAX_AGE,
+    fetch_carried_quotes=fetch_quotes,
+):
+    """
+    Build today's snapshot from the previous one plus a partial refetch.
+
+    `freshness_file` is the dataset's record (see `freshness_path`); without a
+    `previous_path` every ticker is fetched, and the record is still written.
+    `fetch(tickers)` returns a DataFrame for the symbols that need a detail
+    fetch. Symbols that fail keep their previous row (if any) and are retried
+    next run. Symbols its time budget cut off (see `record_sink.unfetched_tickers`)
+    also keep their previous row, but their freshness record is left as it was. Set `fetch_carried_quotes=None` to carry rows forward untouched.
+    Returns a DataFrame in `tickers` order.
+    """
+    now = time.time()
+    freshness = load_freshness(freshness_file)
+    if previous_path:
+        previous = read_snapshot(previous_path).drop_duplicates("Symbol").set_index("Symbol")
+        fallback_time = snapshot_time(previous_path)
+    else:
+        previous = pd.DataFrame(index=pd.Index([], name="Symbol"))
+        fallback_time = None
+    refetch, carry, reasons = plan_refresh(tickers, previous, freshness, now, max_age, fallback_time)
+    print(f"Incremental refresh: refetching {len(refetch)} of {len(tickers)} tickers {dict(reasons)}, carrying {len(carry)}")
+
+    fetched = fetch(refetch) if refetch else frame_from_records([])
+    fetched_symbols = set(fetched["Symbol"])
+    unfetched = set(unfetched_tickers(fetched))
+    for ticker in refetch:
+        if ticker in fetched_symbols:
+            freshness[ticker] = {"fetched_at": now, "status": "ok"}
+        else:
+            # Not attempted is not failed: those are picked up again next run on their own merits
+            if ticker not in unfetched:
+                freshness[ticker] = {**freshness.get(ticker, {}), "status": "failed"}
+            # Fall back to the old row rather than dropping the symbol from today's file
+            if ticker in previous.index:
+                carry.append(ticker)
+    for ticker in carry:
+        if ticker not in unfetched:
+            freshness.setdefault(ticker, {"fetched_at": fallback_time, "status": "ok"})
+    save_freshness(freshness, freshness_file)
+
+    carried = conform_frame(previous.loc[carry].reset_index()).set_index("Symbol")
+    if carry and fetch_carried_quotes:
+        carried = refresh_quotes(carried, fetch_carried_quotes)
+    combined = pd.concat([conform_frame(fetched), conform_frame(carried.reset_index())], ignore_index=True)
+    return conform_frame(in_order(combined, tickers))
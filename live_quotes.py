@@ -0,0 +1,140 @@
+"""
+Streaming live-quote mode for intraday screening.
+
+Subscribes to Yahoo's pricing websocket (`yf.AsyncWebSocket`) for the
+universe and keeps the latest quote per symbol in memory, starting from the
+last nightly snapshot. Each tick updates the price-derived columns in place
+("Current Price", "Current Price Change (%)", "Regular Market Volume",
+"Market Cap" at the snapshot's share count, and "PE Ratio" from "Trailing
+EPS"); nothing is refetched through `.info`. `LiveQuoteTable.frame()` gives
+a snapshot-shaped frame the strategy scripts can screen at any time.
+
+Stream from the repository root, writing the table every minute:
+    python live_quotes.py --every 60 --output .cache/live_quotes.csv
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from stock_fields import SCHEMA, conform_frame, read_snapshot
+
+STREAM_URL = "wss://streamer.finance.yahoo.com/?version=2"
+LIVE_OUTPUT = os.path.join(".cache", "live_quotes.csv")
+
+
+class LiveQuoteTable:
+    def __init__(self, snapshot):
+        """
+        `snapshot` is a schema frame (see `stock_fields.read_snapshot`) with the symbols to track.
+        """
+        self.snapshot = conform_frame(snapshot.drop_duplicates("Symbol").reset_index(drop=True))
+        self.symbols = list(self.snapshot["Symbol"])
+        self.rows = {symbol: row for row, symbol in enumerate(self.symbols)}
+        column = lambda name: self.snapshot[name].to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+        self.price = column("Current Price")
+        self.change = column("Current Price Change (%)")
+        self.volume = column("Regular Market Volume")
+        self.eps = column("Trailing EPS")
+        self.pe = column("PE Ratio")
+        self.market_cap = column("Market Cap")
+        # Market cap moves with the price at the snapshot's share count
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.shares = self.market_cap / self.price
+        self.updated = np.full(len(self.symbols), np.nan)
+        self.ticks = 0
+        self.unknown = 0
+
+    def apply(self, message):
+        """
+        Apply one decoded pricing message (a `yf.AsyncWebSocket` handler).
+        """
+        row = self.rows.get(message.get("id"))
+        if row is None:
+            self.unknown += 1
+            return
+        self.ticks += 1
+        price = message.get("price")
+        if price:
+            self.price[row] = price
+            eps = self.eps[row]
+            self.pe[row] = price / eps if eps > 0 else np.nan
+            self.market_cap[row] = self.shares[row] * price
+        if "change_percent" in message:
+            self.change[row] = message["change_percent"]
+        if "day_volume" in message:
+            # int64 fields arrive as strings from the protobuf-to-dict conversion
+            self.volume[row] = float(message["day_volume"])
+        self.updated[row] = int(message["time"]) / 1000 if "time" in message else time.time()
+
+    def frame(self):
+        """
+        The snapshot with the live columns filled in, in schema dtypes.
+        """
+        df = self.snapshot.copy()
+        live = {
+            "Current Price": self.price,
+            "Current Price Change (%)": self.change,
+            "Regular Market Volume": self.volume,
+            "PE Ratio": self.pe,
+            "Market Cap": self.market_cap,
+        }
+        for name, values in live.items():
+            df[name] = pd.Series(values, index=df.index).astype(SCHEMA[name])
+        return df
+
+    def stats(self):
+        return {"symbols": len(self.symbols), "live": int(np.isfinite(self.updated).sum()), "ticks": self.ticks, "unknown": self.unknown}
+
+
+async def stream_quotes(table, url=STREAM_URL, duration=None, every=None, on_refresh=None):
+    """
+    Feed `table` from the websocket at `url` for `duration` seconds (forever if None).
+
+    With `every` and `on_refresh`, `on_refresh(table)` is called every `every` seconds.
+    """
+    socket = yf.AsyncWebSocket(url, verbose=False)
+    await socket.subscribe(table.symbols)
+    listener = asyncio.create_task(socket.listen(table.apply))
+    started = time.monotonic()
+    try:
+        while not listener.done():
+            remaining = duration - (time.monotonic() - started) if duration else None
+            if remaining is not None and remaining <= 0:
+                break
+            await asyncio.wait([listener], timeout=min(filter(None, (remaining, every)), default=None))
+            if every and on_refresh:
+                on_refresh(table)
+    finally:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+        await socket.close()
+    return table
+
+
+if __name__ == "__main__":
+    from snapshot_store import SnapshotStore
+
+    parser = argparse.ArgumentParser(description="Stream live quotes over the last nightly snapshot.")
+    parser.add_argument("--snapshot", default=None, help="snapshot file (default: the latest stored nyse_daily_stock_data)")
+    parser.add_argument("--url", default=STREAM_URL)
+    parser.add_argument("--every", type=float, default=60, help="seconds between writes of the table")
+    parser.add_argument("--output", default=LIVE_OUTPUT)
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    args = parser.parse_args()
+
+    snapshot_path = args.snapshot or SnapshotStore().latest_path("nyse_daily_stock_data")
+    table = LiveQuoteTable(read_snapshot(snapshot_path))
+    print(f"Streaming {len(table.symbols)} symbols over {snapshot_path}")
+
+    def write_table(table):
+        if os.path.dirname(args.output):
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        table.frame().to_csv(f"{args.output}.tmp", index=False)
+        os.replace(f"{args.output}.tmp", args.output)
+        print(f"Live quotes: {table.stats()}")
+
+    asyncio.run(stream_quotes(table, args.url, args.duration, args.every, write_table))
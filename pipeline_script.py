@@ -1,16 +1,59 @@
 import os
 from script_v8_auto import get_stock_data
 from combine_strategies import combine_analysis
+from checkpoint import journal_path
+from fetch_metrics import FetchMetrics, metrics_path
+from incremental import latest_snapshot
+from dead_letter import DeadLetterStore
+from symbol_registry import SymbolRegistry
+from coalescing import Coalescer
+from snapshot_store import SnapshotStore
+from fundamentals_history import FundamentalsHistory, restore_latest
+from screening_db import ScreeningDB
+from response_cache import ResponseCache
+from rate_limiter import BURST, REQUESTS_PER_SECOND, WINDOW_LIMIT, WINDOW_SECONDS
 from datetime import datetime
 
-# Step 1: Fetch stock data
-stock_data = get_stock_data()
-
-# Step 2: Save stock data to CSV
 today = datetime.now().strftime('%Y-%m-%d')
-stock_data_file = f'Data/stock_data_{today}.csv'
-os.makedirs('Data', exist_ok=True)
-stock_data.to_csv(stock_data_file, index=False)
+
+# Step 1: Fetch stock data (a rerun on the same day resumes from the checkpoint)
+# Only stale, failed or event-affected symbols are refetched; the rest carry forward from the last run
+store = SnapshotStore()
+history = FundamentalsHistory('stock_data')
+previous_snapshot = restore_latest(history, store) or latest_snapshot(os.path.join('Data', 'stock_data_*.csv'))
+metrics = FetchMetrics()
+dead_letters = DeadLetterStore()
+registry = SymbolRegistry()
+# Shares in-flight tickers with other fetch jobs running on this host
+coalescer = Coalescer()
+# Fresh profile and fundamentals groups are reused, so a refetch only asks for what has expired
+cache = ResponseCache()
+stock_data = get_stock_data(
+    cache=cache,
+    # The default limits: 3 requests/s sustained, about 17 minutes for a full NYSE refetch (see rate_limiter)
+    rate_limits=dict(rate=REQUESTS_PER_SECOND, burst=BURST, window_limit=WINDOW_LIMIT, window=WINDOW_SECONDS),
+    checkpoint=journal_path(f'stock_data_{today}'),
+    metrics=metrics,
+    previous_snapshot=previous_snapshot,
+    dead_letters=dead_letters,
+    registry=registry,
+    coalescer=coalescer,
+    dataset='stock_data',
+)
+coalescer.close()
+cache.close()
+dead_letters.save()
+registry.save()
+metrics.write(metrics_path(f'stock_data_{today}'))
+
+# Step 2: Save stock data to the snapshot store (CSV is exported on demand)
+# and record the day's changes in the delta history, which is what gets committed
+store.write(stock_data, 'stock_data', today)
+history.append(stock_data, today)
+# Also index it in the screening database for queries across dates
+screening = ScreeningDB()
+screening.load(stock_data, 'stock_data', today)
+screening.close()
 
 # Step 3: Perform combined strategy analysis
 combined_results_file = f'Data/combined_results_{today}.txt'
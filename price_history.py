@@ -0,0 +1,253 @@
+"""
+Daily OHLCV history for the symbol universe.
+
+The first run backfills `BACKFILL_YEARS` of daily bars with multi-symbol
+`yf.download` calls; later runs only download the days after each symbol's
+last stored bar. Bars are stored as Parquet, partitioned by date:
+    .cache/history/ohlcv_2024-10.parquet      one file per finished month
+    .cache/history/ohlcv_2024-11-21.parquet   one file per day of the current month
+so a daily run adds one small file and never rewrites older ones. Once a
+month is over, its daily files are folded into the month file. The
+manifest next to them records how far each symbol is covered.
+
+The history is not committed: a full backfill of the universe is 150+ MiB,
+and every monthly compaction would add another copy of the month to the
+repository. CI keeps it in the Actions cache between runs (see
+.github/workflows/daily_data_fetch_v2.yaml); if the cache is evicted, the
+next run backfills again.
+
+Update the history from the repository root:
+    python price_history.py
+"""
+
+import argparse
+import glob
+import json
+import os
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from rate_limiter import get_shared_limiter
+
+HISTORY_DIR = os.path.join(".cache", "history")
+BACKFILL_YEARS = 5
+# Symbols per `yf.download` call
+DOWNLOAD_CHUNK = 100
+# Symbols that returned no bars at all are tried again after this many days
+EMPTY_RETRY_DAYS = 7
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Adj Close"]
+BAR_COLUMNS = ["Date", "Symbol", *PRICE_COLUMNS, "Volume", "Dividends", "Stock Splits"]
+
+
+def manifest_path(directory=HISTORY_DIR):
+    return os.path.join(directory, "manifest.json")
+
+
+def load_manifest(directory=HISTORY_DIR):
+    """
+    {symbol: {"last": ISO date of the last stored bar or None, "checked": ISO date}}.
+    """
+    try:
+        with open(manifest_path(directory), encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(manifest, directory=HISTORY_DIR):
+    os.makedirs(directory, exist_ok=True)
+    path = manifest_path(directory)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def typed_bars(df):
+    """
+    Bars in the stored column order and compact dtypes: float32 prices, int64 volume, categorical symbols.
+    """
+    df = df.reindex(columns=BAR_COLUMNS)
+    df["Date"] = pd.to_datetime(df["Date"]).dt.tz_localize(None).dt.as_unit("s")
+    df["Symbol"] = df["Symbol"].astype("category")
+    for column in [*PRICE_COLUMNS, "Dividends", "Stock Splits"]:
+        df[column] = df[column].astype(np.float32)
+    df["Volume"] = df["Volume"].fillna(0).astype(np.int64)
+    return df
+
+
+def bars_from_download(raw):
+    """
+    Long (Date, Symbol) frame from a `yf.download(group_by="ticker")` result.
+    """
+    if raw is None or raw.empty:
+        return typed_bars(pd.DataFrame(columns=BAR_COLUMNS))
+    bars = raw.stack(level=0).rename_axis(["Date", "Symbol"]).reset_index()
+    # Symbols that failed or did not trade come back as all-NaN rows
+    return typed_bars(bars.dropna(subset=["Close"]))
+
+
+def download_bars(tickers, start, end):
+    """
+    Daily bars for `tickers` from `start` up to (not including) `end`, as a long frame.
+    """
+    raw = yf.download(
+        tickers,
+        start=start,
+        end=end,
+        actions=True,
+        auto_adjust=False,
+        group_by="ticker",
+        threads=True,
+        progress=False,
+    )
+    return bars_from_download(raw)
+
+
+def partition_name(day, today):
+    """
+    Month partition for finished months, day partition for the current one.
+    """
+    if (day.year, day.month) == (today.year, today.month):
+        return f"ohlcv_{day:%Y-%m-%d}"
+    return f"ohlcv_{day:%Y-%m}"
+
+
+def write_partition(path, bars):
+    """
+    Merge `bars` into a partition file; rows already stored for the same symbol and date are replaced.
+    """
+    if os.path.exists(path):
+        bars = pd.concat([pd.read_parquet(path), bars], ignore_index=True)
+        bars = bars.drop_duplicates(["Symbol", "Date"], keep="last")
+    bars = typed_bars(bars.sort_values(["Date", "Symbol"]).reset_index(drop=True))
+    bars.to_parquet(f"{path}.tmp", index=False, compression="zstd")
+    os.replace(f"{path}.tmp", path)
+
+
+def store_bars(bars, directory=HISTORY_DIR, today=None):
+    today = today or date.today()
+    os.makedirs(directory, exist_ok=True)
+    names = bars["Date"].map(lambda timestamp: partition_name(timestamp.date(), today))
+    for name, partition in bars.groupby(names, sort=True):
+        write_partition(os.path.join(directory, f"{name}.parquet"), partition)
+
+
+def compact(directory=HISTORY_DIR, today=None):
+    """
+    Fold the daily files of finished months into their month files.
+    """
+    today = today or date.today()
+    daily = glob.glob(os.path.join(directory, "ohlcv_????-??-??.parquet"))
+    months = {}
+    for path in daily:
+        day = date.fromisoformat(os.path.basename(path)[6:16])
+        if (day.year, day.month) != (today.year, today.month):
+            months.setdefault(f"{day:%Y-%m}", []).append(path)
+    for month, paths in sorted(months.items()):
+        bars = pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+        write_partition(os.path.join(directory, f"ohlcv_{month}.parquet"), bars)
+        for path in paths:
+            os.remove(path)
+
+
+def plan_downloads(tickers, manifest, end, backfill_years=BACKFILL_YEARS):
+    """
+    {start date: [tickers]}: symbols grouped by the first day they are missing.
+    """
+    backfill_start = end - timedelta(days=365 * backfill_years)
+    plan = {}
+    for ticker in tickers:
+        entry = manifest.get(ticker)
+        if entry and entry["last"]:
+            start = date.fromisoformat(entry["last"]) + timedelta(days=1)
+        elif entry and (end - date.fromisoformat(entry["checked"])).days < EMPTY_RETRY_DAYS:
+            continue
+        else:
+            start = backfill_start
+        if start < end:
+            plan.setdefault(start, []).append(ticker)
+    return plan
+
+
+def update_history(
+    tickers,
+    directory=HISTORY_DIR,
+    end=None,
+    backfill_years=BACKFILL_YEARS,
+    chunk_size=DOWNLOAD_CHUNK,
+    download=download_bars,
+    limiter=None,
+):
+    """
+    Download the bars each ticker is missing up to (not including) `end`, default today, and store them.
+
+    Only finished sessions are stored, so a run never saves a partial bar.
+    `yf.download` sends one chart request per symbol, so a chunk takes one
+    limiter slot per symbol. Returns the number of bars added.
+    """
+    end = end or date.today()
+    limiter = limiter or get_shared_limiter()
+    manifest = load_manifest(directory)
+    compact(directory, today=end)
+    plan = plan_downloads(tickers, manifest, end, backfill_years)
+    added = 0
+    for start, pending in sorted(plan.items()):
+        for i in range(0, len(pending), chunk_size):
+            chunk = pending[i:i + chunk_size]
+            print(f"Downloading bars from {start} for {len(chunk)} symbols ({i + len(chunk)}/{len(pending)})")
+            for _ in chunk:
+                limiter.acquire()
+            try:
+                bars = download(chunk, start, end)
+            except Exception as e:
+                print(f"Failed to download bars for {len(chunk)} symbols from {start}: {e}")
+                continue
+            store_bars(bars, directory, today=end)
+            added += len(bars)
+            last = bars.groupby("Symbol", observed=True)["Date"].max()
+            for ticker in chunk:
+                entry = manifest.setdefault(ticker, {"last": None})
+                if ticker in last.index:
+                    entry["last"] = last[ticker].date().isoformat()
+                entry["checked"] = end.isoformat()
+            # Save as we go, so an interrupted backfill resumes instead of starting over
+            save_manifest(manifest, directory)
+    print(f"Price history: {added} bars added for {sum(len(pending) for pending in plan.values())} symbols")
+    return added
+
+
+def load_history(directory=HISTORY_DIR, tickers=None, start=None, end=None, columns=None):
+    """
+    Stored bars as one frame, optionally for some tickers, a date range and a subset of columns.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, "ohlcv_*.parquet")))
+    if not paths:
+        return typed_bars(pd.DataFrame(columns=BAR_COLUMNS))
+    filters = []
+    if tickers is not None:
+        filters.append(("Symbol", "in", list(tickers)))
+    if start is not None:
+        filters.append(("Date", ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append(("Date", "<", pd.Timestamp(end)))
+    if columns is not None:
+        columns = list(dict.fromkeys(["Date", "Symbol", *columns]))
+    frames = [pd.read_parquet(path, columns=columns, filters=filters or None) for path in paths]
+    bars = pd.concat(frames, ignore_index=True)
+    # Each file has its own symbol dictionary, so the concatenated column needs re-encoding
+    bars["Symbol"] = bars["Symbol"].astype("category")
+    return bars.sort_values(["Symbol", "Date"], ignore_index=True)
+
+
+if __name__ == "__main__":
+    from symbol_registry import SymbolRegistry
+
+    parser = argparse.ArgumentParser(description="Backfill or extend the daily OHLCV history.")
+    parser.add_argument("--directory", default=HISTORY_DIR)
+    parser.add_argument("--years", type=int, default=BACKFILL_YEARS, help="backfill depth for new symbols")
+    args = parser.parse_args()
+
+    registry = SymbolRegistry()
+    update_history(registry.load_universe(), directory=args.directory, backfill_years=args.years)
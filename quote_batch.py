@@ -0,0 +1,142 @@
+"""
+Batched quote mode.
+
+The v7 quote endpoint takes dozens of symbols per request and covers the
+price, volume, 52-week range, market cap and valuation columns. A quote
+pass fills those in bulk; the per-ticker detail call is only needed for
+fundamentals, and then it skips the quote leg `.info` would repeat.
+"""
+
+import asyncio
+import time
+from stock_fields import FIELDS, FUNDAMENTALS, GROUPS, PROFILE, QUOTE, build_record, fetched_groups, get_info, narrowed
+from rate_limiter import get_shared_limiter
+from yahoo_api import fetch_quote_json, field_fetcher
+
+BATCH_SIZE = 50
+RETRIES = 3
+
+# v7 quote key -> `.info` key, for fields whose meaning matches `.info`
+QUOTE_KEYS = {
+    "longName": "longName",
+    "currency": "currency",
+    "exchange": "exchange",
+    "regularMarketPrice": "currentPrice",
+    "marketCap": "marketCap",
+    "trailingPE": "trailingPE",
+    "forwardPE": "forwardPE",
+    "priceToBook": "priceToBook",
+    "bookValue": "bookValue",
+    "fiftyTwoWeekHigh": "fiftyTwoWeekHigh",
+    "fiftyTwoWeekLow": "fiftyTwoWeekLow",
+    "regularMarketVolume": "regularMarketVolume",
+    "averageDailyVolume3Month": "averageVolume",
+    "regularMarketChangePercent": "regularMarketChangePercent",
+    "epsTrailingTwelveMonths": "trailingEps",
+    "epsForward": "forwardEps",
+}
+
+QUOTE_COLUMNS = [column for column, key, _ in FIELDS if key in QUOTE_KEYS.values() or key == "52WeekChange"]
+
+
+def quote_to_info(quote):
+    """
+    Rename one v7 quote result to `.info` keys.
+    """
+    info = {}
+    for quote_key, info_key in QUOTE_KEYS.items():
+        if quote.get(quote_key) is not None:
+            info[info_key] = quote[quote_key]
+    # v7 reports the 52-week change in percent; `.info` uses a fraction
+    if quote.get("fiftyTwoWeekChangePercent") is not None:
+        info["52WeekChange"] = quote["fiftyTwoWeekChangePercent"] / 100
+    return info
+
+
+def fetch_quotes(
+    tickers, batch_size=BATCH_SIZE, fetch_quote_json=fetch_quote_json, limiter=None, cache=None, metrics=None
+):
+    """
+    Fetch quotes for all tickers, `batch_size` symbols per request.
+
+    Returns {ticker: `.info`-style dict}; symbols the endpoint does not know are left out.
+    With a `cache`, tickers with a fresh quote group are served from it and
+    new quotes are written back. Each batch request is reported to `metrics`.
+    """
+    limiter = limiter or get_shared_limiter()
+    quotes = {}
+    if cache:
+        for ticker in tickers:
+            cached = cache.get(ticker, groups=(QUOTE,))
+            if cached is not None:
+                quotes[ticker] = cached
+        tickers = [ticker for ticker in tickers if ticker not in quotes]
+    batches = [tickers[i:i + batch_size] for i in range(0, len(tickers), batch_size)]
+    for number, batch in enumerate(batches, start=1):
+        print(f"Fetching quotes for batch {number}/{len(batches)} ({len(batch)} symbols)")
+        retries = RETRIES
+        delay = 1
+        while retries > 0:
+            started = time.monotonic()
+            try:
+                limiter.acquire()
+                if metrics:
+                    metrics.record_wait(time.monotonic() - started)
+                started = time.monotonic()
+                payload = fetch_quote_json(batch)
+                if metrics:
+                    metrics.record_request(time.monotonic() - started, payload=payload)
+                break
+            except Exception as e:
+                if metrics:
+                    metrics.record_request(time.monotonic() - started, error=e)
+                retries -= 1
+                if retries == 0:
+                    print(f"Failed to fetch quote batch {number}: {e}")
+                    payload = {}
+                else:
+                    if metrics:
+                        metrics.record_backoff(delay)
+                    time.sleep(delay)
+                    delay *= 2
+        for quote in (payload.get("quoteResponse") or {}).get("result") or []:
+            quotes[quote["symbol"]] = quote_to_info(quote)
+            if cache:
+                cache.put(quote["symbol"], quotes[quote["symbol"]], groups=(QUOTE,))
+    return quotes
+
+
+def quote_records(tickers, quotes):
+    """
+    Output rows built from quotes alone (quote-only pass).
+    """
+    return [build_record(ticker, quotes[ticker]) for ticker in tickers if ticker in quotes]
+
+
+def with_quotes(fetch_detail, quotes):
+    """
+    Wrap a detail fetcher so batch quote values are layered over its payload.
+
+    The default `.info` fetcher is swapped for a quoteSummary call for just
+    the profile and fundamentals modules, since the batch covers the quote columns.
+    """
+    if fetch_detail is get_info:
+        fetch_detail = field_fetcher((PROFILE, FUNDAMENTALS))
+    groups = tuple(group for group in GROUPS if group in fetched_groups(fetch_detail) or group == QUOTE)
+    if asyncio.iscoroutinefunction(fetch_detail):
+        async def fetch_info(ticker):
+            info = await fetch_detail(ticker)
+            return {**info, **quotes.get(ticker, {})}
+    else:
+        def fetch_info(ticker):
+            info = fetch_detail(ticker)
+            return {**info, **quotes.get(ticker, {})}
+    fetch_info.groups = groups
+
+    def narrow(stale):
+        # The batch covers the quote group, so only stale detail groups narrow the detail fetch
+        detail = [group for group in stale if group != QUOTE]
+        return with_quotes(narrowed(fetch_detail, detail), quotes) if detail else fetch_info
+
+    fetch_info.narrow = narrow
+    return fetch_info
@@ -0,0 +1,179 @@
+"""
+Process-wide request limiter shared by every fetch path.
+
+A token bucket allows short bursts up to `burst` requests and a sustained
+`rate` per second; an optional sliding window caps the number of requests
+in any `window` seconds. Callers reserve a slot and sleep only as long as
+needed, instead of sleeping a fixed amount after every request.
+
+Yahoo publishes no limits for these endpoints, so the defaults are
+conservative starting points rather than measured ceilings: short bursts
+of 8 at 4 per second, and no more than 900 requests in any 5 minutes. On
+long runs the window is the binding limit, at min(4, 900 / 300) = 3
+requests per second sustained. A full refetch of the 3,895 NYSE and TSX
+symbols therefore needs about 21 minutes, and the 3,188 NYSE symbols
+about 17 (see `RateLimiter.expected_seconds`). If `FetchMetrics` shows
+no throttling at those rates, raise them. Entry points set their own
+limits with `configure_shared_limiter`.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+
+# Provider limits; tune these to the observed Yahoo Finance ceiling
+REQUESTS_PER_SECOND = 4.0
+BURST = 8
+WINDOW_LIMIT = 900
+WINDOW_SECONDS = 300
+
+
+class RateLimiter:
+    def __init__(self, rate=REQUESTS_PER_SECOND, burst=BURST, window_limit=WINDOW_LIMIT, window=WINDOW_SECONDS):
+        self.rate = rate
+        self.burst = burst
+        self.window_limit = window_limit
+        self.window = window
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._last_ready = 0.0
+        self._stamps = deque()
+        self._lock = threading.Lock()
+        self._first = None
+        self._latest = None
+        self.requests = 0
+        self.wait_time = 0.0
+
+    def _reserve(self):
+        """
+        Claim the next request slot and return how long the caller must wait for it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            ready = now
+            if self._tokens < 1:
+                ready = now + (1 - self._tokens) / self.rate
+            # Tokens may go negative: later callers queue up behind earlier reservations
+            self._tokens -= 1
+
+            if self.window_limit:
+                ready = max(ready, self._last_ready)
+                while self._stamps and self._stamps[0] <= ready - self.window:
+                    self._stamps.popleft()
+                if len(self._stamps) >= self.window_limit:
+                    ready = max(ready, self._stamps[-self.window_limit] + self.window)
+                self._stamps.append(ready)
+                self._last_ready = ready
+
+            if self._first is None:
+                self._first = ready
+            self._latest = max(ready, self._latest or ready)
+            wait = ready - now
+            self.requests += 1
+            self.wait_time += wait
+            return wait
+
+    def acquire(self):
+        """
+        Block the calling thread until a request may be sent.
+        """
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def try_acquire(self):
+        """
+        Take a request slot only if one is free right now; never waits or queues.
+        """
+        with self._lock:
+            now = time.monotonic()
+            tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            if tokens < 1 or self._last_ready > now:
+                return False
+            if self.window_limit:
+                while self._stamps and self._stamps[0] <= now - self.window:
+                    self._stamps.popleft()
+                if len(self._stamps) >= self.window_limit:
+                    return False
+                self._stamps.append(now)
+                self._last_ready = now
+            self._tokens = tokens - 1
+            self._updated = now
+            if self._first is None:
+                self._first = now
+            self._latest = max(now, self._latest or now)
+            self.requests += 1
+            return True
+
+    async def acquire_async(self):
+        """
+        Wait on the event loop until a request may be sent.
+        """
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def expected_seconds(self, requests):
+        """
+        Seconds until the last of `requests` back-to-back slots is granted from a fresh
+        limiter: a lower bound on a run's wall-clock time, before latency and retries.
+        """
+        now, tokens, stamps = 0.0, float(self.burst), deque()
+        for _ in range(requests):
+            ready = now if tokens >= 1 else now + (1 - tokens) / self.rate
+            if self.window_limit:
+                while stamps and stamps[0] <= ready - self.window:
+                    stamps.popleft()
+                if len(stamps) >= self.window_limit:
+                    ready = max(ready, stamps[-self.window_limit] + self.window)
+                stamps.append(ready)
+            tokens = min(self.burst, tokens - 1 + (ready - now) * self.rate)
+            now = ready
+        return now
+
+    def observed_rate(self):
+        """
+        Requests per second actually granted between the first and latest slot.
+        """
+        if self.requests < 2:
+            return 0.0
+        return (self.requests - 1) / max(self._latest - self._first, 1e-9)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "observed_rate": round(self.observed_rate(), 3),
+            "configured_rate": self.rate,
+            "burst": self.burst,
+            "wait_time": round(self.wait_time, 3),
+        }
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_limiter():
+    """
+    The limiter used by default by `script_v8`, `script_v8_auto` and `async_fetch`.
+    """
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+        return _shared_limiter
+
+
+def configure_shared_limiter(**limits):
+    """
+    Replace the shared limiter with one built from `RateLimiter` keyword arguments; returns it.
+    Call before fetching starts, since fetchers hold on to the limiter they were given.
+    """
+    global _shared_limiter
+    with _shared_lock:
+        _shared_limiter = RateLimiter(**limits)
+        return _shared_limiter
@@ -0,0 +1,99 @@
+"""
+Streaming output for fetch runs.
+
+Rows are buffered column by column and appended to the output file every
+`chunk_size` records, so memory stays flat however many symbols are
+fetched and the file can be read while the run is still going.
+"""
+
+import os
+import threading
+import pandas as pd
+from stock_fields import COLUMNS, frame_from_columns, frame_from_records
+
+CHUNK_SIZE = 250
+# `DataFrame.attrs` key listing the tickers a time budget left unfetched
+UNFETCHED = "unfetched"
+
+
+class ChunkedCSVSink:
+    def __init__(self, path, columns=COLUMNS, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.columns = list(columns)
+        self.chunk_size = chunk_size
+        self.rows_written = 0
+        self._buffer = {column: [] for column in self.columns}
+        self._buffered = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Start a fresh file with just the header, so partial results are always valid CSV
+        pd.DataFrame(columns=self.columns).to_csv(path, index=False)
+
+    def write(self, record):
+        with self._lock:
+            for column in self.columns:
+                self._buffer[column].append(record.get(column))
+            self._buffered += 1
+            if self._buffered >= self.chunk_size:
+                self._flush()
+
+    def _flush(self):
+        if not self._buffered:
+            return
+        frame_from_columns(self._buffer).to_csv(self.path, mode="a", header=False, index=False)
+        self.rows_written += self._buffered
+        self._buffer = {column: [] for column in self.columns}
+        self._buffered = 0
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def collect_results(stock_data, tickers, journal=None, sink=None, unfetched=()):
+    """
+    Shape a fetcher's return value: a DataFrame in `tickers` order that also
+    includes rows journaled by earlier, interrupted runs. When rows went to a
+    sink, the frame is empty and only carries the `unfetched` list.
+
+    The `unfetched` tickers (cut off by a time budget) are listed in the
+    frame's `attrs[UNFETCHED]`, so callers can tell them from failures.
+    """
+    if sink:
+        sink.flush()
+        df = frame_from_records([])
+    elif journal:
+        df = frame_from_records(journal.records(tickers))
+    else:
+        # Pool workers finish in completion order
+        df = in_order(frame_from_records(stock_data), tickers)
+    df.attrs[UNFETCHED] = list(unfetched)
+    return df
+
+
+def in_order(df, tickers):
+    """
+    `df` with its rows in `tickers` order (symbols not in `tickers` last), keeping its `attrs`.
+    """
+    order = {ticker: position for position, ticker in enumerate(tickers)}
+    ordered = df.sort_values("Symbol", key=lambda symbols: symbols.map(order).fillna(len(order)), kind="stable")
+    ordered = ordered.reset_index(drop=True)
+    ordered.attrs = dict(df.attrs)
+    return ordered
+
+
+def unfetched_tickers(df):
+    """
+    Tickers a fetcher's time budget left unfetched (see `collect_results`).
+    """
+    return [] if df is None else list(df.attrs.get(UNFETCHED, []))
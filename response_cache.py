@@ -0,0 +1,132 @@
+"""
+Persistent on-disk cache for `.info` payloads.
+
+Each ticker's payload is split by field group (see `stock_fields.GROUPS`)
+and stored with its fetch time, so static profile fields can be reused for
+weeks while quote fields expire the same day. The store is one SQLite file;
+once it holds more than `max_entries` rows the least recently used ones are
+evicted.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from stock_fields import FUNDAMENTALS, GROUPS, PROFILE, QUOTE, field_group
+
+CACHE_PATH = os.path.join(".cache", "responses.sqlite")
+MAX_ENTRIES = 20000
+
+DAY = 24 * 60 * 60
+TTLS = {
+    PROFILE: 30 * DAY,
+    FUNDAMENTALS: 7 * DAY,
+    QUOTE: 12 * 60 * 60,
+}
+
+
+class ResponseCache:
+    def __init__(self, path=CACHE_PATH, ttls=None, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.ttls = {**TTLS, **(ttls or {})}
+        self.max_entries = max_entries
+        self.hits = {group: 0 for group in GROUPS}
+        self.misses = {group: 0 for group in GROUPS}
+        self.evictions = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                ticker TEXT NOT NULL,
+                grp TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (ticker, grp)
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self._db.commit()
+
+    def get_groups(self, ticker, groups=GROUPS):
+        """
+        Fresh cached payloads for `ticker`, as {group: dict}; stale or missing groups are left out.
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT grp, payload, fetched_at FROM entries WHERE ticker = ? AND grp IN ({','.join('?' * len(groups))})",
+                (ticker, *groups),
+            ).fetchall()
+            fresh = {grp: json.loads(payload) for grp, payload, fetched_at in rows if now - fetched_at < self.ttls[grp]}
+            for group in groups:
+                if group in fresh:
+                    self.hits[group] += 1
+                else:
+                    self.misses[group] += 1
+            if fresh:
+                self._db.execute(
+                    f"UPDATE entries SET accessed_at = ? WHERE ticker = ? AND grp IN ({','.join('?' * len(fresh))})",
+                    (now, ticker, *fresh),
+                )
+                self._db.commit()
+        return fresh
+
+    def lookup(self, ticker, groups=GROUPS):
+        """
+        (info, stale): the merged `.info`-style payload of the fresh groups, and the requested groups that are stale or missing.
+        """
+        fresh = self.get_groups(ticker, groups)
+        info = {}
+        for group in groups:
+            info.update(fresh.get(group, {}))
+        return info, [group for group in groups if group not in fresh]
+
+    def get(self, ticker, groups=GROUPS):
+        """
+        Merged `.info`-style payload if every requested group is fresh, else None.
+        """
+        info, stale = self.lookup(ticker, groups)
+        return None if stale else info
+
+    def put(self, ticker, info, groups=GROUPS):
+        """
+        Store the requested groups of an `.info`-style payload.
+        """
+        split = {group: {} for group in groups}
+        for key, value in info.items():
+            group = field_group(key)
+            if group in split:
+                split[group][key] = value
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO entries (ticker, grp, payload, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                [(ticker, group, json.dumps(payload), now, now) for group, payload in split.items()],
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        (count,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            self.evictions += excess
+
+    def stats(self):
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+        return {"entries": entries, "hits": dict(self.hits), "misses": dict(self.misses), "evictions": self.evictions}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
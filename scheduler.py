@@ -0,0 +1,108 @@
+"""
+Priority order for fetch work.
+
+Symbols are scored from a few signals, each scaled to 0-1 and weighted:
+market cap rank in the last snapshot, staleness from the freshness record,
+membership in the latest strategy results, and a user watchlist. The fetch
+paths work through tickers in the order given, so a throttled or
+time-boxed run covers the highest scores first.
+"""
+
+import glob
+import os
+import time
+from incremental import MAX_AGE, freshness_path, load_freshness
+from stock_fields import read_snapshot
+
+WATCHLIST_PATH = "WATCHLIST.txt"
+WEIGHTS = {
+    "market_cap": 1.0,
+    "staleness": 1.0,
+    "strategy": 2.0,
+    "watchlist": 5.0,
+}
+
+
+def load_watchlist(path=WATCHLIST_PATH):
+    """
+    Symbols from a watchlist file, one per line; empty when there is no file.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r") as file:
+        return {line.strip() for line in file if line.strip() and not line.startswith("#")}
+
+
+def strategy_symbols(pattern=os.path.join("Data", "combined_results_*.txt")):
+    """
+    Symbols in the newest combined strategy results file (see `combine_strategies`).
+    """
+    paths = sorted(glob.glob(pattern))
+    if not paths:
+        return set()
+    with open(paths[-1], "r") as file:
+        lines = file.read().splitlines()
+    # Title line, then the table header; Symbol is the first column of each row
+    return {line.split()[0] for line in lines[2:] if line.strip()}
+
+
+def priority_scores(tickers, snapshot=None, freshness=None, strategy=(), watchlist=(), weights=WEIGHTS, now=None):
+    """
+    {ticker: score}; higher is fetched earlier.
+
+    `snapshot` is the last snapshot indexed by Symbol, `freshness` the
+    record from `incremental.load_freshness`.
+    """
+    now = now or time.time()
+    freshness = freshness or {}
+    strategy = set(strategy)
+    watchlist = set(watchlist)
+    market_cap_rank = {}
+    if snapshot is not None and "Market Cap" in snapshot.columns:
+        # Percentile rank, so a handful of mega caps do not flatten everything else to zero
+        ranks = snapshot["Market Cap"].rank(pct=True)
+        market_cap_rank = ranks[ranks.notna()].to_dict()
+
+    scores = {}
+    for ticker in tickers:
+        fetched_at = freshness.get(ticker, {}).get("fetched_at")
+        staleness = 1.0 if fetched_at is None else min((now - fetched_at) / MAX_AGE, 1.0)
+        scores[ticker] = (
+            weights["market_cap"] * market_cap_rank.get(ticker, 0.0)
+            + weights["staleness"] * staleness
+            + weights["strategy"] * (ticker in strategy)
+            + weights["watchlist"] * (ticker in watchlist)
+        )
+    return scores
+
+
+def prioritize(tickers, snapshot=None, freshness=None, strategy=(), watchlist=(), weights=WEIGHTS, now=None):
+    """
+    Tickers sorted by descending priority; ties keep their input order.
+    """
+    scores = priority_scores(tickers, snapshot, freshness, strategy, watchlist, weights, now)
+    return sorted(tickers, key=lambda ticker: -scores[ticker])
+
+
+def market_cap_snapshot(path):
+    """
+    Just the Market Cap column of a snapshot, indexed by Symbol; None without a path.
+    """
+    if not path:
+        return None
+    snapshot = read_snapshot(path, columns=["Symbol", "Market Cap"])
+    return snapshot.drop_duplicates("Symbol").set_index("Symbol")
+
+
+def default_priority(tickers, snapshot=None, dataset=None):
+    """
+    Order tickers using the standard signal sources on disk; staleness comes
+    from the freshness record of `dataset`, if given.
+    """
+    return prioritize(
+        tickers,
+        snapshot=snapshot,
+        freshness=load_freshness(freshness_path(dataset)) if dataset else None,
+        strategy=strategy_symbols(),
+        watchlist=load_watchlist(),
+    )
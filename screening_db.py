@@ -0,0 +1,213 @@
+"""
+Indexed SQLite store of every snapshot, for screening across dates.
+
+Each fetch run loads its snapshot into one table, one row per (dataset,
+date, symbol) with a column per schema field, so a question such as "every
+symbol in Technology with a PE Ratio under 15 over the last 30 snapshots"
+is one indexed query instead of reading 30 files:
+    db = ScreeningDB()
+    db.screen("nyse_daily_stock_data", ["Symbol", "PE Ratio"], [("Sector", "==", "Technology"), ("PE Ratio", "<", 15)], last=30)
+Rows are indexed by (date, symbol), (symbol, date), (sector, date) and
+each of `INDEXED_METRICS`. The database is derived data: it lives in
+`.cache` and can be rebuilt from the delta history from the repository root:
+    python screening_db.py backfill --dataset nyse_daily_stock_data
+    python screening_db.py sql "SELECT date, COUNT(*) FROM snapshots GROUP BY date"
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+import pandas as pd
+from fundamentals_history import FundamentalsHistory, plain_column, typed_from_plain
+from stock_fields import CATEGORY, COLUMNS, DATE, FLOAT32, FLOAT64, INT64, NUMERIC_DTYPES, SCHEMA, STRING, conform_frame
+
+SCREENING_PATH = os.path.join(".cache", "screening.sqlite")
+# The metrics the strategy scripts filter on most often
+INDEXED_METRICS = [
+    "PE Ratio",
+    "Price to Book",
+    "Earnings Growth (YoY)",
+    "Debt to Equity",
+    "Revenue Growth (YoY)",
+    "Dividend Yield",
+    "Current Ratio",
+    "Market Cap",
+]
+# Read pages straight from the OS page cache instead of copying them into SQLite's own
+MMAP_SIZE = 1 << 30
+SQL_TYPES = {FLOAT64: "REAL", FLOAT32: "REAL", INT64: "INTEGER", DATE: "INTEGER", CATEGORY: "TEXT", STRING: "TEXT"}
+# `stock_fields.FILTER_OPERATORS` in SQL; comparisons with NULL are never true, so missing values never pass
+SQL_OPERATORS = {"==": "=", "=": "=", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">=", "in": "IN", "not in": "NOT IN"}
+
+
+def quoted(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def sql_values(series, dtype):
+    """
+    Python values (None = missing) of a schema column, as SQLite stores them: dates as epoch seconds.
+    """
+    values = plain_column(series, dtype)
+    if dtype not in NUMERIC_DTYPES:
+        return values.tolist()
+    if dtype in (INT64, DATE):
+        return [None if value != value else int(value) for value in values.tolist()]
+    return [None if value != value else value for value in values.tolist()]
+
+
+def sql_parameter(column, value):
+    """
+    A filter value in the form `column` is stored in.
+    """
+    if SCHEMA[column] == DATE:
+        return int(pd.Timestamp(value).timestamp())
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class ScreeningDB:
+    def __init__(self, path=SCREENING_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        fields = ",\n".join(f"{quoted(column)} {SQL_TYPES[SCHEMA[column]]}" for column in COLUMNS)
+        self._db.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                dataset TEXT NOT NULL,
+                date TEXT NOT NULL,
+                {fields},
+                PRIMARY KEY (dataset, date, "Symbol")
+            );
+            CREATE TABLE IF NOT EXISTS dates (
+                dataset TEXT NOT NULL,
+                date TEXT NOT NULL,
+                rows INTEGER NOT NULL,
+                loaded REAL NOT NULL,
+                PRIMARY KEY (dataset, date)
+            );
+            -- Sector or symbol first: one of them over a date range is a single index range
+            CREATE INDEX IF NOT EXISTS snapshots_sector ON snapshots (dataset, "Sector", date);
+            CREATE INDEX IF NOT EXISTS snapshots_symbol ON snapshots (dataset, "Symbol", date);
+            """
+        )
+        for i, metric in enumerate(INDEXED_METRICS):
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS snapshots_metric_{i} ON snapshots (dataset, {quoted(metric)}, date)")
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def load(self, df, dataset, day):
+        """
+        Store the snapshot `df` as `dataset` on ISO date `day`, replacing any earlier load of that day; returns the row count.
+        """
+        df = conform_frame(df.drop_duplicates("Symbol").reset_index(drop=True))
+        columns = [sql_values(df[column], SCHEMA[column]) for column in COLUMNS]
+        placeholders = ", ".join("?" * (len(COLUMNS) + 2))
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM snapshots WHERE dataset = ? AND date = ?", (dataset, day))
+            self._db.executemany(
+                f"INSERT INTO snapshots VALUES ({placeholders})",
+                ((dataset, day, *row) for row in zip(*columns)),
+            )
+            self._db.execute("INSERT OR REPLACE INTO dates VALUES (?, ?, ?, ?)", (dataset, day, len(df), time.time()))
+        with self._lock:
+            # Refreshes the planner's statistics when the table has grown enough to need it
+            self._db.execute("PRAGMA optimize")
+        return len(df)
+
+    def dates(self, dataset):
+        """
+        ISO dates loaded for `dataset`, oldest first.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT date FROM dates WHERE dataset = ? ORDER BY date", (dataset,)).fetchall()
+        return [day for (day,) in rows]
+
+    def screen(self, dataset, columns=None, filters=None, start=None, end=None, last=None):
+        """
+        Rows of `dataset` passing every (column, op, value) filter, as for
+        `stock_fields.read_snapshot`, with a leading "Date" column and the
+        other columns in the schema dtypes, ordered by date and symbol.
+
+        `start` and `end` bound the ISO dates (inclusive); `last` keeps only
+        the latest `last` loaded dates.
+        """
+        columns = list(columns or COLUMNS)
+        where, params = ["dataset = ?"], [dataset]
+        if last:
+            dates = self.dates(dataset)[-last:]
+            start = max(start or "", dates[0]) if dates else start
+        if start:
+            where.append("date >= ?")
+            params.append(start)
+        if end:
+            where.append("date <= ?")
+            params.append(end)
+        for column, op, value in filters or []:
+            if op in ("in", "not in"):
+                value = list(value)
+                where.append(f"{quoted(column)} {SQL_OPERATORS[op]} ({', '.join('?' * len(value))})")
+                params.extend(sql_parameter(column, item) for item in value)
+            else:
+                where.append(f"{quoted(column)} {SQL_OPERATORS[op]} ?")
+                params.append(sql_parameter(column, value))
+        query = (
+            f"SELECT date AS \"Date\", {', '.join(quoted(column) for column in columns)} FROM snapshots "
+            f"WHERE {' AND '.join(where)} ORDER BY date, \"Symbol\""
+        )
+        with self._lock:
+            df = pd.read_sql_query(query, self._db, params=params)
+        typed = {"Date": pd.to_datetime(df["Date"]).dt.as_unit("s")}
+        for column in columns:
+            dtype = SCHEMA[column]
+            values = df[column].to_numpy(dtype=np.float64, na_value=np.nan) if dtype in NUMERIC_DTYPES else df[column].to_numpy()
+            typed[column] = typed_from_plain(values, dtype)
+        return pd.DataFrame(typed)
+
+    def sql(self, query, params=()):
+        """
+        Run any read query against the `snapshots` and `dates` tables; returns a DataFrame as SQLite typed it.
+        """
+        with self._lock:
+            return pd.read_sql_query(query, self._db, params=params)
+
+    def backfill(self, history):
+        """
+        Load every date of a `FundamentalsHistory` that is not loaded yet; returns those dates.
+        """
+        loaded = set(self.dates(history.dataset))
+        missing = [day for day in history.dates() if day not in loaded]
+        for day in missing:
+            self.load(history.snapshot(day), history.dataset, day)
+        return missing
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load or query the screening database.")
+    parser.add_argument("--path", default=SCREENING_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill = commands.add_parser("backfill", help="load the dates of the delta history that are missing")
+    backfill.add_argument("--dataset", default="nyse_daily_stock_data")
+    query = commands.add_parser("sql", help="run a read query and print the result")
+    query.add_argument("query")
+    args = parser.parse_args()
+
+    db = ScreeningDB(args.path)
+    if args.command == "backfill":
+        for day in db.backfill(FundamentalsHistory(args.dataset)):
+            print(f"Loaded {args.dataset} {day}")
+    else:
+        print(db.sql(args.query).to_string())
+    db.close()
@@ -1,149 +1,367 @@
+import os
 
-import pandas as pd
-import yfinance as yf
 import time
 from datetime import datetime
-from google.colab import files
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import pandas as pd
+from stock_fields import conform_frame, fetched_groups, get_info, narrowed, read_snapshot
+from async_fetch import run_async_fetch, MAX_IN_FLIGHT
+from rate_limiter import BURST, REQUESTS_PER_SECOND, WINDOW_LIMIT, WINDOW_SECONDS, configure_shared_limiter, get_shared_limiter
+from quote_batch import fetch_quotes, quote_records, with_quotes
+from yahoo_api import fetch_quote_json, field_fetcher
+from checkpoint import RunJournal, finish_ticker, journal_path
+from record_sink import UNFETCHED, ChunkedCSVSink, collect_results, in_order, unfetched_tickers
+from fetch_metrics import FetchMetrics, metrics_path
+from scheduler import default_priority, market_cap_snapshot
+from dead_letter import DeadLetterStore, retry_dead_letters
+from fetch_errors import is_retryable
+from symbol_registry import SymbolRegistry, read_symbol_file
+from coalescing import Coalescer
+from concurrency import AIMDController, backoff_delay
+from hedging import HedgePolicy
+from response_cache import ResponseCache
+from snapshot_store import SnapshotStore
+
+# Thread pool size when no adaptive concurrency controller is used
+MAX_WORKERS = 5
 
 # Function to fetch data for each ticker
-def fetch_ticker_data(ticker, index, total_tickers):
+def fetch_ticker_data(
+    ticker,
+    index,
+    total_tickers,
+    fetch_info=get_info,
+    limiter=None,
+    controller=None,
+    cache=None,
+    journal=None,
+    metrics=None,
+    dead_letters=None,
+    coalescer=None,
+):
+    # Serve the whole payload from the on-disk cache when every field group fetch_info covers is fresh,
+    # otherwise fetch only the stale groups and merge the fresh ones back in
+    cached = {}
+    if cache:
+        cached, stale = cache.lookup(ticker, fetched_groups(fetch_info))
+        if not stale:
+            print(f"Using cached data for {ticker} ({index}/{total_tickers})")
+            if metrics:
+                metrics.record_ticker("cached")
+            return finish_ticker(ticker, cached, journal)
+        fetch_info = narrowed(fetch_info, stale)
+
     print(f"Fetching data for {ticker} ({index}/{total_tickers})")
-    stock = yf.Ticker(ticker)
-    retries = 3
-    delay = 1  # Initial delay of 1 second
-    while retries > 0:
-        try:
-            # Fetch the stock's detailed info
-            info = stock.info
-            
-            # Sleep for 1 second before each request to prevent rate limits
-            time.sleep(1)
-
-            return {
-                "Symbol": ticker,
-                "Name": info.get("longName", "N/A"),
-                "Sector": info.get("sector", "N/A"),
-                "Industry": info.get("industry", "N/A"),
-                "Country": info.get("country", "N/A"),
-                "Currency": info.get("currency", "N/A"),
-                "Exchange": info.get("exchange", "N/A"),
-                "Website": info.get("website", "N/A"),
-                "Current Price": info.get("currentPrice", "N/A"),
-                "Market Cap": info.get("marketCap", "N/A"),
-                "Enterprise Value": info.get("enterpriseValue", "N/A"),
-                "PE Ratio": info.get("trailingPE", "N/A"),
-                "Forward PE": info.get("forwardPE", "N/A"),
-                "PEG Ratio": info.get("pegRatio", "N/A"),
-                "Price to Book": info.get("priceToBook", "N/A"),
-                "Price to Sales": info.get("priceToSalesTrailing12Months", "N/A"),
-                "Book Value per Share": info.get("bookValue", "N/A"),
-                "Revenue per Share": info.get("revenuePerShare", "N/A"),
-                "Revenue Growth (YoY)": info.get("revenueGrowth", "N/A"),
-                "Earnings Growth (YoY)": info.get("earningsGrowth", "N/A"),
-                "EBITDA Margins": info.get("ebitdaMargins", "N/A"),
-                "Gross Margins": info.get("grossMargins", "N/A"),
-                "Operating Margins": info.get("operatingMargins", "N/A"),
-                "Profit Margins": info.get("profitMargins", "N/A"),
-                "Dividend Rate": info.get("dividendRate", "N/A"),
-                "Dividend Yield": info.get("dividendYield", "N/A"),
-                "Payout Ratio": info.get("payoutRatio", "N/A"),
-                "Five-Year Avg. Dividend Yield": info.get("fiveYearAvgDividendYield", "N/A"),
-                "Ex-Dividend Date": info.get("exDividendDate", "N/A"),
-                "Free Cash Flow": info.get("freeCashflow", "N/A"),
-                "Operating Cash Flow": info.get("operatingCashflow", "N/A"),
-                "Total Cash": info.get("totalCash", "N/A"),
-                "Cash per Share": info.get("totalCashPerShare", "N/A"),
-                "Total Debt": info.get("totalDebt", "N/A"),
-                "Net Debt": info.get("netDebt", "N/A"),
-                "Debt to Equity": info.get("debtToEquity", "N/A"),
-                "Current Ratio": info.get("currentRatio", "N/A"),
-                "Quick Ratio": info.get("quickRatio", "N/A"),
-                "Beta": info.get("beta", "N/A"),
-                "52-Week High": info.get("fiftyTwoWeekHigh", "N/A"),
-                "52-Week Low": info.get("fiftyTwoWeekLow", "N/A"),
-                "Average Volume": info.get("averageVolume", "N/A"),
-                "Regular Market Volume": info.get("regularMarketVolume", "N/A"),
-                "Current Price Change (%)": info.get("regularMarketChangePercent", "N/A"),
-                "1-Year Return": info.get("52WeekChange", "N/A"),
-                "Insider Ownership": info.get("heldPercentInsiders", "N/A"),
-                "Institutional Ownership": info.get("heldPercentInstitutions", "N/A"),
-                "Short Ratio": info.get("shortRatio", "N/A"),
-                "Target High Price": info.get("targetHighPrice", "N/A"),
-                "Target Low Price": info.get("targetLowPrice", "N/A"),
-                "Target Mean Price": info.get("targetMeanPrice", "N/A"),
-                "Recommendation Mean": info.get("recommendationMean", "N/A"),
-                "Number of Analyst Opinions": info.get("numberOfAnalystOpinions", "N/A"),
-                "Return on Assets": info.get("returnOnAssets", "N/A"),
-                "Return on Equity": info.get("returnOnEquity", "N/A"),
-                "Enterprise to EBITDA": info.get("enterpriseToEbitda", "N/A"),
-                "Trailing EPS": info.get("trailingEps", "N/A"),
-                "Forward EPS": info.get("forwardEps", "N/A"),
-                "Total Revenue": info.get("totalRevenue", "N/A"),
-            }
-        except Exception as e:
-            retries -= 1
-            if retries == 0:
-                print(f"Failed to fetch data for {ticker}: {e}")
-            else:
-                time.sleep(delay)  # Exponential backoff on retries
+    limiter = limiter or get_shared_limiter()
+    attempts = 0
+
+    def request():
+        # One rate-limited request with retries; returns the payload or raises the last error
+        nonlocal attempts
+        delay = 1  # Initial delay of 1 second
+        while True:
+            # With a controller, wait for a slot in its adaptive window
+            ticket = controller.acquire() if controller else None
+            attempts += 1
+            started = time.monotonic()
+            try:
+                # Wait for a slot from the shared rate limiter, then fetch the stock's detailed info
+                limiter.acquire()
+                if metrics:
+                    metrics.record_wait(time.monotonic() - started)
+                started = time.monotonic()
+                info = fetch_info(ticker)
+            except Exception as e:
+                if controller:
+                    controller.release(ticket, error=e)
+                if metrics:
+                    metrics.record_request(time.monotonic() - started, error=e)
+                # Unknown symbols and malformed payloads will not fix themselves on a retry
+                if attempts == 3 or not is_retryable(e):
+                    raise
+                # Exponential backoff on retries, shortened while the controller's window is wide
+                pause = backoff_delay(delay, controller)
+                if metrics:
+                    metrics.record_backoff(pause)
+                time.sleep(pause)
                 delay *= 2  # Double delay time with each retry
+            else:
+                latency = time.monotonic() - started
+                if controller:
+                    controller.release(ticket, latency=latency)
+                if metrics:
+                    metrics.record_request(latency, payload=info)
+                return info
 
-# Function to get tickers array from file
+    try:
+        # With a coalescer, a ticker another caller is already fetching is waited for
+        # without taking a rate limiter token or a controller slot
+        info = coalescer.fetch(coalescer.key(fetch_info, ticker), request) if coalescer else request()
+    except Exception as e:
+        print(f"Failed to fetch data for {ticker}: {e}")
+        if metrics:
+            metrics.record_ticker("failed", retries=max(attempts - 1, 0), error=e)
+        if journal:
+            journal.record_failure(ticker, e)
+        if dead_letters:
+            dead_letters.record(ticker, e)
+        return None
+    if metrics:
+        metrics.record_ticker("ok", retries=max(attempts - 1, 0))
+    if cache:
+        cache.put(ticker, info, fetched_groups(fetch_info))
+    if dead_letters:
+        dead_letters.resolve(ticker)
+    return finish_ticker(ticker, {**cached, **info}, journal)
+
+# Function to get tickers array from file (normalized to Yahoo symbols, without duplicates)
 def get_tickers(exchange_name):
-    with open(f"{exchange_name}_SYMBOLS.txt", "r") as file:
-        return file.read().splitlines()
+    return read_symbol_file(exchange_name)
 
 # Function to fetch data for all tickers and collect the results
-def fetch_stock_data(tickers):
+def fetch_stock_data(
+    tickers,
+    use_async=False,
+    max_in_flight=MAX_IN_FLIGHT,
+    fetch_info=get_info,
+    limiter=None,
+    controller=None,
+    quote_batch=False,
+    fundamentals=True,
+    fetch_quote_json=fetch_quote_json,
+    cache=None,
+    journal=None,
+    sink=None,
+    metrics=None,
+    time_budget=None,
+    dead_letters=None,
+    hedge=None,
+    coalescer=None,
+):
+    # With a sink, rows are streamed to it as they complete and an empty frame listing the unfetched tickers is returned.
+    # Tickers are worked through in the order given (see scheduler.prioritize); with a
+    # time_budget in seconds, whatever has not started by then is skipped.
+    # With dead_letters, failures are recorded there and retryable ones get one more pass at the end.
+    # With a hedge policy, detail calls that run past its latency percentile get one duplicate;
+    # give the policy the same controller so duplicates take a slot in its window too.
+    # With a coalescer, tickers another job on this host is fetching are shared with it
     stock_data = []
+    emit = sink.write if sink else stock_data.append
+
+    all_tickers = tickers
+    if journal:
+        # Resume: only fetch tickers that are missing from the journal or failed last time
+        tickers = journal.pending(all_tickers)
+        print(f"Checkpoint {journal.path}: {len(all_tickers) - len(tickers)} of {len(all_tickers)} tickers already done")
+        if sink:
+            for record in journal.records(all_tickers):
+                sink.write(record)
+
+    if quote_batch:
+        # Fill the quote columns in bulk; per-ticker calls are only needed for fundamentals
+        quotes = fetch_quotes(tickers, fetch_quote_json=fetch_quote_json, limiter=limiter, cache=cache, metrics=metrics)
+        if not fundamentals:
+            for record in quote_records(tickers, quotes):
+                if journal:
+                    journal.record_success(record["Symbol"], record)
+                emit(record)
+            return collect_results(stock_data, all_tickers, journal, sink)
+        fetch_info = with_quotes(fetch_info, quotes)
+    if hedge:
+        fetch_info = hedge.wrap(fetch_info)
+
+    if use_async:
+        deadline = time.monotonic() + time_budget if time_budget else None
+        stock_df = run_async_fetch(
+            tickers,
+            max_in_flight=max_in_flight,
+            fetch_info=fetch_info,
+            limiter=limiter,
+            controller=controller,
+            cache=cache,
+            journal=journal,
+            sink=sink,
+            metrics=metrics,
+            time_budget=time_budget,
+            dead_letters=dead_letters,
+            coalescer=coalescer,
+        )
+        if dead_letters:
+            retried = []
+            retry_dead_letters(
+                dead_letters,
+                lambda pending: retried.append(
+                    run_async_fetch(
+                        pending,
+                        max_in_flight=max_in_flight,
+                        fetch_info=fetch_info,
+                        limiter=limiter,
+                        cache=cache,
+                        journal=journal,
+                        sink=sink,
+                        metrics=metrics,
+                        dead_letters=dead_letters,
+                        coalescer=coalescer,
+                    )
+                ),
+                deadline=deadline,
+            )
+            if stock_df is not None:
+                unfetched = unfetched_tickers(stock_df)
+                stock_df = in_order(conform_frame(pd.concat([stock_df, *retried], ignore_index=True)), tickers)
+                stock_df.attrs[UNFETCHED] = unfetched
+        if not sink and not journal:
+            return stock_df
+        return collect_results(stock_data, all_tickers, journal, sink, unfetched_tickers(stock_df))
+
     total_tickers = len(tickers)
     start_time = time.monotonic()
+    deadline = start_time + time_budget if time_budget else None
+    unfetched = []
+
+    # Size the pool for the controller's largest window, or the fixed worker count
+    max_workers = controller.max_window if controller else MAX_WORKERS
+    work = enumerate(tickers, start=1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Submit lazily, a couple of tasks per worker, so finished futures (and their rows)
+        # are released as soon as they are collected
+        def submit_next():
+            nonlocal work, unfetched
+            for index, ticker in work:
+                if deadline and time.monotonic() > deadline:
+                    unfetched = tickers[index - 1:]
+                    work = iter(())
+                    return None
+                return executor.submit(
+                    fetch_ticker_data,
+                    ticker,
+                    index,
+                    total_tickers,
+                    fetch_info=fetch_info,
+                    limiter=limiter,
+                    controller=controller,
+                    cache=cache,
+                    journal=journal,
+                    metrics=metrics,
+                    dead_letters=dead_letters,
+                    coalescer=coalescer,
+                )
+
+        pending = {future for future in (submit_next() for _ in range(max_workers * 2)) if future}
 
-    # Create a thread pool with a maximum of 5 threads
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        # Submit multiple tasks to the pool
-        futures = [executor.submit(fetch_ticker_data, ticker, index, total_tickers) for index, ticker in enumerate(tickers, start=1)]
-        
         # Collect results as each Future completes
-        for future in as_completed(futures):
-            try:
-                result = future.result()  # Retrieve the result from each Future
-                if result:  # Only append if the result is not None
-                    stock_data.append(result)
-            except Exception as e:
-                print(f"An error occurred: {e}")
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()  # Retrieve the result from each Future
+                    if result:  # Only emit if the result is not None
+                        emit(result)
+                except Exception as e:
+                    print(f"An error occurred: {e}")
+                next_future = submit_next()
+                if next_future:
+                    pending.add(next_future)
+
+    if dead_letters:
+        def fetch_again(pending):
+            for index, ticker in enumerate(pending, start=1):
+                result = fetch_ticker_data(
+                    ticker,
+                    index,
+                    len(pending),
+                    fetch_info=fetch_info,
+                    limiter=limiter,
+                    cache=cache,
+                    journal=journal,
+                    metrics=metrics,
+                    dead_letters=dead_letters,
+                    coalescer=coalescer,
+                )
+                if result:
+                    emit(result)
+
+        retry_dead_letters(dead_letters, fetch_again, deadline=deadline)
 
     elapsed_time = time.monotonic() - start_time 
     print(f"All info fetched in {elapsed_time:.2f} seconds")
+    if unfetched:
+        print(f"Time budget of {time_budget}s used up; {len(unfetched)} tickers left unfetched")
+    if controller:
+        print(f"Concurrency controller: {controller.stats()}")
+    if cache:
+        print(f"Response cache: {cache.stats()}")
+    if hedge:
+        print(f"Hedged requests: {hedge.stats()}")
+    if metrics:
+        print(f"Fetch metrics: {metrics.report()}")
 
-    return pd.DataFrame(stock_data)
+    return collect_results(stock_data, all_tickers, journal, sink, unfetched)
 
 if __name__ == "__main__":
-    # Fetch tickers from the custom list and TSX Composite
-    custom_tickers = get_tickers("NYSE")
-    canadian_tickers = get_tickers("TSX")
-
-    # Combine both lists without limiting the number of stocks
-    top_tickers = custom_tickers + canadian_tickers
-
-    # Fetch stock data
-    stock_df = fetch_stock_data(top_tickers)
+    # Fetch tickers from the custom list and TSX Composite, deduplicated through the symbol registry
+    registry = SymbolRegistry()
+    tickers = registry.load_universe(("NYSE", "TSX"))
+    registry.save()
 
     # Get the current date
     current_date = datetime.now().strftime("%Y-%m-%d")
 
-    # Define file names with the current date
-    csv_file_name = f"custom_us_canadian_stocks_{current_date}.csv"
-    excel_file_name = f"custom_us_canadian_stocks_{current_date}.xlsx"
+    # Combine both lists without limiting the number of stocks, most important first
+    # (by market cap in the last run's file, strategy hits and the watchlist)
+    store = SnapshotStore()
+    previous_file = store.latest_path("custom_us_canadian_stocks")
+    top_tickers = default_priority(tickers, market_cap_snapshot(previous_file))
+
+    # Rows stream to a staging CSV while the run is going; the snapshot store keeps the result
+    csv_file_name = os.path.join(".cache", f"custom_us_canadian_stocks_{current_date}.csv")
+
+    # Fetch stock data, journaling each ticker so a rerun today resumes where this one stopped,
+    # and streaming rows to the CSV in chunks as they complete
+    # Symbols that have been "not found" for several nights running are left out, and tickers
+    # another job on this machine is fetching at the same time are shared with it
+    journal = RunJournal(journal_path(f"custom_us_canadian_stocks_{current_date}"))
+    metrics = FetchMetrics()
+    dead_letters = DeadLetterStore()
+    coalescer = Coalescer()
+    # Cached field groups that are still fresh are reused; only the expired ones are requested
+    cache = ResponseCache()
+    top_tickers = dead_letters.active(top_tickers)
+    # The default limits: 3 requests/s sustained, so the 3,895 NYSE and TSX symbols take about 21 minutes (see `rate_limiter`)
+    limiter = configure_shared_limiter(rate=REQUESTS_PER_SECOND, burst=BURST, window_limit=WINDOW_LIMIT, window=WINDOW_SECONDS)
+    print(f"Rate limiter: {len(top_tickers)} tickers take at least {limiter.expected_seconds(len(top_tickers)) / 60:.0f} minutes")
+    # The pool widens until Yahoo pushes back with 429s or slow responses, then settles just under that
+    controller = AIMDController()
+    # Calls that hang past the 95th percentile get one duplicate, within the shared rate limit and the controller's window
+    hedge = HedgePolicy(controller=controller)
+    with ChunkedCSVSink(csv_file_name) as sink:
+        fetch_stock_data(
+            top_tickers,
+            fetch_info=field_fetcher(),
+            journal=journal,
+            sink=sink,
+            metrics=metrics,
+            dead_letters=dead_letters,
+            controller=controller,
+            cache=cache,
+            hedge=hedge,
+            coalescer=coalescer,
+        )
+    journal.close()
+    cache.close()
+    hedge.close()
+    print(f"Coalesced requests: {coalescer.stats()}")
+    coalescer.close()
+    dead_letters.save()
+    metrics.write(metrics_path(f"custom_us_canadian_stocks_{current_date}"))
 
-    # Save to CSV and Excel
-    stock_df.to_csv(csv_file_name, index=False)
-    stock_df.to_excel(excel_file_name, index=False)
+    # CSV and Excel copies are made on demand with `python snapshot_store.py export`
+    # Rows were written as they completed and in priority order; the snapshot keeps the universe's order
+    snapshot_file = store.write(in_order(read_snapshot(csv_file_name), tickers), "custom_us_canadian_stocks", current_date)
+    os.remove(csv_file_name)
 
-    print(
-        f"Data for custom US and Canadian stocks has been saved to {csv_file_name} and {excel_file_name}"
-    )
+    print(f"Data for custom US and Canadian stocks has been saved to {snapshot_file}")
 
-    # Automatically download the CSV file
-    files.download(csv_file_name)
+    # Automatically download the snapshot
+    from google.colab import files
+    files.download(snapshot_file)
@@ -1,97 +1,261 @@
-import pandas as pd
-import yfinance as yf
 import time
+from datetime import datetime
+from stock_fields import fetched_groups, get_info, narrowed
+from checkpoint import RunJournal, finish_ticker, journal_path
+from rate_limiter import BURST, REQUESTS_PER_SECOND, WINDOW_LIMIT, WINDOW_SECONDS, configure_shared_limiter, get_shared_limiter
+from quote_batch import fetch_quotes, quote_records, with_quotes
+from yahoo_api import fetch_quote_json, field_fetcher
+from record_sink import collect_results
+from fetch_metrics import FetchMetrics, metrics_path
+from incremental import freshness_path, latest_snapshot, refresh_snapshot
+from scheduler import default_priority, market_cap_snapshot
+from sharding import fetch_sharded
+from dead_letter import DeadLetterStore, retry_dead_letters
+from symbol_registry import SymbolRegistry, read_symbol_file
+from coalescing import Coalescer
+from snapshot_store import SnapshotStore
+from fundamentals_history import FundamentalsHistory, restore_latest
+from screening_db import ScreeningDB
+from response_cache import ResponseCache
 
-API_DELAY = 0.2
-BATCH_SIZE = 400
-PAUSE_DURATION = 240
-
-def fetch_stock_data(tickers):
+def fetch_stock_data(
+    tickers,
+    fetch_info=get_info,
+    limiter=None,
+    quote_batch=False,
+    fundamentals=True,
+    fetch_quote_json=fetch_quote_json,
+    cache=None,
+    journal=None,
+    sink=None,
+    metrics=None,
+    time_budget=None,
+    dead_letters=None,
+    coalescer=None,
+):
     """
     Fetch stock information for a list of tickers.
+
+    With `quote_batch`, quote columns come from multi-symbol requests and
+    `fundamentals=False` skips the per-ticker detail call entirely.
+    With a `cache`, tickers whose cached field groups are all fresh skip the network,
+    and the others fetch only their stale groups.
+    With a `journal`, tickers it already holds are skipped and new ones are appended to it.
+    With a `sink`, rows are streamed to it in chunks and the returned frame
+    is empty apart from the unfetched tickers (see `record_sink.collect_results`).
+    With `metrics`, every request is recorded to it.
+    Tickers are fetched in the order given; with `time_budget` (seconds), the
+    run stops starting new tickers once it is used up.
+    With `dead_letters`, failures are recorded there and retryable ones are
+    retried once the main pass is done.
+    With a `coalescer`, tickers another job on this host is fetching are
+    shared with it, without taking a rate limiter token.
     """
+    limiter = limiter or get_shared_limiter()
+    deadline = time.monotonic() + time_budget if time_budget else None
     stock_data = []
-    for i, ticker in enumerate(tickers):
-        print(f"Fetching data for {ticker} ({i + 1}/{len(tickers)})...")
+    emit = sink.write if sink else stock_data.append
+    all_tickers = tickers
+    if journal:
+        tickers = journal.pending(all_tickers)
+        print(f"Checkpoint {journal.path}: {len(all_tickers) - len(tickers)} of {len(all_tickers)} tickers already done")
+        if sink:
+            for record in journal.records(all_tickers):
+                sink.write(record)
+
+    if quote_batch:
+        quotes = fetch_quotes(tickers, fetch_quote_json=fetch_quote_json, limiter=limiter, cache=cache, metrics=metrics)
+        if not fundamentals:
+            for record in quote_records(tickers, quotes):
+                if journal:
+                    journal.record_success(record["Symbol"], record)
+                emit(record)
+            return collect_results(stock_data, all_tickers, journal, sink)
+        fetch_info = with_quotes(fetch_info, quotes)
+    def request(ticker, fetch_info):
+        """
+        One rate-limited request for `ticker`.
+        """
+        started = time.monotonic()
+        limiter.acquire()
+        if metrics:
+            metrics.record_wait(time.monotonic() - started)
+        started = time.monotonic()
         try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            stock_data.append(
-                {
-                    "Symbol": ticker,
-                    "Name": info.get("longName", "N/A"),
-                    "Sector": info.get("sector", "N/A"),
-                    "Industry": info.get("industry", "N/A"),
-                    "Country": info.get("country", "N/A"),
-                    "Currency": info.get("currency", "N/A"),
-                    "Exchange": info.get("exchange", "N/A"),
-                    "Website": info.get("website", "N/A"),
-                    "Current Price": info.get("currentPrice", "N/A"),
-                    "Market Cap": info.get("marketCap", "N/A"),
-                    "Enterprise Value": info.get("enterpriseValue", "N/A"),
-                    "PE Ratio": info.get("trailingPE", "N/A"),
-                    "Forward PE": info.get("forwardPE", "N/A"),
-                    "PEG Ratio": info.get("pegRatio", "N/A"),
-                    "Price to Book": info.get("priceToBook", "N/A"),
-                    "Price to Sales": info.get("priceToSalesTrailing12Months", "N/A"),
-                    "Book Value per Share": info.get("bookValue", "N/A"),
-                    "Revenue per Share": info.get("revenuePerShare", "N/A"),
-                    "Revenue Growth (YoY)": info.get("revenueGrowth", "N/A"),
-                    "Earnings Growth (YoY)": info.get("earningsGrowth", "N/A"),
-                    "EBITDA Margins": info.get("ebitdaMargins", "N/A"),
-                    "Gross Margins": info.get("grossMargins", "N/A"),
-                    "Operating Margins": info.get("operatingMargins", "N/A"),
-                    "Profit Margins": info.get("profitMargins", "N/A"),
-                    "Dividend Rate": info.get("dividendRate", "N/A"),
-                    "Dividend Yield": info.get("dividendYield", "N/A"),
-                    "Payout Ratio": info.get("payoutRatio", "N/A"),
-                    "Five-Year Avg. Dividend Yield": info.get("fiveYearAvgDividendYield", "N/A"),
-                    "Ex-Dividend Date": info.get("exDividendDate", "N/A"),
-                    "Free Cash Flow": info.get("freeCashflow", "N/A"),
-                    "Operating Cash Flow": info.get("operatingCashflow", "N/A"),
-                    "Total Cash": info.get("totalCash", "N/A"),
-                    "Cash per Share": info.get("totalCashPerShare", "N/A"),
-                    "Total Debt": info.get("totalDebt", "N/A"),
-                    "Net Debt": info.get("netDebt", "N/A"),
-                    "Debt to Equity": info.get("debtToEquity", "N/A"),
-                    "Current Ratio": info.get("currentRatio", "N/A"),
-                    "Quick Ratio": info.get("quickRatio", "N/A"),
-                    "Beta": info.get("beta", "N/A"),
-                    "52-Week High": info.get("fiftyTwoWeekHigh", "N/A"),
-                    "52-Week Low": info.get("fiftyTwoWeekLow", "N/A"),
-                    "Average Volume": info.get("averageVolume", "N/A"),
-                    "Regular Market Volume": info.get("regularMarketVolume", "N/A"),
-                    "Current Price Change (%)": info.get("regularMarketChangePercent", "N/A"),
-                    "1-Year Return": info.get("52WeekChange", "N/A"),
-                    "Insider Ownership": info.get("heldPercentInsiders", "N/A"),
-                    "Institutional Ownership": info.get("heldPercentInstitutions", "N/A"),
-                    "Short Ratio": info.get("shortRatio", "N/A"),
-                    "Target High Price": info.get("targetHighPrice", "N/A"),
-                    "Target Low Price": info.get("targetLowPrice", "N/A"),
-                    "Target Mean Price": info.get("targetMeanPrice", "N/A"),
-                    "Recommendation Mean": info.get("recommendationMean", "N/A"),
-                    "Number of Analyst Opinions": info.get("numberOfAnalystOpinions", "N/A"),
-                    "Return on Assets": info.get("returnOnAssets", "N/A"),
-                    "Return on Equity": info.get("returnOnEquity", "N/A"),
-                    "Enterprise to EBITDA": info.get("enterpriseToEbitda", "N/A"),
-                    "Trailing EPS": info.get("trailingEps", "N/A"),
-                    "Forward EPS": info.get("forwardEps", "N/A"),
-                    "Total Revenue": info.get("totalRevenue", "N/A"),
-                }
-            )
+            info = fetch_info(ticker)
         except Exception as e:
-            print(f"Error fetching data for {ticker}: {e}")
-        time.sleep(API_DELAY)
-        if (i + 1) % BATCH_SIZE == 0:
-            print(f"Pausing for {PAUSE_DURATION} seconds after {i + 1} tickers...")
-            time.sleep(PAUSE_DURATION)
-    return pd.DataFrame(stock_data)
+            if metrics:
+                metrics.record_request(time.monotonic() - started, error=e)
+            raise
+        if metrics:
+            metrics.record_request(time.monotonic() - started, payload=info)
+        return info
+
+    def fetch_each(pending):
+        """
+        Fetch `pending` in order; returns the tickers the time budget cut off.
+        """
+        for i, ticker in enumerate(pending):
+            if deadline and time.monotonic() > deadline:
+                print(f"Time budget of {time_budget}s used up; {len(pending) - i} tickers left unfetched")
+                return pending[i:]
+            cached, stale = cache.lookup(ticker, fetched_groups(fetch_info)) if cache else ({}, fetched_groups(fetch_info))
+            if not stale:
+                if metrics:
+                    metrics.record_ticker("cached")
+                emit(finish_ticker(ticker, cached, journal))
+                continue
+            # Only the stale groups are fetched; the fresh ones are merged back in
+            fetch = narrowed(fetch_info, stale) if cache else fetch_info
+            print(f"Fetching data for {ticker} ({i + 1}/{len(pending)})...")
+            try:
+                if coalescer:
+                    info = coalescer.fetch(coalescer.key(fetch, ticker), lambda: request(ticker, fetch))
+                else:
+                    info = request(ticker, fetch)
+                if metrics:
+                    metrics.record_ticker("ok")
+                if cache:
+                    cache.put(ticker, info, fetched_groups(fetch))
+                if dead_letters:
+                    dead_letters.resolve(ticker)
+                emit(finish_ticker(ticker, {**cached, **info}, journal))
+            except Exception as e:
+                print(f"Error fetching data for {ticker}: {e}")
+                if metrics:
+                    metrics.record_ticker("failed", error=e)
+                if journal:
+                    journal.record_failure(ticker, e)
+                if dead_letters:
+                    dead_letters.record(ticker, e)
+        return []
 
-def get_stock_data():
+    unfetched = fetch_each(tickers)
+    if dead_letters:
+        # This path does not retry inline, so throttled and timed-out tickers get their second chance here
+        retry_dead_letters(dead_letters, fetch_each, deadline=deadline)
+    print(f"Rate limiter: {limiter.stats()}")
+    if cache:
+        print(f"Response cache: {cache.stats()}")
+    if metrics:
+        print(f"Fetch metrics: {metrics.report()}")
+    return collect_results(stock_data, all_tickers, journal, sink, unfetched)
+
+def get_stock_data(
+    cache=None,
+    checkpoint=None,
+    metrics=None,
+    previous_snapshot=None,
+    time_budget=None,
+    workers=None,
+    dead_letters=None,
+    registry=None,
+    coalescer=None,
+    hedge=None,
+    dataset="nyse_daily_stock_data",
+    rate_limits=None,
+):
     """
     Fetch stock data for all tickers in NYSE_SYMBOLS.txt.
+
+    `checkpoint` is a journal file path; rerunning with the same path resumes
+    a crashed run instead of starting over. With `previous_snapshot`, only
+    stale, failed or event-affected symbols are refetched and the other rows
+    are carried forward from it (see `incremental`); either way the
+    freshness record of `dataset` is updated. Tickers are fetched in
+    priority order (see `scheduler`), so a `time_budget` in seconds cuts off
+    the least important ones. With `workers`, the fetch is sharded across that
+    many worker processes instead (see `sharding`); the workers have no shared
+    cache, journal, metrics, dead letters, coalescer, hedge or time budget, so
+    combining any of those with `workers` raises ValueError. With `dead_letters`,
+    symbols flagged as not found are left out and failures are recorded.
+    With a `registry`, the universe is loaded through it, so new and removed
+    symbols are recorded there (see `symbol_registry`). With a `coalescer`,
+    tickers another job on this host is already fetching are shared with it
+    instead of fetched twice (see `coalescing`). With a `hedge` policy, calls
+    that run past its latency percentile get one duplicate (see `hedging`).
+    `rate_limits` are `RateLimiter` keyword arguments for the shared limiter
+    (see `rate_limiter.configure_shared_limiter`); the shard workers set their own.
     """
-    input_file = "NYSE_SYMBOLS.txt"
-    with open(input_file, "r") as file:
-        tickers = [line.strip() for line in file.readlines()]
-    return fetch_stock_data(tickers)
+    if workers:
+        options = dict(cache=cache, checkpoint=checkpoint, metrics=metrics, time_budget=time_budget,
+                       dead_letters=dead_letters, coalescer=coalescer, hedge=hedge, rate_limits=rate_limits)
+        combined = [name for name, value in options.items() if value]
+        if combined:
+            raise ValueError(f"workers cannot be combined with {', '.join(combined)}")
+    tickers = registry.load_universe(("NYSE",)) if registry else read_symbol_file("NYSE")
+    if dead_letters:
+        tickers = dead_letters.active(tickers)
+    if not workers:
+        limiter = configure_shared_limiter(**rate_limits) if rate_limits else get_shared_limiter()
+        print(f"Rate limiter: a full refetch of {len(tickers)} tickers takes at least {limiter.expected_seconds(len(tickers)) / 60:.0f} minutes")
+    snapshot = market_cap_snapshot(previous_snapshot)
+    journal = RunJournal(checkpoint) if checkpoint else None
+    # Only the quoteSummary modules the schema needs, instead of the full `.info`
+    fetch_info = field_fetcher()
+    if hedge:
+        fetch_info = hedge.wrap(fetch_info)
+    if workers:
+        fetch = lambda pending: fetch_sharded(default_priority(pending, snapshot, dataset), workers=workers)
+    else:
+        fetch = lambda pending: fetch_stock_data(
+            default_priority(pending, snapshot, dataset),
+            fetch_info=fetch_info,
+            cache=cache,
+            journal=journal,
+            metrics=metrics,
+            time_budget=time_budget,
+            dead_letters=dead_letters,
+            coalescer=coalescer,
+        )
+    try:
+        # Without a previous snapshot every ticker is refetched; the result keeps the symbol file's order
+        return refresh_snapshot(
+            tickers,
+            fetch,
+            previous_snapshot,
+            freshness_path(dataset),
+            fetch_carried_quotes=lambda carried: fetch_quotes(carried, cache=cache, metrics=metrics),
+        )
+    finally:
+        if journal:
+            journal.close()
+
+
+if __name__ == "__main__":
+    today = datetime.now().strftime("%Y-%m-%d")
+    store = SnapshotStore()
+    history = FundamentalsHistory("nyse_daily_stock_data")
+    # Find yesterday's snapshot before today's file exists; the CSVs predate the snapshot store
+    previous = restore_latest(history, store) or latest_snapshot()
+    metrics = FetchMetrics()
+    dead_letters = DeadLetterStore()
+    registry = SymbolRegistry()
+    coalescer = Coalescer()
+    # Profile and fundamentals outlive a night in the cache, so most refetches only ask for quotes
+    cache = ResponseCache()
+    stock_data = get_stock_data(
+        cache=cache,
+        # The default limits: 3 requests/s sustained, about 17 minutes for a full NYSE refetch (see `rate_limiter`)
+        rate_limits=dict(rate=REQUESTS_PER_SECOND, burst=BURST, window_limit=WINDOW_LIMIT, window=WINDOW_SECONDS),
+        checkpoint=journal_path(f"nyse_daily_stock_data_{today}"),
+        metrics=metrics,
+        previous_snapshot=previous,
+        dead_letters=dead_letters,
+        registry=registry,
+        coalescer=coalescer,
+    )
+    print(f"Coalesced requests: {coalescer.stats()}")
+    coalescer.close()
+    cache.close()
+    dead_letters.save()
+    registry.save()
+    output_file = store.write(stock_data, "nyse_daily_stock_data", today)
+    # The committed record: a monthly base plus the cells that changed each day
+    history.append(stock_data, today)
+    # Indexed for screening across dates (see `screening_db`)
+    screening = ScreeningDB()
+    screening.load(stock_data, "nyse_daily_stock_data", today)
+    screening.close()
+    metrics.write(metrics_path(f"nyse_daily_stock_data_{today}"))
+    print(f"Saved {len(stock_data)} rows to {output_file}")
@@ -0,0 +1,359 @@
+"""
+Sharded fetch across worker processes or hosts.
+
+The coordinator splits the symbol list into shards in a SQLite queue.
+Workers lease one shard at a time, fetch it, write the rows to their own
+CSV, and mark the shard done. A worker that dies stops renewing its lease;
+once the lease expires, the shard goes to the next worker that asks. When
+the queue is drained, `merge_shards` stitches the partial files back into
+one snapshot in input order.
+
+Workers on other hosts need the queue file and output directory on shared
+storage:
+    python sharding.py --queue .cache/shards/queue.sqlite --output .cache/shards
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import pandas as pd
+from rate_limiter import BURST, REQUESTS_PER_SECOND, WINDOW_LIMIT, RateLimiter, get_shared_limiter
+from stock_fields import conform_frame, read_snapshot
+from yahoo_api import field_fetcher
+
+SHARD_DIR = os.path.join(".cache", "shards")
+SHARD_SIZE = 100
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 3
+POLL_SECONDS = 1.0
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+# `DataFrame.attrs` key under which `merge_shards` lists the tickers of shards given up on
+FAILED_TICKERS = "failed_tickers"
+
+
+class ShardQueue:
+    def __init__(self, path=os.path.join(SHARD_DIR, "queue.sqlite"), lease_seconds=LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Autocommit mode, so leases can take the write lock explicitly with BEGIN IMMEDIATE
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS shards (
+                id INTEGER PRIMARY KEY,
+                tickers TEXT NOT NULL,
+                status TEXT NOT NULL,
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                output TEXT,
+                error TEXT
+            )
+            """
+        )
+        self._lock = threading.Lock()
+
+    def enqueue(self, tickers, shard_size=SHARD_SIZE):
+        """
+        Replace a finished queue with `tickers` split into shards; returns the shard count.
+
+        Raises RuntimeError while shards of an earlier run are still pending or
+        leased, since workers on other hosts may still be fetching them.
+        """
+        shards = [tickers[i:i + shard_size] for i in range(0, len(tickers), shard_size)]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            (unfinished,) = self._db.execute(
+                "SELECT COUNT(*) FROM shards WHERE status IN (?, ?)", (PENDING, LEASED)
+            ).fetchone()
+            if unfinished:
+                self._db.execute("ROLLBACK")
+                raise RuntimeError(f"{self.path} still has {unfinished} unfinished shards; drain it or use another queue")
+            self._db.execute("DELETE FROM shards")
+            self._db.executemany(
+                "INSERT INTO shards (id, tickers, status) VALUES (?, ?, ?)",
+                [(number, json.dumps(shard), PENDING) for number, shard in enumerate(shards)],
+            )
+            self._db.execute("COMMIT")
+        return len(shards)
+
+    def lease(self, worker, max_attempts=MAX_ATTEMPTS):
+        """
+        Take the next pending or expired shard; returns (shard_id, tickers) or None.
+
+        An expired shard that has already been leased `max_attempts` times is
+        given up on instead, so a shard that kills its workers is not retried forever.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute(
+                """
+                UPDATE shards SET status = ?, worker = NULL, lease_expires = NULL, error = ?
+                WHERE status = ? AND lease_expires < ? AND attempts >= ?
+                """,
+                (FAILED, f"lease expired {max_attempts} times", LEASED, now, max_attempts),
+            )
+            row = self._db.execute(
+                """
+                SELECT id, tickers FROM shards
+                WHERE status = ? OR (status = ? AND lease_expires < ?)
+                ORDER BY id LIMIT 1
+                """,
+                (PENDING, LEASED, now),
+            ).fetchone()
+            if row:
+                self._db.execute(
+                    "UPDATE shards SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                    (LEASED, worker, now + self.lease_seconds, row[0]),
+                )
+            self._db.execute("COMMIT")
+        return (row[0], json.loads(row[1])) if row else None
+
+    def renew(self, shard_id, worker):
+        """
+        Extend a lease; returns False if the shard has been reassigned.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE shards SET lease_expires = ? WHERE id = ? AND worker = ? AND status = ?",
+                (time.time() + self.lease_seconds, shard_id, worker, LEASED),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, shard_id, worker, output):
+        """
+        Record a finished shard; ignored (returns False) if the lease was lost meanwhile.
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE shards SET status = ?, output = ?, lease_expires = NULL WHERE id = ? AND worker = ? AND status = ?",
+                (DONE, output, shard_id, worker, LEASED),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, shard_id, worker, error, max_attempts=MAX_ATTEMPTS):
+        """
+        Hand a shard back after an error; it is given up on after `max_attempts` leases.
+        """
+        with self._lock:
+            self._db.execute(
+                """
+                UPDATE shards SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,
+                    worker = NULL, lease_expires = NULL, error = ?
+                WHERE id = ? AND worker = ? AND status = ?
+                """,
+                (max_attempts, FAILED, PENDING, str(error), shard_id, worker, LEASED),
+            )
+
+    def progress(self):
+        """
+        {status: shard count}.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM shards GROUP BY status").fetchall()
+        return dict(rows)
+
+    def unfinished(self):
+        progress = self.progress()
+        return progress.get(PENDING, 0) + progress.get(LEASED, 0)
+
+    def outputs(self):
+        """
+        Output files of finished shards, in shard order.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT output FROM shards WHERE status = ? ORDER BY id", (DONE,)).fetchall()
+        return [output for (output,) in rows]
+
+    def failed_tickers(self):
+        """
+        Tickers of shards given up on after `MAX_ATTEMPTS`, in shard order.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT tickers FROM shards WHERE status = ? ORDER BY id", (FAILED,)).fetchall()
+        return [ticker for (tickers,) in rows for ticker in json.loads(tickers)]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def keep_lease(queue, shard_id, worker, stop):
+    """
+    Heartbeat: renew the lease every third of its length until `stop` is set.
+    """
+    while not stop.wait(queue.lease_seconds / 3):
+        if not queue.renew(shard_id, worker):
+            return
+
+
+def run_worker(
+    queue_path,
+    output_dir=SHARD_DIR,
+    worker=None,
+    info_url=None,
+    rate=None,
+    lease_seconds=LEASE_SECONDS,
+    quiet=False,
+    share=1,
+):
+    """
+    Lease and fetch shards until the queue is drained; returns the number of shards completed.
+
+    `info_url` points the worker at a Yahoo-compatible `.info` server such as
+    the stand-in instead of yfinance. Each worker has its own rate limit
+    (`rate` requests/second, default `rate_limiter.REQUESTS_PER_SECOND`), since
+    workers are meant to run from separate egress IPs. Workers that share an
+    IP pass `share`, the number of them, and each takes that fraction of the limit.
+    """
+    # Imported here so spawned worker processes only pay for what they use
+    from script_v8 import fetch_stock_data
+
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    if info_url:
+        from stand_in_server import http_info_fetcher
+
+        fetch_info = http_info_fetcher(info_url)
+    else:
+        fetch_info = field_fetcher()
+    if rate:
+        limiter = RateLimiter(rate=rate / share, burst=max(1, rate / share), window_limit=None)
+    elif share > 1:
+        limiter = RateLimiter(
+            rate=REQUESTS_PER_SECOND / share, burst=max(1, BURST / share), window_limit=max(1, WINDOW_LIMIT // share)
+        )
+    else:
+        limiter = get_shared_limiter()
+    queue = ShardQueue(queue_path, lease_seconds=lease_seconds)
+    os.makedirs(output_dir, exist_ok=True)
+    completed = 0
+    while True:
+        leased = queue.lease(worker)
+        if leased is None:
+            if not queue.unfinished():
+                break
+            # Everything left is leased to someone else; wait in case a lease expires
+            time.sleep(POLL_SECONDS)
+            continue
+        shard_id, tickers = leased
+        stop = threading.Event()
+        threading.Thread(target=keep_lease, args=(queue, shard_id, worker, stop), daemon=True).start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+                df = fetch_stock_data(tickers, fetch_info=fetch_info, limiter=limiter)
+            output = os.path.join(output_dir, f"shard_{shard_id:05d}_{worker}.csv")
+            # Write under a temp name and rename, so a merge never reads a partial file
+            df.to_csv(f"{output}.tmp", index=False)
+            os.replace(f"{output}.tmp", output)
+        except Exception as e:
+            print(f"Worker {worker} failed shard {shard_id}: {e}")
+            queue.fail(shard_id, worker, e)
+        else:
+            if queue.complete(shard_id, worker, output):
+                completed += 1
+            else:
+                print(f"Worker {worker} lost the lease on shard {shard_id}; result discarded")
+        finally:
+            stop.set()
+    queue.close()
+    return completed
+
+
+def merge_shards(queue, tickers=None):
+    """
+    One DataFrame from all finished shards, in `tickers` order when given.
+
+    Tickers of failed shards are reported and listed in `attrs[FAILED_TICKERS]`.
+    """
+    failed = queue.failed_tickers()
+    if failed:
+        print(f"{len(failed)} tickers in failed shards were not fetched: {', '.join(failed[:20])}{' ...' if len(failed) > 20 else ''}")
+    frames = [conform_frame(read_snapshot(output)) for output in queue.outputs()]
+    if not frames:
+        merged = conform_frame(pd.DataFrame())
+    else:
+        merged = pd.concat(frames, ignore_index=True).drop_duplicates("Symbol")
+        if tickers is not None:
+            order = {ticker: position for position, ticker in enumerate(tickers)}
+            merged = merged.sort_values("Symbol", key=lambda symbols: symbols.map(order), kind="stable")
+        merged = conform_frame(merged.reset_index(drop=True))
+    merged.attrs[FAILED_TICKERS] = failed
+    return merged
+
+
+def fetch_sharded(
+    tickers,
+    workers=4,
+    queue_path=os.path.join(SHARD_DIR, "queue.sqlite"),
+    output_dir=SHARD_DIR,
+    shard_size=SHARD_SIZE,
+    info_url=None,
+    rate=None,
+    lease_seconds=LEASE_SECONDS,
+    quiet=True,
+):
+    """
+    Coordinator: queue `tickers`, run `workers` local worker processes, and merge their output.
+
+    The local workers share this host's IP, so they split one rate limit
+    (`rate`, or the `rate_limiter` defaults) between them. Workers started on
+    other hosts against the same queue join in automatically.
+    """
+    queue = ShardQueue(queue_path, lease_seconds=lease_seconds)
+    shards = queue.enqueue(tickers, shard_size)
+    print(f"Queued {len(tickers)} tickers in {shards} shards for {workers} workers")
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(
+            target=run_worker,
+            args=(queue_path, output_dir),
+            kwargs=dict(
+                worker=f"{socket.gethostname()}-w{number}",
+                info_url=info_url,
+                rate=rate,
+                lease_seconds=lease_seconds,
+                quiet=quiet,
+                share=workers,
+            ),
+        )
+        for number in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    # Any shard still open here lost all its workers; finish it in-process
+    if queue.unfinished():
+        worker = f"{socket.gethostname()}-coordinator"
+        run_worker(queue_path, output_dir, worker, info_url=info_url, rate=rate, lease_seconds=lease_seconds, quiet=quiet)
+    print(f"Shard queue: {queue.progress()}")
+    merged = merge_shards(queue, tickers)
+    queue.close()
+    return merged
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a shard worker against an existing queue.")
+    parser.add_argument("--queue", default=os.path.join(SHARD_DIR, "queue.sqlite"))
+    parser.add_argument("--output", default=SHARD_DIR)
+    parser.add_argument("--info-url", default=None)
+    parser.add_argument("--rate", type=float, default=None, help="requests/second for this worker")
+    args = parser.parse_args()
+
+    completed = run_worker(args.queue, args.output, info_url=args.info_url, rate=args.rate)
+    print(f"Completed {completed} shards")
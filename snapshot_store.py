@@ -0,0 +1,162 @@
+"""
+Columnar snapshot store.
+
+Each day's fetch is written once as a zstd-compressed Parquet file, which
+carries its own schema (the `stock_fields` dtypes, categories included) and
+per-column min/max/null statistics, so readers neither re-parse text nor
+guess types. A JSON catalog next to the files lists the dates available for
+each dataset with their row counts and sizes:
+    Data/snapshots/nyse_daily_stock_data_2024-11-22.parquet
+    Data/snapshots/catalog.json
+
+CSV and Excel are export formats only, produced on demand:
+    python snapshot_store.py list
+    python snapshot_store.py export nyse_daily_stock_data --date 2024-11-22 --output out.xlsx
+    python snapshot_store.py import Data/stock_data_2024-11-22.csv --dataset stock_data
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+from stock_fields import conform_frame, read_snapshot
+
+SNAPSHOT_DIR = os.path.join("Data", "snapshots")
+COMPRESSION = "zstd"
+# Rows per row group; one group per day keeps the statistics whole-file for typical universes
+ROW_GROUP_SIZE = 1 << 17
+DATE_IN_NAME = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+class SnapshotStore:
+    def __init__(self, directory=SNAPSHOT_DIR):
+        self.directory = directory
+        # dataset -> {date: {"file", "rows", "bytes", "written"}}
+        self.catalog = {}
+        if os.path.exists(self.catalog_path):
+            with open(self.catalog_path, encoding="utf-8") as file:
+                self.catalog = json.load(file)
+
+    @property
+    def catalog_path(self):
+        return os.path.join(self.directory, "catalog.json")
+
+    def path(self, dataset, day):
+        return os.path.join(self.directory, f"{dataset}_{day}.parquet")
+
+    def dates(self, dataset):
+        """
+        ISO dates stored for `dataset`, oldest first.
+        """
+        return sorted(self.catalog.get(dataset, {}))
+
+    def latest(self, dataset):
+        """
+        Newest stored date for `dataset`, or None.
+        """
+        dates = self.dates(dataset)
+        return dates[-1] if dates else None
+
+    def latest_path(self, dataset):
+        day = self.latest(dataset)
+        return self.path(dataset, day) if day else None
+
+    def write(self, df, dataset, day):
+        """
+        Store `df` as `dataset`'s snapshot for ISO date `day`, replacing any earlier one; returns the path.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(dataset, day)
+        table = pa.Table.from_pandas(conform_frame(df.reset_index(drop=True)), preserve_index=False)
+        metadata = {**(table.schema.metadata or {}), b"dataset": dataset.encode(), b"date": day.encode()}
+        table = table.replace_schema_metadata(metadata)
+        pq.write_table(table, f"{path}.tmp", compression=COMPRESSION, row_group_size=ROW_GROUP_SIZE)
+        os.replace(f"{path}.tmp", path)
+        self.catalog.setdefault(dataset, {})[day] = {
+            "file": os.path.basename(path),
+            "rows": table.num_rows,
+            "bytes": os.path.getsize(path),
+            "written": time.time(),
+        }
+        self.save()
+        return path
+
+    def read(self, dataset, day=None, columns=None):
+        """
+        `dataset`'s snapshot for `day` (default the latest) in the schema dtypes; None if there is none.
+        """
+        day = day or self.latest(dataset)
+        if day is None or day not in self.catalog.get(dataset, {}):
+            return None
+        return read_snapshot(self.path(dataset, day), columns=columns)
+
+    def stats(self, dataset, day=None):
+        """
+        {column: {"min", "max", "nulls"}} from the file's embedded statistics, without reading any data.
+        """
+        day = day or self.latest(dataset)
+        metadata = pq.ParquetFile(self.path(dataset, day)).metadata
+        stats = {}
+        for group in range(metadata.num_row_groups):
+            row_group = metadata.row_group(group)
+            for index in range(row_group.num_columns):
+                chunk = row_group.column(index)
+                column = stats.setdefault(chunk.path_in_schema, {"min": None, "max": None, "nulls": 0})
+                if chunk.statistics is None:
+                    continue
+                column["nulls"] += chunk.statistics.null_count or 0
+                if chunk.statistics.has_min_max:
+                    low, high = chunk.statistics.min, chunk.statistics.max
+                    column["min"] = low if column["min"] is None else min(column["min"], low)
+                    column["max"] = high if column["max"] is None else max(column["max"], high)
+        return stats
+
+    def export(self, dataset, output, day=None):
+        """
+        Write a stored snapshot out as CSV or Excel, chosen by `output`'s extension.
+        """
+        df = self.read(dataset, day)
+        if df is None:
+            raise KeyError(f"No snapshot of {dataset} for {day or 'any date'}")
+        if output.endswith(".xlsx"):
+            df.to_excel(output, index=False)
+        else:
+            df.to_csv(output, index=False)
+        return output
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(f"{self.catalog_path}.tmp", "w", encoding="utf-8") as file:
+            json.dump(self.catalog, file, indent=1, sort_keys=True)
+        os.replace(f"{self.catalog_path}.tmp", self.catalog_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List, export or import stored snapshots.")
+    parser.add_argument("--directory", default=SNAPSHOT_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list")
+    export = commands.add_parser("export", help="write a snapshot as CSV or XLSX")
+    export.add_argument("dataset")
+    export.add_argument("--date", default=None, help="ISO date (default: the latest)")
+    export.add_argument("--output", required=True, help="file name ending in .csv or .xlsx")
+    imports = commands.add_parser("import", help="store existing snapshot CSVs")
+    imports.add_argument("paths", nargs="+")
+    imports.add_argument("--dataset", required=True)
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.directory)
+    if args.command == "list":
+        for dataset in sorted(store.catalog):
+            for day in store.dates(dataset):
+                entry = store.catalog[dataset][day]
+                print(f"{dataset:<32} {day}  {entry['rows']:>6} rows  {entry['bytes'] / 1024:>8.1f} KiB")
+    elif args.command == "export":
+        print(f"Exported to {store.export(args.dataset, args.output, args.date)}")
+    else:
+        for path in args.paths:
+            day = DATE_IN_NAME.search(os.path.basename(path)).group()
+            print(f"Stored {path} as {store.write(read_snapshot(path), args.dataset, day)}")
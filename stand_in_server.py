@@ -0,0 +1,440 @@
+"""
+Local stand-in for the Yahoo `.info` endpoint, used for offline benchmarks.
+
+GET /info/<ticker> returns a JSON payload shaped like `yf.Ticker(ticker).info`.
+GET /quote?symbols=A,B,... returns a v7 quote response for several symbols.
+GET /quoteSummary/<ticker>?modules=a,b returns just those quoteSummary modules,
+padded with unused keys to roughly the size of the real ones.
+`start_stream_server` is a websocket stand-in for the pricing stream that
+replays recorded or synthetic ticks to subscribers.
+
+Payloads are synthetic unless the server is given recorded fixtures (see
+`fixtures.py`), in which case unknown symbols get a 404 like the real API.
+Latency can be fixed or drawn from a distribution, and a share of requests
+can be failed with 503s or throttled in periodic 429 bursts.
+"""
+
+import asyncio
+import base64
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import zlib
+import numpy as np
+import pandas as pd
+import websockets.asyncio.server
+from google.protobuf.json_format import ParseDict
+from yfinance.pricing_pb2 import PricingData
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from stock_fields import CATEGORY, DATE, FIELDS, INT64, STRING
+from quote_batch import QUOTE_KEYS
+from yahoo_api import INFO_KEY_MODULES
+
+# Unused keys per quoteSummary module, so responses weigh about what Yahoo's do
+MODULE_PADDING = {
+    "assetProfile": 15,
+    "calendarEvents": 3,
+    "defaultKeyStatistics": 35,
+    "financialData": 10,
+    "price": 30,
+    "quoteType": 12,
+    "summaryDetail": 25,
+}
+
+
+class HTTPStatusError(Exception):
+    """
+    Raised by the stand-in clients for any non-200 response.
+    """
+
+    def __init__(self, status, ticker):
+        super().__init__(f"HTTP {status} for {ticker}")
+        self.status = status
+        self.ticker = ticker
+
+
+def synthetic_info(ticker):
+    """
+    Deterministic fake `.info` payload for a ticker.
+    """
+    rng = random.Random(ticker)
+    info = {}
+    for _, key, dtype in FIELDS:
+        if dtype in (STRING, CATEGORY):
+            info[key] = f"{key}-{ticker}"
+        elif dtype == INT64:
+            info[key] = rng.randrange(1000, 10_000_000)
+        elif dtype == DATE:
+            info[key] = rng.randrange(1_500_000_000, 1_750_000_000)
+        else:
+            info[key] = round(rng.uniform(0, 100), 4)
+    return info
+
+
+def synthetic_quote_response(symbols, get_payload=synthetic_info):
+    """
+    v7 quote response built from the same payloads as /info.
+    """
+    results = []
+    for symbol in symbols:
+        info = get_payload(symbol)
+        if info is None:
+            continue
+        quote = {"symbol": symbol}
+        for quote_key, info_key in QUOTE_KEYS.items():
+            if info_key in info:
+                quote[quote_key] = info[info_key]
+        if info.get("52WeekChange") is not None:
+            quote["fiftyTwoWeekChangePercent"] = info["52WeekChange"] * 100
+        results.append(quote)
+    return {"quoteResponse": {"result": results, "error": None}}
+
+
+def lognormal_latency(median, sigma=0.5, seed=0):
+    """
+    Right-skewed latency distribution: most requests near `median`, a long slow tail.
+    """
+    rng = random.Random(seed)
+    return lambda: rng.lognormvariate(math.log(median), sigma)
+
+
+def heavy_tail_latency(median, sigma=0.3, stall_rate=0.03, stall=3.0, seed=0):
+    """
+    Mostly lognormal latency around `median`, but a `stall_rate` share of requests hang for about `stall` seconds.
+    """
+    rng = random.Random(seed)
+
+    def latency():
+        if rng.random() < stall_rate:
+            return rng.uniform(0.5, 1.5) * stall
+        return rng.lognormvariate(math.log(median), sigma)
+
+    return latency
+
+
+def replay_latency(samples, seed=0):
+    """
+    Latency distribution that resamples recorded latencies.
+    """
+    rng = random.Random(seed)
+    samples = list(samples)
+    return lambda: rng.choice(samples)
+
+
+def synthetic_bars(tickers, start, end):
+    """
+    Deterministic fake daily bars (weekdays only) in `yf.download(group_by="ticker")` shape.
+    """
+    days = pd.bdate_range(start, end, inclusive="left", name="Date")
+    frames = {}
+    for ticker in tickers:
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        # Seeded by ticker and date, so the same day has the same bar whatever range is asked for
+        offsets = np.array([(day - pd.Timestamp("2000-01-01")).days for day in days])
+        close = 50 + 10 * np.sin(offsets / 50 + rng.uniform(0, 6)) + offsets % 7 * 0.1
+        frames[ticker] = pd.DataFrame(
+            {
+                "Open": close * 0.99,
+                "High": close * 1.01,
+                "Low": close * 0.98,
+                "Close": close,
+                "Adj Close": close,
+                "Volume": (offsets % 13 + 1) * 1000,
+                "Dividends": 0.0,
+                "Stock Splits": 0.0,
+            },
+            index=days,
+        )
+    return pd.concat(frames, axis=1)
+
+
+def synthetic_summary_response(ticker, modules, get_payload=synthetic_info):
+    """
+    quoteSummary response with the requested modules, built from the same payload as /info.
+    """
+    info = get_payload(ticker)
+    if info is None:
+        return None
+    result = {}
+    for module in modules:
+        rng = random.Random(f"{ticker}-{module}")
+        values = {f"{module}Extra{number}": round(rng.uniform(0, 1e6), 4) for number in range(MODULE_PADDING.get(module, 10))}
+        for key, source in INFO_KEY_MODULES.items():
+            if source == module and key in info:
+                values[key] = info[key]
+        if module == "calendarEvents" and "earningsTimestamp" in values:
+            values["earnings"] = {"earningsDate": [values.pop("earningsTimestamp")]}
+        if "regularMarketChangePercent" in values:
+            change = values.pop("regularMarketChangePercent")
+            if "currentPrice" in info:
+                values["regularMarketPreviousClose"] = info["currentPrice"] / (1 + change / 100)
+        if module == "assetProfile":
+            values["longBusinessSummary"] = f"{ticker} " + "operates in several segments worldwide. " * 40
+            values["companyOfficers"] = [
+                {"name": f"Officer {number}", "title": "Executive", "age": 50 + number, "totalPay": 1e6 * number}
+                for number in range(10)
+            ]
+        result[module] = values
+    return {"quoteSummary": {"result": [result], "error": None}}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.0"
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        server = self.server
+        if len(parts) == 2 and parts[0] == "info":
+            make_payload = lambda: server.get_payload(parts[1])
+        elif len(parts) == 2 and parts[0] == "quoteSummary":
+            modules = urllib.parse.parse_qs(url.query).get("modules", [""])[0].split(",")
+            make_payload = lambda: synthetic_summary_response(parts[1], [module for module in modules if module], server.get_payload)
+        elif parts == ["quote"]:
+            symbols = urllib.parse.parse_qs(url.query).get("symbols", [""])[0].split(",")
+            make_payload = lambda: synthetic_quote_response([symbol for symbol in symbols if symbol], server.get_payload)
+        else:
+            self.send_error(404)
+            return
+
+        with server.lock:
+            # Deterministic throttling: anything over the concurrency capacity gets a 429
+            if server.max_concurrent and server.in_flight >= server.max_concurrent:
+                server.throttled += 1
+                throttled = True
+            elif server.in_burst():
+                server.throttled += 1
+                throttled = True
+            else:
+                server.in_flight += 1
+                throttled = False
+        if throttled:
+            self.send_error(429, "Too Many Requests")
+            return
+
+        try:
+            time.sleep(server.latency())
+            payload = make_payload()
+            with server.lock:
+                failed = server.error_rate and server.rng.random() < server.error_rate
+                if failed:
+                    server.errors += 1
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+                server.served += 1
+        if failed:
+            self.send_error(503, "Service Unavailable")
+            return
+        if payload is None:
+            self.send_error(404)
+            return
+        body = json.dumps(payload).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under a wide asyncio fan-out
+    request_queue_size = 256
+
+    def get_payload(self, ticker):
+        if self.fixtures is None:
+            return synthetic_info(ticker)
+        return self.fixtures.get(ticker)
+
+    def in_burst(self):
+        if not self.burst:
+            return False
+        every, length = self.burst
+        # Bursts close each period, so a run starts with a clean window
+        return (time.monotonic() - self.started) % every >= every - length
+
+
+def start_server(latency=0.0, port=0, max_concurrent=None, fixtures=None, error_rate=0.0, burst=None, seed=0):
+    """
+    Start the stand-in on a background thread; returns (server, base_url).
+
+    `latency` is seconds per request, or a zero-argument function returning
+    one (see `lognormal_latency` and `replay_latency`). With `max_concurrent`,
+    requests beyond that many in flight get HTTP 429, so the best sustainable
+    throughput is `max_concurrent / latency`. `fixtures` is a {ticker: info}
+    dict to replay instead of synthetic payloads. `error_rate` is the share of
+    requests that fail with HTTP 503, and `burst=(every, length)` answers every
+    request with 429 for the last `length` seconds of every `every`.
+    """
+    server = StandInServer(("127.0.0.1", port), StandInHandler)
+    server.latency = latency if callable(latency) else lambda: latency
+    server.max_concurrent = max_concurrent
+    server.fixtures = fixtures
+    server.error_rate = error_rate
+    server.burst = burst
+    server.rng = random.Random(seed)
+    server.started = time.monotonic()
+    server.lock = threading.Lock()
+    server.in_flight = 0
+    server.served = 0
+    server.throttled = 0
+    server.errors = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def http_info_fetcher(base_url, timeout=30):
+    """
+    Blocking `fetch_info` replacement that reads from the stand-in.
+    """
+    def fetch_info(ticker):
+        try:
+            with urllib.request.urlopen(f"{base_url}/info/{ticker}", timeout=timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise HTTPStatusError(e.code, ticker) from e
+
+    return fetch_info
+
+
+def async_http_info_fetcher(base_url, timeout=30):
+    """
+    Coroutine `fetch_info` replacement that reads from the stand-in with asyncio streams.
+    """
+    host, port = base_url.rsplit("//", 1)[1].split(":")
+
+    async def fetch_info(ticker):
+        async def request():
+            reader, writer = await asyncio.open_connection(host, int(port))
+            try:
+                writer.write(f"GET /info/{ticker} HTTP/1.0\r\nHost: {host}\r\n\r\n".encode())
+                await writer.drain()
+                raw = await reader.read()
+            finally:
+                writer.close()
+            head, _, body = raw.partition(b"\r\n\r\n")
+            status = int(head.split(b" ", 2)[1])
+            if status != 200:
+                raise HTTPStatusError(status, ticker)
+            return json.loads(body)
+
+        return await asyncio.wait_for(request(), timeout)
+
+    return fetch_info
+
+
+def http_summary_fetcher(base_url, timeout=30):
+    """
+    Blocking `fetch_summary_json` replacement that reads from the stand-in.
+    """
+    def fetch_summary_json(ticker, modules):
+        query = urllib.parse.urlencode({"modules": ",".join(modules)})
+        try:
+            with urllib.request.urlopen(f"{base_url}/quoteSummary/{ticker}?{query}", timeout=timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise HTTPStatusError(e.code, ticker) from e
+
+    return fetch_summary_json
+
+
+def http_quote_fetcher(base_url, timeout=30):
+    """
+    Blocking `fetch_quote_json` replacement that reads from the stand-in.
+    """
+    def fetch_quote_json(symbols):
+        query = urllib.parse.urlencode({"symbols": ",".join(symbols)})
+        try:
+            with urllib.request.urlopen(f"{base_url}/quote?{query}", timeout=timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise HTTPStatusError(e.code, ",".join(symbols)) from e
+
+    return fetch_quote_json
+
+
+def synthetic_ticks(symbols, count, seed=0):
+    """
+    `count` pricing messages (decoded form) cycling through `symbols`, each a small random step in price.
+    """
+    rng = random.Random(seed)
+    prices = {symbol: synthetic_info(symbol)["currentPrice"] or 1.0 for symbol in symbols}
+    opens = dict(prices)
+    ticks = []
+    for number in range(count):
+        symbol = symbols[number % len(symbols)]
+        prices[symbol] *= 1 + rng.gauss(0, 0.001)
+        ticks.append(
+            {
+                "id": symbol,
+                "price": prices[symbol],
+                "time": str(1_730_000_000_000 + number),
+                "change_percent": (prices[symbol] / opens[symbol] - 1) * 100,
+                "day_volume": str(1000 * (number + 1)),
+            }
+        )
+    return ticks
+
+
+def encode_tick(tick):
+    """
+    A decoded pricing message back in the wire format: JSON around base64 protobuf.
+    """
+    message = ParseDict(tick, PricingData(), ignore_unknown_fields=True)
+    return json.dumps({"type": "pricing", "message": base64.b64encode(message.SerializeToString()).decode()})
+
+
+class StreamServer:
+    def __init__(self, ticks, interval=0.0):
+        # Encoded up front, so the stand-in is never the bottleneck being measured
+        self.messages = [(tick["id"], encode_tick(tick)) for tick in ticks]
+        self.interval = interval
+        self.sent = 0
+
+    async def handler(self, websocket):
+        # The first message is the client's subscription; later ones are its heartbeats
+        subscribed = set(json.loads(await websocket.recv()).get("subscribe", []))
+        for symbol, message in self.messages:
+            if symbol in subscribed:
+                await websocket.send(message)
+                self.sent += 1
+                if self.interval:
+                    await asyncio.sleep(self.interval)
+        await websocket.wait_closed()
+
+    def shutdown(self):
+        self.loop.call_soon_threadsafe(self.server.close)
+
+
+def start_stream_server(ticks, port=0, interval=0.0):
+    """
+    Start the pricing-stream stand-in on a background thread; returns (server, url).
+
+    After a client subscribes, each tick for a subscribed symbol is sent once,
+    in order, `interval` seconds apart (as fast as possible by default).
+    """
+    server = StreamServer(ticks, interval)
+    ready = threading.Event()
+
+    async def listen():
+        return await websockets.asyncio.server.serve(server.handler, "127.0.0.1", port)
+
+    def run():
+        server.loop = asyncio.new_event_loop()
+        server.server = server.loop.run_until_complete(listen())
+        ready.set()
+        server.loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return server, f"ws://127.0.0.1:{server.server.sockets[0].getsockname()[1]}"
@@ -0,0 +1,310 @@
+"""
+Column schema shared by every fetch path.
+
+Each entry maps an output column to the key it is read from in
+`yf.Ticker(...).info` and the dtype the column is built with. Missing or
+malformed values become NaN/NaT instead of an "N/A" string, so frames come
+out typed and downstream scripts do not need to coerce them again.
+"""
+
+import math
+import operator
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+STRING = "string"
+CATEGORY = "category"
+FLOAT64 = "float64"
+FLOAT32 = "float32"
+# Nullable integer, so missing volumes stay missing instead of forcing float
+INT64 = "Int64"
+# Stored upstream as epoch seconds
+DATE = "date"
+# pandas' default missing-value markers, applied to every CSV column but Symbol ("NA" is a listed ticker)
+CSV_NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+FIELDS = [
+    ("Name", "longName", STRING),
+    ("Sector", "sector", CATEGORY),
+    ("Industry", "industry", CATEGORY),
+    ("Country", "country", CATEGORY),
+    ("Currency", "currency", CATEGORY),
+    ("Exchange", "exchange", CATEGORY),
+    ("Website", "website", STRING),
+    ("Current Price", "currentPrice", FLOAT64),
+    ("Market Cap", "marketCap", FLOAT64),
+    ("Enterprise Value", "enterpriseValue", FLOAT64),
+    ("PE Ratio", "trailingPE", FLOAT32),
+    ("Forward PE", "forwardPE", FLOAT32),
+    ("PEG Ratio", "pegRatio", FLOAT32),
+    ("Price to Book", "priceToBook", FLOAT32),
+    ("Price to Sales", "priceToSalesTrailing12Months", FLOAT32),
+    ("Book Value per Share", "bookValue", FLOAT32),
+    ("Revenue per Share", "revenuePerShare", FLOAT32),
+    ("Revenue Growth (YoY)", "revenueGrowth", FLOAT32),
+    ("Earnings Growth (YoY)", "earningsGrowth", FLOAT32),
+    ("EBITDA Margins", "ebitdaMargins", FLOAT32),
+    ("Gross Margins", "grossMargins", FLOAT32),
+    ("Operating Margins", "operatingMargins", FLOAT32),
+    ("Profit Margins", "profitMargins", FLOAT32),
+    ("Dividend Rate", "dividendRate", FLOAT32),
+    ("Dividend Yield", "dividendYield", FLOAT32),
+    ("Payout Ratio", "payoutRatio", FLOAT32),
+    ("Five-Year Avg. Dividend Yield", "fiveYearAvgDividendYield", FLOAT32),
+    ("Ex-Dividend Date", "exDividendDate", DATE),
+    ("Earnings Date", "earningsTimestamp", DATE),
+    ("Free Cash Flow", "freeCashflow", FLOAT64),
+    ("Operating Cash Flow", "operatingCashflow", FLOAT64),
+    ("Total Cash", "totalCash", FLOAT64),
+    ("Cash per Share", "totalCashPerShare", FLOAT32),
+    ("Total Debt", "totalDebt", FLOAT64),
+    ("Net Debt", "netDebt", FLOAT64),
+    ("Debt to Equity", "debtToEquity", FLOAT32),
+    ("Current Ratio", "currentRatio", FLOAT32),
+    ("Quick Ratio", "quickRatio", FLOAT32),
+    ("Beta", "beta", FLOAT32),
+    ("52-Week High", "fiftyTwoWeekHigh", FLOAT64),
+    ("52-Week Low", "fiftyTwoWeekLow", FLOAT64),
+    ("Average Volume", "averageVolume", INT64),
+    ("Regular Market Volume", "regularMarketVolume", INT64),
+    ("Current Price Change (%)", "regularMarketChangePercent", FLOAT32),
+    ("1-Year Return", "52WeekChange", FLOAT32),
+    ("Insider Ownership", "heldPercentInsiders", FLOAT32),
+    ("Institutional Ownership", "heldPercentInstitutions", FLOAT32),
+    ("Short Ratio", "shortRatio", FLOAT32),
+    ("Target High Price", "targetHighPrice", FLOAT64),
+    ("Target Low Price", "targetLowPrice", FLOAT64),
+    ("Target Mean Price", "targetMeanPrice", FLOAT64),
+    ("Recommendation Mean", "recommendationMean", FLOAT32),
+    ("Number of Analyst Opinions", "numberOfAnalystOpinions", INT64),
+    ("Return on Assets", "returnOnAssets", FLOAT32),
+    ("Return on Equity", "returnOnEquity", FLOAT32),
+    ("Enterprise to EBITDA", "enterpriseToEbitda", FLOAT32),
+    ("Trailing EPS", "trailingEps", FLOAT32),
+    ("Forward EPS", "forwardEps", FLOAT32),
+    ("Total Revenue", "totalRevenue", FLOAT64),
+]
+
+COLUMNS = ["Symbol"] + [column for column, _, _ in FIELDS]
+SCHEMA = {"Symbol": STRING, **{column: dtype for column, _, dtype in FIELDS}}
+NUMERIC_DTYPES = {FLOAT64, FLOAT32, INT64, DATE}
+
+# Field groups, by how often the underlying values change
+PROFILE = "profile"
+FUNDAMENTALS = "fundamentals"
+QUOTE = "quote"
+GROUPS = (PROFILE, FUNDAMENTALS, QUOTE)
+
+PROFILE_INFO_KEYS = {"longName", "sector", "industry", "country", "currency", "exchange", "website"}
+# Exactly the daily-moving keys the batch quote endpoint refreshes (see quote_batch);
+# price-derived ratios it does not return (EV, P/S, PEG, EV/EBITDA) stay with fundamentals
+QUOTE_INFO_KEYS = {
+    "currentPrice", "marketCap", "trailingPE", "forwardPE", "priceToBook", "fiftyTwoWeekHigh",
+    "fiftyTwoWeekLow", "averageVolume", "regularMarketVolume", "regularMarketChangePercent", "52WeekChange",
+}
+
+
+def field_group(key):
+    """
+    Group of an `.info` key; anything not profile or quote is a fundamental.
+    """
+    if key in PROFILE_INFO_KEYS:
+        return PROFILE
+    if key in QUOTE_INFO_KEYS:
+        return QUOTE
+    return FUNDAMENTALS
+
+
+def group_keys(groups=GROUPS):
+    """
+    Schema `.info` keys that belong to any of `groups`.
+    """
+    return [key for _, key, _ in FIELDS if field_group(key) in groups]
+
+
+def fetched_groups(fetch_info):
+    """
+    Field groups a `fetch_info` function returns: its `groups` attribute, or all of them.
+    """
+    return getattr(fetch_info, "groups", GROUPS)
+
+
+def narrowed(fetch_info, groups):
+    """
+    A `fetch_info` for only `groups`, built by its `narrow` attribute; `fetch_info` itself if it cannot narrow.
+    """
+    narrow = getattr(fetch_info, "narrow", None)
+    return narrow(groups) if narrow else fetch_info
+
+
+def get_info(ticker):
+    """
+    Default detail fetch: one `.info` lookup against Yahoo Finance.
+    """
+    # Imported here so scripts that only read snapshots do not need yfinance
+    import yfinance as yf
+
+    return yf.Ticker(ticker).info
+
+
+def clean_value(value, dtype):
+    """
+    Normalize one raw value for its column; anything unusable becomes None.
+    """
+    if value is None:
+        return None
+    if dtype in NUMERIC_DTYPES:
+        if isinstance(value, bool):
+            return None
+        if isinstance(value, str):
+            try:
+                value = float(value)
+            except ValueError:
+                return None
+        if not isinstance(value, (int, float)) or math.isnan(value) or math.isinf(value):
+            return None
+        return int(value) if dtype in (INT64, DATE) else value
+    return str(value) if value != "" else None
+
+
+def build_record(ticker, info):
+    """
+    Turn a `.info` payload into one output row.
+    """
+    record = {"Symbol": ticker}
+    for column, key, dtype in FIELDS:
+        record[column] = clean_value(info.get(key), dtype)
+    return record
+
+
+def typed_column(values, dtype):
+    """
+    Build one column of the given schema dtype from cleaned values (None = missing).
+    """
+    if dtype in (FLOAT64, FLOAT32):
+        return np.array([np.nan if value is None else value for value in values], dtype=dtype)
+    if dtype == INT64:
+        return pd.array(values, dtype=INT64)
+    if dtype == DATE:
+        return pd.to_datetime(pd.array(values, dtype=INT64), unit="s").as_unit("s")
+    if dtype == CATEGORY:
+        return pd.Categorical(values)
+    # Plain text: let pandas pick its default string dtype, as `read_csv` does
+    return list(values)
+
+
+def frame_from_columns(columns):
+    """
+    Typed DataFrame from {column: list of cleaned values}.
+    """
+    return pd.DataFrame({column: typed_column(values, SCHEMA.get(column, STRING)) for column, values in columns.items()})
+
+
+def frame_from_records(records):
+    """
+    Typed DataFrame from a list of `build_record` rows.
+    """
+    return frame_from_columns({column: [record.get(column) for record in records] for column in COLUMNS})
+
+
+def conform_frame(df):
+    """
+    Reorder a frame to `COLUMNS`, adding missing columns as nulls and
+    restoring category dtypes (which `pd.concat` drops when categories differ).
+    """
+    conformed = {}
+    for column in COLUMNS:
+        dtype = SCHEMA[column]
+        if column not in df.columns:
+            conformed[column] = typed_column([None] * len(df), dtype)
+        elif dtype == CATEGORY:
+            conformed[column] = df[column].astype(CATEGORY)
+        else:
+            conformed[column] = df[column]
+    return pd.DataFrame(conformed, index=df.index)
+
+
+FILTER_OPERATORS = {
+    "==": operator.eq,
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda values, allowed: values.isin(allowed),
+    "not in": lambda values, excluded: ~values.isin(excluded),
+}
+
+
+def filter_mask(df, filters):
+    """
+    Rows of `df` that pass every (column, op, value) filter; missing values never pass.
+    """
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in filters:
+        values = df[column]
+        mask &= values.notna() & FILTER_OPERATORS[op](values, value)
+    return mask.fillna(False).astype(bool)
+
+
+def read_snapshot(path, columns=None, filters=None):
+    """
+    Read a snapshot CSV (or a `snapshot_store` Parquet file) straight into the schema dtypes.
+
+    With `columns`, only those columns are read. `filters` is a list of
+    (column, op, value) tuples, as for `pd.read_parquet`, that every returned
+    row must pass; Parquet files apply them while reading, skipping row
+    groups whose statistics rule them out, and CSVs after parsing. Filter
+    columns are read as needed but only `columns` are returned.
+    Older snapshots store "Ex-Dividend Date" as epoch seconds; those are converted too.
+    Schema columns an older file does not have yet come back as nulls.
+    """
+    filters = list(filters or [])
+    needed = None if columns is None else list(dict.fromkeys([*columns, *(column for column, _, _ in filters)]))
+    if path.endswith(".parquet"):
+        present = set(pq.read_schema(path).names)
+        # Filters on columns the file lacks are applied after filling them in below
+        late_filters = [f for f in filters if f[0] not in present]
+        # The file carries the schema dtypes itself, except that Parquet has no seconds unit
+        df = pd.read_parquet(
+            path,
+            columns=None if columns is None else [column for column in columns if column in present],
+            filters=[f for f in filters if f[0] in present] or None,
+        )
+        for column in df.columns:
+            if SCHEMA.get(column) == DATE:
+                df[column] = df[column].dt.as_unit("s")
+    else:
+        present = set(pd.read_csv(path, nrows=0).columns)
+        late_filters = filters
+        dtypes = {}
+        for column, dtype in SCHEMA.items():
+            if column in present and (needed is None or column in needed):
+                if dtype not in (STRING, DATE):
+                    dtypes[column] = dtype
+        usecols = None if needed is None else [column for column in needed if column in present]
+        na_values = {column: [""] if column == "Symbol" else CSV_NA_VALUES for column in present}
+        df = pd.read_csv(path, usecols=usecols, dtype=dtypes, keep_default_na=False, na_values=na_values)
+        for column in df.columns:
+            if SCHEMA.get(column) == DATE:
+                values = pd.to_numeric(df[column], errors="coerce")
+                if values.notna().sum() == df[column].notna().sum():
+                    df[column] = pd.to_datetime(values, unit="s").dt.as_unit("s")
+                else:
+                    df[column] = pd.to_datetime(df[column], errors="coerce").dt.as_unit("s")
+    wanted = needed if needed is not None else [column for column, _, _ in filters]
+    absent = [column for column in wanted if column not in present and column in SCHEMA]
+    if absent:
+        filled = conform_frame(df)
+        for column in absent:
+            df[column] = filled[column]
+    if late_filters:
+        df = df[filter_mask(df, late_filters)].reset_index(drop=True)
+    if columns is not None:
+        df = df[[column for column in df.columns if column in columns]]
+    return df
@@ -0,0 +1,119 @@
+"""
+Symbol universe registry.
+
+Loads the exchange symbol files, normalizes them to Yahoo's form (upper case,
+"-" for share classes, ".TO" for TSX listings) and drops duplicates and
+invalid lines. A symbol that leaves the universe is kept as inactive, so
+every symbol ever listed stays on record. Each change to the active set
+bumps the registry version.
+
+The registry is saved in Data/ as compact JSON: the version history plus
+sorted lists of the active and inactive symbols (the exchange follows from
+the suffix).
+"""
+
+import json
+import os
+import re
+import time
+
+REGISTRY_PATH = os.path.join("Data", "symbols.json")
+EXCHANGE_FILES = {"NYSE": "NYSE_SYMBOLS.txt", "TSX": "TSX_SYMBOLS.txt"}
+EXCHANGE_SUFFIXES = {"NYSE": "", "TSX": ".TO"}
+# Yahoo symbols: letters, digits and share-class dashes, plus an optional exchange suffix
+VALID_SYMBOL = re.compile(r"^[A-Z0-9][A-Z0-9\-]{0,9}(\.[A-Z]{1,3})?$")
+
+
+def normalize_symbol(raw, exchange="NYSE"):
+    """
+    Yahoo form of a raw symbol-file line, or None if it is not a valid symbol.
+    """
+    symbol = raw.strip().upper()
+    if not symbol or symbol.startswith("#"):
+        return None
+    suffix = EXCHANGE_SUFFIXES[exchange]
+    if suffix and symbol.endswith(suffix):
+        symbol = symbol[: -len(suffix)]
+    # Share classes are written BRK.B or BRK/B in listings; Yahoo uses BRK-B
+    symbol = symbol.replace("/", "-").replace(".", "-") + suffix
+    return symbol if VALID_SYMBOL.match(symbol) else None
+
+
+def read_symbol_file(exchange):
+    """
+    Normalized, deduplicated symbols from an exchange's file, in file order.
+    """
+    with open(EXCHANGE_FILES[exchange], "r") as file:
+        symbols = (normalize_symbol(line, exchange) for line in file)
+        return list(dict.fromkeys(symbol for symbol in symbols if symbol))
+
+
+class SymbolRegistry:
+    def __init__(self, path=REGISTRY_PATH):
+        self.path = path
+        self.version = 0
+        self.history = []
+        # symbol -> {"exchange", "active"}
+        self.symbols = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+            self.version = data["version"]
+            self.history = data["history"]
+            for state in ("active", "inactive"):
+                for symbol in data[state]:
+                    self.symbols[symbol] = {"exchange": self._exchange(symbol), "active": state == "active"}
+
+    def load_universe(self, exchanges=("NYSE", "TSX")):
+        """
+        Read the exchanges' symbol files, register new symbols, and return the active universe in file order.
+
+        Symbols of these exchanges that are no longer listed are marked
+        inactive; other exchanges are left alone.
+        """
+        # A symbol listed on several exchanges keeps its first listing
+        universe = list(dict.fromkeys(symbol for exchange in exchanges for symbol in read_symbol_file(exchange)))
+        listed = set(universe)
+        added = removed = 0
+        for symbol in universe:
+            entry = self.symbols.get(symbol)
+            if entry is None:
+                entry = self.symbols[symbol] = {"exchange": self._exchange(symbol), "active": False}
+            if not entry["active"]:
+                entry["active"] = True
+                added += 1
+        for symbol, entry in self.symbols.items():
+            if entry["active"] and entry["exchange"] in exchanges and symbol not in listed:
+                entry["active"] = False
+                removed += 1
+        if added or removed:
+            self.version += 1
+            self.history.append({"version": self.version, "time": time.time(), "added": added, "removed": removed})
+        return universe
+
+    @staticmethod
+    def _exchange(symbol):
+        for exchange, suffix in EXCHANGE_SUFFIXES.items():
+            if suffix and symbol.endswith(suffix):
+                return exchange
+        return "NYSE"
+
+    def active(self):
+        return [symbol for symbol, entry in self.symbols.items() if entry["active"]]
+
+    def save(self):
+        """
+        Write the registry as JSON without indentation; the lists are sorted, so the file only changes with the universe.
+        """
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {
+            "version": self.version,
+            "history": self.history,
+            "active": sorted(symbol for symbol, entry in self.symbols.items() if entry["active"]),
+            "inactive": sorted(symbol for symbol, entry in self.symbols.items() if not entry["active"]),
+        }
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, separators=(",", ":"))
+        os.replace(temp_path, self.path)
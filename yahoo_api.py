@@ -0,0 +1,165 @@
+"""
+Direct access to the two Yahoo Finance endpoints behind `yf.Ticker(...).info`.
+
+`.info` always makes a quoteSummary call plus a v7 quote call for one
+symbol. Going through yfinance's shared session (cookie and crumb handling)
+lets us call each endpoint on its own: the quote endpoint for many symbols
+at once, and quoteSummary for just the modules we need.
+
+`INFO_KEY_MODULES` records which quoteSummary module each schema key comes
+from, so a fetch can ask for only the modules its columns need and keep
+only those keys (see `field_fetcher`).
+"""
+
+from yfinance.data import YfData
+from fetch_errors import SymbolNotFound
+from stock_fields import GROUPS, group_keys
+
+QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+QUOTE_SUMMARY_URL = "https://query2.finance.yahoo.com/v10/finance/quoteSummary"
+
+# quoteSummary modules requested by `.info`
+DETAIL_MODULES = ["financialData", "quoteType", "defaultKeyStatistics", "assetProfile", "summaryDetail"]
+
+# Schema `.info` key -> quoteSummary module it is read from. `.info` takes the daily
+# change and the earnings date from the v7 quote call: the change is worked out from
+# summaryDetail's previous close and financialData's current price instead of pulling in
+# the large price module, and the earnings date comes from calendarEvents.
+# netDebt has no quoteSummary source (it is NaN from `.info` as well), so it is never requested.
+INFO_KEY_MODULES = {
+    **dict.fromkeys(["sector", "industry", "country", "website"], "assetProfile"),
+    **dict.fromkeys(["longName", "exchange"], "quoteType"),
+    **dict.fromkeys(
+        [
+            "currency", "marketCap", "trailingPE", "forwardPE", "priceToSalesTrailing12Months", "dividendRate",
+            "dividendYield", "payoutRatio", "fiveYearAvgDividendYield", "exDividendDate", "beta",
+            "fiftyTwoWeekHigh", "fiftyTwoWeekLow", "averageVolume", "regularMarketVolume",
+            "regularMarketChangePercent",
+        ],
+        "summaryDetail",
+    ),
+    **dict.fromkeys(
+        [
+            "enterpriseValue", "pegRatio", "priceToBook", "bookValue", "52WeekChange", "heldPercentInsiders",
+            "heldPercentInstitutions", "shortRatio", "enterpriseToEbitda", "trailingEps", "forwardEps",
+            "profitMargins",
+        ],
+        "defaultKeyStatistics",
+    ),
+    **dict.fromkeys(
+        [
+            "currentPrice", "revenuePerShare", "revenueGrowth", "earningsGrowth", "ebitdaMargins", "grossMargins",
+            "operatingMargins", "freeCashflow", "operatingCashflow", "totalCash", "totalCashPerShare", "totalDebt",
+            "debtToEquity", "currentRatio", "quickRatio", "targetHighPrice", "targetLowPrice", "targetMeanPrice",
+            "recommendationMean", "numberOfAnalystOpinions", "returnOnAssets", "returnOnEquity", "totalRevenue",
+        ],
+        "financialData",
+    ),
+    "earningsTimestamp": "calendarEvents",
+}
+
+
+def get_json(url, params):
+    return YfData().get_raw_json(url, params=params)
+
+
+def fetch_quote_json(symbols):
+    """
+    One v7 quote request for a batch of symbols.
+    """
+    params = {"symbols": ",".join(symbols), "formatted": "false"}
+    return get_json(QUOTE_URL, params)
+
+
+def summary_modules(keys):
+    """
+    quoteSummary modules needed for `keys`, in a stable order.
+    """
+    modules = {INFO_KEY_MODULES[key] for key in keys if key in INFO_KEY_MODULES}
+    if "regularMarketChangePercent" in keys:
+        modules.add("financialData")
+    return sorted(modules)
+
+
+def raw_value(value):
+    if isinstance(value, dict):
+        return value.get("raw")
+    return value
+
+
+def flatten_summary(result):
+    """
+    Merge quoteSummary modules into one flat, `.info`-style dict of raw values.
+    """
+    info = {}
+    for module in result.values():
+        if not isinstance(module, dict):
+            continue
+        for key, value in module.items():
+            if isinstance(value, dict) and "raw" in value:
+                value = value["raw"]
+            if value is not None and value != {}:
+                info[key] = value
+    return info
+
+
+def select_summary(result, keys):
+    """
+    Just `keys` from quoteSummary modules, each read from its own module.
+    """
+    info = {}
+    for key in keys:
+        module = result.get(INFO_KEY_MODULES.get(key)) or {}
+        if key == "earningsTimestamp":
+            dates = (module.get("earnings") or {}).get("earningsDate") or []
+            value = raw_value(dates[0]) if dates else None
+        elif key == "regularMarketChangePercent":
+            previous_close = raw_value(module.get("regularMarketPreviousClose"))
+            price = raw_value((result.get("financialData") or {}).get("currentPrice"))
+            value = (price / previous_close - 1) * 100 if price and previous_close else None
+        else:
+            value = raw_value(module.get(key))
+        if value is not None and value != {}:
+            info[key] = value
+    return info
+
+
+def fetch_summary_json(ticker, modules):
+    params = {"modules": ",".join(modules), "formatted": "false", "corsDomain": "finance.yahoo.com", "symbol": ticker}
+    return get_json(f"{QUOTE_SUMMARY_URL}/{ticker}", params)
+
+
+def fetch_summary_info(ticker, modules=DETAIL_MODULES, keys=None, fetch_summary_json=fetch_summary_json):
+    """
+    One quoteSummary request for `ticker`, flattened like `.info`; with `keys`, only those keys are kept.
+    An empty result (how Yahoo answers for unknown symbols) raises SymbolNotFound.
+    """
+    payload = fetch_summary_json(ticker, modules)
+    results = (payload.get("quoteSummary") or {}).get("result") or []
+    if not results:
+        error = (payload.get("quoteSummary") or {}).get("error") or {}
+        raise SymbolNotFound(f"No quoteSummary data for {ticker}: {error.get('description', 'empty result')}")
+    if keys is None:
+        return flatten_summary(results[0])
+    return select_summary(results[0], keys)
+
+
+def field_fetcher(groups=None, fetch_summary_json=fetch_summary_json):
+    """
+    `fetch_info` replacement that requests only the quoteSummary modules the schema needs for `groups`.
+
+    One request per ticker instead of the two `.info` makes, and the payload
+    holds only schema keys. The returned function's `groups` attribute tells
+    the cache which field groups it fills (see `stock_fields.fetched_groups`),
+    and its `narrow` builds one for fewer groups (see `stock_fields.narrowed`).
+    """
+    groups = tuple(groups or GROUPS)
+    keys = group_keys(groups)
+    modules = summary_modules(keys)
+
+    def fetch_info(ticker):
+        return fetch_summary_info(ticker, modules, keys, fetch_summary_json)
+
+    fetch_info.groups = groups
+    fetch_info.narrow = lambda stale: field_fetcher(stale, fetch_summary_json)
+    return fetch_info